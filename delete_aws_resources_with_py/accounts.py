@@ -0,0 +1,87 @@
+"""Module containing the classes used to assume a role into other AWS accounts"""
+
+# Standard Library imports
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Optional
+
+# Local App imports
+from delete_aws_resources_with_py.utils import logger, create_boto3
+
+#  The account ID identifies the credentials' account for the per-account throttling, it does not change on refresh
+Credentials = namedtuple('Credentials', ['access_key', 'secret_key', 'session_token', 'expiration', 'account_id'],
+                         defaults=(None,))
+
+SESSION_NAME = 'delete-aws-resources-with-py'
+
+
+class AccountSession:
+    """
+    Action-oriented class that assumes a role in an account and keeps its credentials fresh.
+
+    The credentials are shared by every worker processing a region of the account, they are
+    renewed once their remaining lifetime drops below the expiry threshold.
+    """
+
+    def __init__(self, account_id: str, role_name: str, expiry_threshold: int = 300, partition: str = 'aws',
+                 duration: int = 3600) -> None:
+        """
+        Initializer that takes in two required and three optional params.
+
+        :param account_id: (required) A string containing the 12 digit AWS account ID
+        :param role_name: (required) A string containing the name of the role to assume in the account
+        :param expiry_threshold: (optional) Renew the credentials when fewer seconds than this are left
+        :param partition: (optional) A string containing the AWS partition of the account (e.g. 'aws-us-gov')
+        :param duration: (optional) The lifetime in seconds requested for the credentials
+        """
+        self.account_id = account_id
+        self.role_name = role_name
+        self.expiry_threshold = expiry_threshold
+        self.partition = partition
+        self.duration = duration
+        self._credentials: Optional[Credentials] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'AccountSession({self.account_id}, {self.role_name})'  # pragma: no cover
+
+    @property
+    def role_arn(self) -> str:
+        """Property that will provide the ARN of the role assumed in the account"""
+        return f'arn:{self.partition}:iam::{self.account_id}:role/{self.role_name}'
+
+    def _needs_refresh(self) -> bool:
+        """
+        Check whether the credentials are missing or about to expire.
+
+        :return: A boolean result that represents whether a new assume role call is needed
+        """
+        if self._credentials is None:
+            return True
+        remaining = (self._credentials.expiration - datetime.now(timezone.utc)).total_seconds()
+        return remaining < self.expiry_threshold
+
+    def _assume_role(self) -> Credentials:
+        """
+        Call STS to assume the role in the account.
+
+        :return: A Credentials NamedTuple containing the temporary credentials
+
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Assuming role '%s'", self.role_arn)
+        response = create_boto3(service='sts', boto_type='boto_client').assume_role(
+            RoleArn=self.role_arn, RoleSessionName=SESSION_NAME, DurationSeconds=self.duration)
+        creds = response['Credentials']
+        return Credentials(access_key=creds['AccessKeyId'], secret_key=creds['SecretAccessKey'],
+                           session_token=creds['SessionToken'], expiration=creds['Expiration'],
+                           account_id=self.account_id)
+
+    @property
+    def credentials(self) -> Credentials:
+        """Property that will provide valid credentials for the account, renewing them when needed"""
+        with self._lock:
+            if self._needs_refresh():
+                self._credentials = self._assume_role()
+            return self._credentials
@@ -0,0 +1,122 @@
+"""Module containing the asyncio engine used to sweep many account x region units at once"""
+
+# Standard Library imports
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.dependency_graph import DependencyGraph, advance
+from delete_aws_resources_with_py.utils import logger
+
+AsyncUnit = Tuple[Any, str, Callable[[], Awaitable[Any]]]
+
+
+class AsyncEngine:
+    """
+    Action-oriented class that runs the sweep on an event loop.
+
+    Every unit is a coroutine, so hundreds of units can be in progress at once while a semaphore
+    bounds how many run concurrently. Each blocking boto3 call is awaited on a small shared pool
+    of I/O threads, a thread is only held while a call is in flight instead of for a whole unit.
+    The delete graph tasks are coroutines too: their waits are awaited on the StatusPoller of the
+    region, whose ticks are the only I/O they add, so the engine never runs more than io_workers threads.
+    """
+
+    def __init__(self, max_concurrency: int = 64, io_workers: int = 8) -> None:
+        """
+        Initializer that takes in two optional params.
+
+        :param max_concurrency: (optional) The maximum number of units in progress at the same time
+        :param io_workers: (optional) The number of threads the blocking AWS calls are run on
+        """
+        self.max_concurrency = max_concurrency
+        self.io_workers = io_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __repr__(self):
+        return f'AsyncEngine({self.max_concurrency}, {self.io_workers})'  # pragma: no cover
+
+    async def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await a blocking call on the I/O threads.
+
+        :param func: (required) The blocking callable (e.g. a boto3 client method)
+        :return: The value returned by the callable
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def run_task(self, graph: DependencyGraph, name: str) -> bool:
+        """
+        Run a single task of a DependencyGraph as a coroutine, the asyncio counterpart of DependencyGraph.run_task.
+
+        Every step of the task between two waits is awaited on the I/O threads; its waits are awaited on the
+        poller of the graph, so no thread is held while the resource is not done yet.
+        :param graph: (required) The DependencyGraph the task belongs to
+        :param name: (required) The name of the task to run
+        :return: A boolean result that represents whether the task succeeded
+        """
+        if graph.is_completed(name):
+            return True
+        try:
+            result = await self.call(graph.tasks[name][0])
+            if inspect.isgenerator(result):
+                steps = result
+                finished, result = await self.call(advance, steps)
+                while not finished:
+                    done = await graph.poller.wait_async(*result, call=self.call)
+                    finished, result = await self.call(advance, steps, done)
+        except Exception as err:
+            return graph.record_error(name, err)
+        return graph.record_result(name, result)
+
+    async def run_graph(self, graph: DependencyGraph) -> Dict[str, bool]:
+        """
+        Run a DependencyGraph level by level, the tasks of a level concurrently on the event loop.
+
+        The semantics match DependencyGraph.run: a task whose dependencies did not all succeed is skipped.
+        :param graph: (required) The DependencyGraph to run
+        :return: A dict containing every task name and whether it succeeded (skipped tasks are False)
+        """
+        results: Dict[str, bool] = {}
+        for level in graph.levels():
+            runnable = []
+            for name in level:
+                failed = [dependency for dependency in graph.tasks[name][1] if not results[dependency]]
+                if failed:
+                    logger.error("[-] Skipping '%s', its dependencies did not complete: %s", name, failed)
+                    results[name] = False
+                else:
+                    runnable.append(name)
+            outcomes = await asyncio.gather(*(self.run_task(graph, name) for name in runnable))
+            results.update(zip(runnable, outcomes))
+        return results
+
+    async def _run_units(self, units: List[AsyncUnit]) -> List[Tuple[Any, str, Any, Optional[Exception]]]:
+        """Run every unit under the semaphore and collect its value or exception"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def guarded(account: Any, current_region: str, task: Callable[[], Awaitable[Any]]) -> tuple:
+            async with semaphore:
+                try:
+                    return account, current_region, await task(), None
+                except Exception as err:  # one broken unit must not stop the remaining ones
+                    return account, current_region, None, err
+
+        return await asyncio.gather(*(guarded(*unit) for unit in units))
+
+    def run_units(self, units: List[AsyncUnit]) -> List[Tuple[Any, str, Any, Optional[Exception]]]:
+        """
+        Run the units to completion on a new event loop.
+
+        :param units: (required) A list of (account, region, coroutine function taking no args) tuples
+        :return: A list of (account, region, value, exception) tuples, exception is None when the unit succeeded
+        """
+        with ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='async-io') as executor:
+            self._executor = executor
+            try:
+                return asyncio.run(self._run_units(units))
+            finally:
+                self._executor = None
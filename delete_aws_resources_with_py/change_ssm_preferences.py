@@ -1,11 +1,14 @@
 """Module containing functions to change SSM preferences to private."""
 
 # Standard Library imports
-from typing import Any
+from collections import namedtuple
+from typing import Any, Optional
 
 # Local App imports
 from delete_aws_resources_with_py.utils import logger
 
+SsmSweepResult = namedtuple('SsmSweepResult', ['region', 'account', 'before', 'after'])
+
 
 class SsmPreference:
     """Action-oriented class to check and update the region SSM settings."""
@@ -23,7 +26,7 @@ class SsmPreference:
     def __repr__(self):
         return f'SsmPreference({self.ssm_client}, {self.region})'  # pragma: no cover
 
-    def _get_current_service_setting_check(self) -> bool:
+    def get_current_service_setting_check(self) -> bool:
         """
         Check to see what the current service setting is.
 
@@ -53,13 +56,37 @@ class SsmPreference:
 
         """
 
-        if not self._get_current_service_setting_check():
+        if not self.get_current_service_setting_check():
             logger.info(
                 "[+] SSM Document preferences already block public access with status 'Disable', no action taken\n")
             return
         logger.info(
             "[!] SSM Document preferences allows public access with status 'Enable' in Region: '%s', attempting to update",
             self.region)
+        self.disable_public_sharing()
+
+    def disable_public_sharing(self) -> bool:
+        """
+        Update the SSM document preference to be private to the account, without checking the current setting.
+
+        :return A boolean result that represents whether the change occurred successfully
+        """
         if self._update_public_service_setting_check('Disable'):
             logger.info("[+] Preferences successfully updated to 'Disable' in Region: '%s'\n", self.region)
-            return
+            return True
+        return False
+
+    def sweep(self, account: Optional[str] = None) -> SsmSweepResult:
+        """
+        Check the SSM document preference and make it private when needed, keeping the before and after values.
+
+        :param account: (optional) A string containing the account ID the region belongs to
+        :return: A SsmSweepResult NamedTuple containing the region, account and the setting before and after
+        """
+        before = 'Enable' if self.get_current_service_setting_check() else 'Disable'
+        after = before
+        if before == 'Enable':
+            logger.info("[!] SSM Document preferences allows public access with status 'Enable' in Region: '%s', "
+                        "attempting to update", self.region)
+            after = 'Disable' if self.disable_public_sharing() else before
+        return SsmSweepResult(self.region, account, before, after)
@@ -1,11 +1,30 @@
 """Module containing classes that are used to find and delete resources"""
 
 # Standard Library imports
+from collections import namedtuple
 from dataclasses import dataclass, field
-from typing import Any, Collection, Optional
+from typing import Any, Collection, Dict, List, Optional
 
-# Third-party imports
-from botocore.exceptions import ClientError
+#  Compact inventory records, the attribute names mirror the boto3 resource attributes
+#  so the Delete and Update* classes can read either without further network I/O
+IgwRecord = namedtuple('IgwRecord', ['id'])
+SubnetRecord = namedtuple('SubnetRecord', ['id', 'default_for_az'])
+RouteTableRecord = namedtuple('RouteTableRecord', ['id', 'associations_attribute'])
+NaclRecord = namedtuple('NaclRecord', ['id', 'is_default', 'associations', 'entries'], defaults=(None,))
+#  The SG rules are kept to find the cross-group references, an older record without them is read as None
+SgRecord = namedtuple('SgRecord', ['id', 'group_name', 'ip_permissions', 'ip_permissions_egress'],
+                      defaults=(None, None))
+#  Dependents that block the VPC deletion, an ENI owned by a NAT gateway, a VPC endpoint or another
+#  AWS service is requester managed and goes away with its owner
+EniRecord = namedtuple('EniRecord', ['id', 'attachment_id', 'requester_managed'])
+VpcEndpointRecord = namedtuple('VpcEndpointRecord', ['id', 'state'])
+NatGatewayRecord = namedtuple('NatGatewayRecord', ['id', 'state'])
+PeeringRecord = namedtuple('PeeringRecord', ['id'])
+EgressOnlyIgwRecord = namedtuple('EgressOnlyIgwRecord', ['id'])
+RECORD_TYPES = {'igw': IgwRecord, 'subnet': SubnetRecord, 'route_table': RouteTableRecord, 'acl': NaclRecord,
+                'sgs': SgRecord, 'eni': EniRecord, 'endpoint': VpcEndpointRecord, 'nat_gateway': NatGatewayRecord,
+                'peering': PeeringRecord, 'eigw': EgressOnlyIgwRecord}
+PEERING_GONE_STATES = ('deleted', 'deleting', 'rejected', 'failed', 'expired')
 
 
 @dataclass
@@ -15,24 +34,73 @@ class Resource:
     and a region to return VPC related information.
     :param boto_resource: (required) Instantiated boto3 resource
     :param boto_client: (required) Instantiated boto3 client
+    :param region: (required) A string value containing the current region
+    :param inventory: (optional) Load the VPC resources as plain records in a single pass (default False)
     """
     boto_resource: Any
     boto_client: Any
     region: str
+    inventory: bool = False
     igw: Collection = field(init=False, repr=False)
     subnet: Collection = field(init=False, repr=False)
     route_table: Collection = field(init=False, repr=False)
     acl: Collection = field(init=False, repr=False)
     sgs: Collection = field(init=False, repr=False)
+    eni: Collection = field(init=False, repr=False)
+    endpoint: Collection = field(init=False, repr=False)
+    nat_gateway: Collection = field(init=False, repr=False)
+    peering: Collection = field(init=False, repr=False)
+    eigw: Collection = field(init=False, repr=False)
+
+    @classmethod
+    def from_records(cls, boto_resource: Any, boto_client: Any, region: str, vpc_id: str,
+                     records: Dict[str, List[Dict[str, Any]]]) -> 'Resource':
+        """
+        Build a Resource from saved inventory records (e.g. a plan file) without calling the AWS API.
+
+        :param boto_resource: (required) Instantiated boto3 resource
+        :param boto_client: (required) Instantiated boto3 client
+        :param region: (required) A string value containing the current region
+        :param vpc_id: (required) A string value containing the ID of the default VPC
+        :param records: (required) A dict with the records of every RECORD_TYPES key as dicts (a missing key,
+                        e.g. in an older plan file, is read as an empty list)
+        :return: An instantiated Resource in inventory mode
+        """
+        obj = cls.__new__(cls)  # skip __post_init__, the data is already known
+        obj.boto_resource, obj.boto_client, obj.region, obj.inventory = boto_resource, boto_client, region, True
+        obj.__dict__['vpc_id'] = vpc_id
+        for attr, record_type in RECORD_TYPES.items():
+            setattr(obj, attr, [record_type(**record) for record in records.get(attr, [])])
+        return obj
+
+    def to_records(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Serialize the inventory records so they can be saved (e.g. in a plan file).
+
+        :return: A dict with the records of every RECORD_TYPES key as dicts
+        """
+        return {attr: [record._asdict() for record in getattr(self, attr)] for attr in RECORD_TYPES}
 
     def __post_init__(self) -> None:
         """Populate the class attrs with data if a default VPC is found"""
         if self.vpc_id:
-            self.set_collection_data()
+            if self.inventory:
+                self.load_inventory()
+            else:
+                self.set_collection_data()
 
     @property
-    def vpc_id(self) -> str:
-        """Property that will provide the string value of the VPC associated with the region"""
+    def vpc_id(self) -> Optional[str]:
+        """
+        Property that will provide the string value of the VPC associated with the region.
+
+        The value is looked up once and cached on the instance, use invalidate_vpc_id()
+        once the VPC has been deleted so the next read reflects the new state. The value is kept
+        in the instance __dict__ rather than by functools.cached_property, which holds one lock
+        for every instance before Python 3.12 and would run the lookups of all the regions one at a time.
+        """
+        if 'vpc_id' in self.__dict__:
+            return self.__dict__['vpc_id']
         vpcs = self.boto_client.describe_vpcs(
             Filters=[
                 {
@@ -46,8 +114,12 @@ class Resource:
         )
 
         # add vpc's to instance attribute
-        for vpc in vpcs['Vpcs']:
-            return vpc['VpcId']
+        self.__dict__['vpc_id'] = next((vpc['VpcId'] for vpc in vpcs['Vpcs']), None)
+        return self.__dict__['vpc_id']
+
+    def invalidate_vpc_id(self) -> None:
+        """Drop the cached VPC ID so the next read of vpc_id calls the AWS API again"""
+        self.__dict__.pop('vpc_id', None)
 
     @property
     def current_vpc_resource(self) -> Any:
@@ -66,6 +138,7 @@ class Resource:
 
         :return: A boolean result if all calls were made successfully (True=success)
         """
+        from botocore.exceptions import ClientError  # botocore is already loaded by the boto_resource
         try:
             self.igw = self.current_vpc_resource.internet_gateways.all()
             _subnets = self.current_vpc_resource.subnets.all()
@@ -73,7 +146,81 @@ class Resource:
             self.route_table = self.current_vpc_resource.route_tables.all()
             self.acl = self.current_vpc_resource.network_acls.all()
             self.sgs = self.current_vpc_resource.security_groups.all()
+            self.load_dependents()
         except ClientError as err:
             raise ("ClientError: error=%s func=%s", err) from err
         else:
             return True
+
+    def _describe_all(self, operation: str, result_key: str, filters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Call a paginated describe operation once with a server-side filter and collect every page.
+
+        :param operation: (required) A string containing the boto3 client operation name (e.g. 'describe_subnets')
+        :param result_key: (required) A string containing the response key holding the items (e.g. 'Subnets')
+        :param filters: (required) A list of filter dicts passed in the API call
+        :return: A list containing all the items returned across the pages
+        """
+        paginator = self.boto_client.get_paginator(operation)
+        return [item for page in paginator.paginate(Filters=filters) for item in page[result_key]]
+
+    def load_inventory(self) -> bool:
+        """
+        This method is used to populate the class attr collections with plain records.
+        Each resource type is fetched once through the client API, filtered on the
+        current VPC ID, so reading the attrs afterwards makes no further API calls.
+
+        :return: A boolean result if all calls were made successfully (True=success)
+        """
+        vpc_filter = [{'Name': 'vpc-id', 'Values': [self.vpc_id]}]
+        self.igw = [IgwRecord(igw['InternetGatewayId']) for igw in self._describe_all(
+            'describe_internet_gateways', 'InternetGateways',
+            [{'Name': 'attachment.vpc-id', 'Values': [self.vpc_id]}])]
+        self.subnet = [SubnetRecord(subnet['SubnetId'], subnet['DefaultForAz']) for subnet in self._describe_all(
+            'describe_subnets', 'Subnets', vpc_filter) if subnet['DefaultForAz']]
+        self.route_table = [RouteTableRecord(rtb['RouteTableId'], rtb['Associations']) for rtb in self._describe_all(
+            'describe_route_tables', 'RouteTables', vpc_filter)]
+        self.acl = [NaclRecord(acl['NetworkAclId'], acl['IsDefault'], acl['Associations'],
+                               [{'RuleNumber': entry['RuleNumber'], 'Egress': entry['Egress']}
+                                for entry in acl['Entries']])
+                    for acl in self._describe_all('describe_network_acls', 'NetworkAcls', vpc_filter)]
+        self.sgs = [SgRecord(sg['GroupId'], sg['GroupName'], sg['IpPermissions'], sg['IpPermissionsEgress'])
+                    for sg in self._describe_all('describe_security_groups', 'SecurityGroups', vpc_filter)]
+        return self.load_dependents()
+
+    def load_dependents(self) -> bool:
+        """
+        This method is used to populate the attrs of the resources that block the VPC deletion with plain records.
+        Every type is fetched in bulk, once per VPC: ENIs, VPC endpoints, NAT gateways, peering connections
+        and egress-only IGWs. Resources already deleted are left out.
+
+        :return: A boolean result if all calls were made successfully (True=success)
+        """
+        vpc_filter = [{'Name': 'vpc-id', 'Values': [self.vpc_id]}]
+        endpoints = [endpoint for endpoint in self._describe_all('describe_vpc_endpoints', 'VpcEndpoints', vpc_filter)
+                     if endpoint['State'].lower() != 'deleted']
+        nat_gateways = [nat for nat in self._describe_all('describe_nat_gateways', 'NatGateways', vpc_filter)
+                        if nat['State'] not in ('deleted', 'failed')]
+        owned = {eni_id for endpoint in endpoints for eni_id in endpoint.get('NetworkInterfaceIds', [])}
+        owned.update(address['NetworkInterfaceId'] for nat in nat_gateways
+                     for address in nat.get('NatGatewayAddresses', []) if address.get('NetworkInterfaceId'))
+        self.endpoint = [VpcEndpointRecord(endpoint['VpcEndpointId'], endpoint['State'].lower())
+                         for endpoint in endpoints]
+        self.nat_gateway = [NatGatewayRecord(nat['NatGatewayId'], nat['State']) for nat in nat_gateways]
+        self.eni = [EniRecord(eni['NetworkInterfaceId'], eni.get('Attachment', {}).get('AttachmentId'),
+                              eni.get('RequesterManaged', False) or eni.get('InterfaceType', 'interface') != 'interface'
+                              or eni['NetworkInterfaceId'] in owned)
+                    for eni in self._describe_all('describe_network_interfaces', 'NetworkInterfaces', vpc_filter)]
+        peerings = {}
+        for side in ('requester', 'accepter'):
+            for peering in self._describe_all('describe_vpc_peering_connections', 'VpcPeeringConnections',
+                                              [{'Name': f'{side}-vpc-info.vpc-id', 'Values': [self.vpc_id]}]):
+                if peering['Status']['Code'] not in PEERING_GONE_STATES and self.vpc_id in (
+                        peering['RequesterVpcInfo'].get('VpcId'), peering['AccepterVpcInfo'].get('VpcId')):
+                    peerings[peering['VpcPeeringConnectionId']] = PeeringRecord(peering['VpcPeeringConnectionId'])
+        self.peering = list(peerings.values())
+        #  describe_egress_only_internet_gateways has no VPC filter, the attachments are matched here
+        self.eigw = [EgressOnlyIgwRecord(eigw['EgressOnlyInternetGatewayId']) for eigw in self._describe_all(
+            'describe_egress_only_internet_gateways', 'EgressOnlyInternetGateways', [])
+            if any(attachment.get('VpcId') == self.vpc_id for attachment in eigw.get('Attachments', []))]
+        return True
@@ -0,0 +1,180 @@
+"""Module containing a small dependency-graph executor used to schedule delete operations"""
+
+# Standard Library imports
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.utils import logger
+
+#  A task that waits on the StatusPoller is a generator, it yields the (kind, resource ID) it waits for and is
+#  sent back whether the resource is done; the runner decides how to wait (blocking thread or coroutine)
+TaskSteps = Generator[Tuple[str, str], bool, Any]
+
+
+def advance(steps: TaskSteps, value: Optional[bool] = None) -> Tuple[bool, Any]:
+    """
+    Run a generator task up to its next wait request.
+
+    :param steps: (required) The generator returned by the task
+    :param value: (optional) The outcome of the previous wait request, None to start the task
+    :return: A tuple (finished, value), value is the next wait request or, once finished, the task result
+    """
+    try:
+        return False, steps.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+class DependencyGraph:
+    """
+    Action-oriented class that runs tasks in dependency order.
+
+    Tasks are grouped into levels, every task of a level only depends on tasks of earlier levels,
+    and the tasks of each ready level run in parallel. A task whose dependencies did not all
+    succeed is skipped, so a dependent resource is never touched before its dependencies are gone.
+    A task returning a generator (see TaskSteps) has its wait requests answered by the poller.
+    """
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = '', completed: Iterable[str] = (),
+                 on_success: Optional[Callable[[str], None]] = None, poller: Any = None) -> None:
+        """
+        Initializer that takes in five optional params.
+
+        :param max_workers: (optional) The maximum number of tasks run at the same time within a level
+        :param thread_name_prefix: (optional) A string used to name the worker threads (e.g. the region)
+        :param completed: (optional) The names of tasks completed by a previous run, they succeed without running
+        :param on_success: (optional) A callable taking the task name, called after every task that succeeded
+        :param poller: (optional) The StatusPoller answering the wait requests of the generator tasks
+        """
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.completed = set(completed)
+        self.on_success = on_success
+        self.poller = poller
+        self.tasks: Dict[str, Tuple[Callable[[], Any], Tuple[str, ...]]] = {}
+        self.errors: Dict[str, Exception] = {}
+
+    def __repr__(self):
+        return f'DependencyGraph({self.max_workers}, {self.thread_name_prefix})'  # pragma: no cover
+
+    def add_task(self, name: str, func: Callable[[], Any], depends_on: Iterable[str] = ()) -> None:
+        """
+        Register a task in the graph.
+
+        :param name: (required) A unique string naming the task (e.g. 'subnet:subnet-123')
+        :param func: (required) A callable taking no args, a falsy return value or an exception marks it as failed
+        :param depends_on: (optional) The names of the tasks that need to succeed before this one runs
+        :return: None
+
+        :raise ValueError if a task with the same name was already registered
+        """
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already registered")
+        self.tasks[name] = (func, tuple(depends_on))
+
+    def levels(self) -> List[List[str]]:
+        """
+        Group the registered tasks into levels using Kahn's algorithm.
+
+        :return: A list of levels, each a list of task names that can run in parallel
+
+        :raise ValueError if a dependency is unknown or the graph contains a cycle
+        """
+        remaining = {}
+        for name, (_, depends_on) in self.tasks.items():
+            unknown = [dependency for dependency in depends_on if dependency not in self.tasks]
+            if unknown:
+                raise ValueError(f"Task '{name}' depends on unknown task(s): {unknown}")
+            remaining[name] = set(depends_on)
+
+        levels = []
+        while remaining:
+            ready = [name for name, depends_on in remaining.items() if not depends_on]
+            if not ready:
+                raise ValueError(f"Dependency cycle between task(s): {sorted(remaining)}")
+            levels.append(ready)
+            for name in ready:
+                del remaining[name]
+            for depends_on in remaining.values():
+                depends_on.difference_update(ready)
+        return levels
+
+    def is_completed(self, name: str) -> bool:
+        """
+        Check whether a previous run completed a task, it is then not run again.
+
+        :param name: (required) The name of the task
+        :return: A boolean result that represents whether the task was completed by a previous run
+        """
+        if name in self.completed:
+            logger.info("[!] Task '%s' was completed by a previous run, skipping", name)
+            return True
+        return False
+
+    def record_error(self, name: str, err: Exception) -> bool:
+        """
+        Record the error a task raised instead of raising it.
+
+        :param name: (required) The name of the task
+        :param err: (required) The exception raised by the task
+        :return: False, the task failed
+        """
+        logger.error("[-] Task '%s' failed: %s", name, err)
+        self.errors[name] = err
+        return False
+
+    def record_result(self, name: str, result: Any) -> bool:
+        """
+        Record the value a task returned, on_success is called when it succeeded.
+
+        :param name: (required) The name of the task
+        :param result: (required) The value returned by the task, a falsy value marks it as failed
+        :return: A boolean result that represents whether the task succeeded
+        """
+        succeeded = bool(result)
+        if succeeded and self.on_success:
+            self.on_success(name)
+        return succeeded
+
+    def run_task(self, name: str) -> bool:
+        """
+        Run a single task and record its error (if any) instead of raising it.
+
+        The wait requests of a generator task block the calling thread on the poller.
+        :param name: (required) The name of the task to run
+        :return: A boolean result that represents whether the task succeeded
+        """
+        if self.is_completed(name):
+            return True
+        try:
+            result = self.tasks[name][0]()
+            if inspect.isgenerator(result):
+                steps = result
+                finished, result = advance(steps)
+                while not finished:
+                    finished, result = advance(steps, self.poller.wait(*result))
+        except Exception as err:
+            return self.record_error(name, err)
+        return self.record_result(name, result)
+
+    def run(self) -> Dict[str, bool]:
+        """
+        Run every level in order, the tasks of a level in parallel.
+
+        :return: A dict containing every task name and whether it succeeded (skipped tasks are False)
+        """
+        results: Dict[str, bool] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix) as executor:
+            for level in self.levels():
+                runnable = []
+                for name in level:
+                    failed = [dependency for dependency in self.tasks[name][1] if not results[dependency]]
+                    if failed:
+                        logger.error("[-] Skipping '%s', its dependencies did not complete: %s", name, failed)
+                        results[name] = False
+                    else:
+                        runnable.append(name)
+                results.update(zip(runnable, executor.map(self.run_task, runnable)))
+        return results
@@ -0,0 +1,187 @@
+"""Module containing the run-scoped cache of the describe responses registered on every boto3 client"""
+
+# Standard Library imports
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+MAX_ENTRIES = 512
+MUTATION_WINDOW = 5.0  # seconds, EC2 reads are eventually consistent and may still miss a recent write
+READ_PREFIXES = ('Describe', 'Get', 'List')
+#  The resource types the cached responses are grouped by, a mutating call invalidates the entries of
+#  the longest type its operation name contains (e.g. 'RevokeSecurityGroupIngress' -> 'SecurityGroup')
+RESOURCE_TYPES = ('Vpc', 'Subnet', 'RouteTable', 'NetworkAcl', 'SecurityGroup', 'InternetGateway',
+                  'EgressOnlyInternetGateway', 'NatGateway', 'VpcEndpoint', 'NetworkInterface',
+                  'VpcPeeringConnection', 'Address', 'ServiceSetting')
+#  The other resource types a mutation changes as a side effect (e.g. a NAT gateway releases its ENI)
+SIDE_EFFECTS = {
+    'NatGateway': ('NetworkInterface', 'Address'),
+    'VpcEndpoint': ('NetworkInterface',),
+    'Subnet': ('NetworkAcl', 'RouteTable', 'NetworkInterface'),
+    'InternetGateway': ('Vpc',),
+}
+
+CACHE_HIT_KEY = 'delete_aws_resources_cache_hit'
+_CACHE_KEY = 'delete_aws_resources_cache_key'
+_GENERATION_KEY = 'delete_aws_resources_cache_generation'
+
+CacheKey = Tuple[Optional[str], str, str]
+
+_local = threading.local()
+
+
+@contextmanager
+def bypass_describe_cache() -> Iterator[None]:
+    """
+    Context manager sending the describe calls of the calling thread to AWS and leaving the cache untouched.
+
+    Used where the live state is the point of the call (e.g. polling a deletion or verifying a region).
+    """
+    previous = getattr(_local, 'bypass', False)
+    _local.bypass = True
+    try:
+        yield
+    finally:
+        _local.bypass = previous
+
+
+def resource_type(operation: str) -> Optional[str]:
+    """Return the RESOURCE_TYPES entry an operation works on, None when it is not known"""
+    matches = [name for name in RESOURCE_TYPES if name in operation]
+    return max(matches, key=len) if matches else None
+
+
+def _normalize(params: Dict[str, Any]) -> str:
+    """Serialize API params the same way whatever the order of the keys"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class DescribeCache:
+    """
+    Action-oriented class registered on the botocore events of the clients of one (service, region, account).
+
+    The parsed responses of the read calls are kept per (region, operation, normalized params) in an LRU
+    and answered from it on 'before-call', so no request is sent. Every mutating call, whether it succeeds,
+    fails or never gets a response, drops the entries of the resource type it changed (unknown types drop
+    the whole region) before it is sent and again once it returns. The reads of that type are then not
+    stored for mutation_window seconds, so an eventually consistent response that predates one of our own
+    writes is never cached.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, mutation_window: float = MUTATION_WINDOW) -> None:
+        """
+        Initializer that takes in two optional params.
+
+        :param max_entries: (optional) The number of responses kept, the least recently used goes first
+        :param mutation_window: (optional) The seconds after a mutating call during which the reads of its type
+            are not stored
+        """
+        self.max_entries = max_entries
+        self.mutation_window = mutation_window
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[CacheKey, Dict[str, Any]]' = OrderedDict()
+        self._generation = 0  # bumped by every invalidation, a read that overlapped one is not stored
+        self._mutated: Dict[Tuple[Optional[str], Optional[str]], float] = {}  # (region, type) -> last mutation
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'DescribeCache({len(self._entries)}, {self.max_entries})'  # pragma: no cover
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, region: Optional[str], operation: str) -> None:
+        """
+        Drop the cached responses a mutating call makes stale.
+
+        :param region: (required) A string containing the region of the call
+        :param operation: (required) A string containing the operation name of the mutating call
+        :return: None
+        """
+        changed = resource_type(operation)
+        stale = {changed, *SIDE_EFFECTS.get(changed, ())}
+        with self._lock:
+            self._generation += 1
+            for name in ({None} if changed in (None, 'Vpc') else stale):
+                self._mutated[(region, name)] = time.monotonic()
+            for key in list(self._entries):
+                if key[0] == region and (changed is None or changed == 'Vpc' or resource_type(key[1]) in stale):
+                    del self._entries[key]
+
+    def _recently_mutated(self, region: Optional[str], operation: str) -> bool:
+        """Return whether a mutation of the type of a read (or of its whole region) is within mutation_window"""
+        since = time.monotonic() - self.mutation_window
+        return any(self._mutated.get((region, name), since) > since for name in (None, resource_type(operation)))
+
+    def remember_params(self, params: Dict[str, Any], model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+        """'before-parameter-build' handler, keys the read calls on their API params"""
+        if model.name.startswith(READ_PREFIXES) and not getattr(_local, 'bypass', False):
+            context[_CACHE_KEY] = (context.get('client_region'), model.name, _normalize(params))
+
+    def before_call(self, model: Any, context: Dict[str, Any], **kwargs: Any) -> Optional[tuple]:
+        """
+        'before-call' handler, answers a read call from the cache (a returned response skips the request)
+        and invalidates before a mutating call is sent, whatever its outcome turns out to be
+        """
+        key = context.get(_CACHE_KEY)
+        if key is None:
+            if not model.name.startswith(READ_PREFIXES):
+                self.invalidate(context.get('client_region'), model.name)
+            return None
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is None:
+                self.misses += 1
+                context[_GENERATION_KEY] = self._generation
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        from botocore.awsrequest import AWSResponse  # botocore is already loaded by the calling client
+        context[CACHE_HIT_KEY] = True
+        return AWSResponse('', 200, {}, None), copy.deepcopy(parsed)
+
+    def after_call(self, parsed: Dict[str, Any], model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+        """'after-call' handler, stores the read responses and invalidates again once a mutating call returned"""
+        if context.get(CACHE_HIT_KEY):
+            return
+        key = context.get(_CACHE_KEY)
+        if key is not None:
+            if 'Error' in parsed:
+                return
+            with self._lock:
+                if context.get(_GENERATION_KEY) != self._generation or self._recently_mutated(*key[:2]):
+                    return
+                self._entries[key] = copy.deepcopy(parsed)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        elif not model.name.startswith(READ_PREFIXES):
+            self.invalidate(context.get('client_region'), model.name)
+
+
+def install_describe_cache(client: Any, cache: DescribeCache) -> Any:
+    """
+    Register a DescribeCache on a boto3 client, its 'before-call' handler runs before any other.
+
+    :param client: (required) An instantiated boto3 client (for a resource pass resource.meta.client)
+    :param cache: (required) The DescribeCache shared by the clients of the same (service, region, account)
+    :return: The same client, to allow chaining
+    """
+    service_id = client.meta.service_model.service_id.hyphenize()
+    client.meta.events.register(f'before-parameter-build.{service_id}', cache.remember_params,
+                                unique_id='delete-aws-resources-cache-params')
+    client.meta.events.register_first(f'before-call.{service_id}', cache.before_call,
+                                      unique_id='delete-aws-resources-cache-before')
+    client.meta.events.register(f'after-call.{service_id}', cache.after_call,
+                                unique_id='delete-aws-resources-cache-after')
+    return client
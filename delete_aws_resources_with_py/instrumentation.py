@@ -0,0 +1,229 @@
+"""Module containing the per API call instrumentation registered on every boto3 client"""
+
+# Standard Library imports
+import bisect
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.utils import logger
+
+CallRecord = namedtuple('CallRecord', ['operation', 'region', 'latency', 'retries', 'error_code', 'timestamp'])
+
+# Prometheus style upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_START_KEY = 'delete_aws_resources_start'
+_OPERATION_KEY = 'delete_aws_resources_operation'
+
+
+class Histogram:
+    """Cumulative latency histogram of one (operation, region) pair"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """
+        Initializer that takes in one optional param.
+
+        :param buckets: (optional) A sorted tuple containing the upper bound of every bucket
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is the +Inf bucket
+        self.count = 0
+        self.total = 0.0
+        self.retries = 0
+        self.errors = 0
+
+    def __repr__(self):
+        return f'Histogram({self.count}, {self.total})'  # pragma: no cover
+
+    def observe(self, record: CallRecord) -> None:
+        """Add a call to the histogram"""
+        self.counts[bisect.bisect_left(self.buckets, record.latency)] += 1
+        self.count += 1
+        self.total += record.latency
+        self.retries += record.retries
+        self.errors += record.error_code is not None
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile from the buckets (upper bound of the bucket holding it).
+
+        :param q: (required) A float between 0 and 1 (e.g. 0.95)
+        :return: The estimated latency in seconds, the largest finite bound for the +Inf bucket
+        """
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class CallRecorder:
+    """
+    Action-oriented class registered on the botocore 'before-call' and 'after-call' events.
+
+    Every call is recorded with its operation, region, latency, retry count and error code,
+    and aggregated in one Histogram per (operation, region).
+    """
+
+    def __init__(self) -> None:
+        """Initializer that takes in no params"""
+        self.records: List[CallRecord] = []
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'CallRecorder({len(self.records)})'  # pragma: no cover
+
+    def record(self, record: CallRecord) -> None:
+        """Store a call and add it to its histogram"""
+        with self._lock:
+            self.records.append(record)
+            self.histograms.setdefault((record.operation, record.region), Histogram()).observe(record)
+
+    def reset(self) -> None:
+        """Drop every recorded call"""
+        with self._lock:
+            self.records, self.histograms = [], {}
+
+    @staticmethod
+    def before_call(model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+        """'before-call' handler, stamps the operation and start time on the request context"""
+        context[_OPERATION_KEY] = model.name
+        context[_START_KEY] = time.perf_counter()
+
+    def _finish(self, context: Dict[str, Any], error_code: Optional[str], retries: int) -> None:
+        """Record the call whose operation and start time were stamped on the request context"""
+        if _START_KEY not in context:
+            return
+        latency = time.perf_counter() - context.pop(_START_KEY)
+        self.record(CallRecord(context[_OPERATION_KEY], context.get('client_region') or 'global', latency, retries,
+                               error_code, time.time()))
+
+    def after_call(self, parsed: Dict[str, Any], context: Dict[str, Any], **kwargs: Any) -> None:
+        """'after-call' handler, records the call with the retries and error code of the parsed response"""
+        self._finish(context, parsed.get('Error', {}).get('Code'),
+                     parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0))
+
+    def after_call_error(self, exception: Exception, context: Dict[str, Any], **kwargs: Any) -> None:
+        """'after-call-error' handler, records calls that failed without a response (e.g. connection errors)"""
+        self._finish(context, type(exception).__name__, 0)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Aggregate the histograms.
+
+        :return: A list of dicts (one per operation and region) with the count, p50, p95, total latency,
+                 retries and errors, sorted by total latency
+        """
+        with self._lock:
+            rows = [{'operation': operation, 'region': region, 'count': hist.count, 'p50': hist.quantile(0.5),
+                     'p95': hist.quantile(0.95), 'total': round(hist.total, 4), 'retries': hist.retries,
+                     'errors': hist.errors} for (operation, region), hist in self.histograms.items()]
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def log_summary(self, top: int = 10) -> None:
+        """
+        Log out the slowest operations of the run.
+
+        :param top: (optional) The number of (operation, region) rows to log
+        :return: None
+        """
+        rows = self.summary()
+        logger.info("[!] %s AWS API call(s) recorded", sum(row['count'] for row in rows))
+        for row in rows[:top]:
+            logger.info("[!] %s (%s): count=%s p50<=%ss p95<=%ss total=%ss retries=%s errors=%s", row['operation'],
+                        row['region'], row['count'], row['p50'], row['p95'], row['total'], row['retries'],
+                        row['errors'])
+
+    def write_jsonl(self, metrics_file: str) -> None:
+        """
+        Write every recorded call as one JSON line.
+
+        :param metrics_file: (required) A string containing the path of the file to write
+        :return: None
+        """
+        with self._lock:
+            records = list(self.records)
+        with open(metrics_file, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record._asdict()) + '\n')
+
+    def write_prometheus(self, metrics_file: str) -> None:
+        """
+        Write the histograms in the Prometheus text exposition format (node exporter textfile collector).
+
+        :param metrics_file: (required) A string containing the path of the file to write
+        :return: None
+        """
+        lines = ['# HELP delete_aws_resources_api_call_seconds Latency of the AWS API calls.',
+                 '# TYPE delete_aws_resources_api_call_seconds histogram']
+        retries = ['# HELP delete_aws_resources_api_call_retries_total Retries of the AWS API calls.',
+                   '# TYPE delete_aws_resources_api_call_retries_total counter']
+        errors = ['# HELP delete_aws_resources_api_call_errors_total Failed AWS API calls.',
+                  '# TYPE delete_aws_resources_api_call_errors_total counter']
+        with self._lock:
+            for (operation, region), hist in sorted(self.histograms.items()):
+                labels = f'operation="{operation}",region="{region}"'
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ('+Inf',), hist.counts):
+                    cumulative += count
+                    lines.append(f'delete_aws_resources_api_call_seconds_bucket{{{labels},le="{bound}"}} '
+                                 f'{cumulative}')
+                lines.append(f'delete_aws_resources_api_call_seconds_sum{{{labels}}} {hist.total}')
+                lines.append(f'delete_aws_resources_api_call_seconds_count{{{labels}}} {hist.count}')
+                retries.append(f'delete_aws_resources_api_call_retries_total{{{labels}}} {hist.retries}')
+                errors.append(f'delete_aws_resources_api_call_errors_total{{{labels}}} {hist.errors}')
+        with open(f'{metrics_file}.tmp', 'w') as f:
+            f.write('\n'.join(lines + retries + errors) + '\n')
+        os.replace(f'{metrics_file}.tmp', metrics_file)  # the collector must never read a partial file
+
+    def export(self, metrics_file: str, metrics_format: str = 'jsonl') -> None:
+        """
+        Export the recorded calls.
+
+        :param metrics_file: (required) A string containing the path of the file to write
+        :param metrics_format: (optional) A string containing the format (i.e., 'jsonl' or 'prometheus')
+        :return: None
+
+        :raise ValueError for an unknown format
+        """
+        if metrics_format == 'jsonl':
+            self.write_jsonl(metrics_file)
+        elif metrics_format == 'prometheus':
+            self.write_prometheus(metrics_file)
+        else:
+            raise ValueError(f"Unknown metrics format: '{metrics_format}'")
+        logger.info("[+] API call metrics written to '%s'", metrics_file)
+
+
+_recorder = CallRecorder()
+
+
+def get_recorder() -> CallRecorder:
+    """Return the CallRecorder shared by every client"""
+    return _recorder
+
+
+def install_instrumentation(client: Any, recorder: Optional[CallRecorder] = None) -> Any:
+    """
+    Register the CallRecorder handlers on a boto3 client.
+
+    :param client: (required) An instantiated boto3 client (for a resource pass resource.meta.client)
+    :param recorder: (optional) The CallRecorder to use, the shared one when None
+    :return: The same client, to allow chaining
+    """
+    recorder = recorder or _recorder
+    service_id = client.meta.service_model.service_id.hyphenize()
+    client.meta.events.register(f'before-call.{service_id}', recorder.before_call,
+                                unique_id='delete-aws-resources-instrumentation-before')
+    client.meta.events.register(f'after-call.{service_id}', recorder.after_call,
+                                unique_id='delete-aws-resources-instrumentation-after')
+    client.meta.events.register(f'after-call-error.{service_id}', recorder.after_call_error,
+                                unique_id='delete-aws-resources-instrumentation-error')
+    return client
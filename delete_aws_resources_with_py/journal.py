@@ -0,0 +1,129 @@
+"""Module containing the append-only journal used to checkpoint and resume sweeps"""
+
+# Standard Library imports
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Set, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.utils import logger
+
+STEP_REGION = 'region'  # recorded once every step of a region is done
+STEP_SSM = 'ssm'
+STEP_SG_RULES = 'sg_rules'
+STEP_NACL_RULES = 'nacl_rules'
+
+JournalKey = Tuple[str, Optional[str], str]
+
+
+class Journal:
+    """
+    Action-oriented class that appends every completed step to a JSON lines file.
+
+    Each line holds the action, account, region and step (e.g. 'ssm', 'igw:igw-123', 'vpc:vpc-123').
+    Lines are flushed and synced one by one, so a sweep killed at any point can be resumed from
+    the steps the file already shows as done.
+    """
+
+    def __init__(self, journal_file: str, resume: bool = False) -> None:
+        """
+        Initializer that takes in one required and one optional param.
+
+        :param journal_file: (required) A string containing the path of the journal file
+        :param resume: (optional) Load the steps already in the file, otherwise the file is started over
+        """
+        self.journal_file = journal_file
+        self._done: Set[Tuple[str, Optional[str], str, str]] = set()
+        self._lock = threading.Lock()
+        if resume and os.path.exists(journal_file):
+            self._load()
+        else:
+            open(journal_file, 'w').close()
+
+    def __repr__(self):
+        return f'Journal({self.journal_file})'  # pragma: no cover
+
+    def _load(self) -> None:
+        """Read the steps of a previous sweep, a line cut short by a crash is ignored"""
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("[!] Ignoring a truncated line in journal '%s'", self.journal_file)
+                    continue
+                self._done.add((entry['action'], entry['account'], entry['region'], entry['step']))
+        logger.info("[!] Resuming from journal '%s' with %s completed step(s)", self.journal_file, len(self._done))
+
+    def record(self, action: str, account: Optional[str], region: str, step: str) -> None:
+        """
+        Append a completed step to the journal.
+
+        :param action: (required) A string containing the option of the sweep (i.e., 'delete' or 'modify')
+        :param account: (required) A string containing the account ID, None for the ambient account
+        :param region: (required) A string containing the region
+        :param step: (required) A string naming the completed step
+        :return: None
+        """
+        line = json.dumps({'ts': datetime.now(timezone.utc).isoformat(), 'action': action, 'account': account,
+                           'region': region, 'step': step})
+        with self._lock:
+            with open(self.journal_file, 'a') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._done.add((action, account, region, step))
+
+    def is_done(self, action: str, account: Optional[str], region: str, step: str) -> bool:
+        """
+        Check whether a step is recorded in the journal.
+
+        :return: A boolean result that represents whether the step was completed by a previous run
+        """
+        return (action, account, region, step) in self._done
+
+    def done_steps(self, action: str, account: Optional[str], region: str) -> Set[str]:
+        """
+        List the steps of a region recorded in the journal.
+
+        :return: A set containing the names of the completed steps
+        """
+        with self._lock:
+            return {step for (a, acct, r, step) in self._done if (a, acct, r) == (action, account, region)}
+
+    def for_region(self, action: str, account: Optional[str], region: str) -> 'RegionJournal':
+        """Return a view of the journal bound to one region"""
+        return RegionJournal(self, action, account, region)
+
+
+class RegionJournal:
+    """Journal view bound to the (action, account, region) a worker is processing"""
+
+    def __init__(self, journal: Journal, action: str, account: Optional[str], region: str) -> None:
+        """
+        Initializer that takes in four required params.
+
+        :param journal: (required) The shared Journal
+        :param action: (required) A string containing the option of the sweep (i.e., 'delete' or 'modify')
+        :param account: (required) A string containing the account ID, None for the ambient account
+        :param region: (required) A string containing the region
+        """
+        self.journal = journal
+        self.key: JournalKey = (action, account, region)
+
+    def __repr__(self):
+        return f'RegionJournal({self.journal}, {self.key})'  # pragma: no cover
+
+    def record(self, step: str) -> None:
+        """Append a completed step of the region to the journal"""
+        self.journal.record(*self.key, step)
+
+    def is_done(self, step: str) -> bool:
+        """Check whether a step of the region is recorded in the journal"""
+        return self.journal.is_done(*self.key, step)
+
+    def done_steps(self) -> Set[str]:
+        """List the steps of the region recorded in the journal"""
+        return self.journal.done_steps(*self.key)
@@ -0,0 +1,258 @@
+"""Module containing the Lambda handler used to run the sweep from an EventBridge (account vending) event"""
+
+# Standard Library imports
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Local App imports
+from delete_aws_resources_with_py.accounts import AccountSession
+from delete_aws_resources_with_py.errors import UserArgNotFoundError
+from delete_aws_resources_with_py.main import RegionResult, build_work_units, process_region
+from delete_aws_resources_with_py.session_pool import clear_describe_caches
+from delete_aws_resources_with_py.status_poller import set_wait_deadline
+from delete_aws_resources_with_py.utils import create_boto3, create_logger, get_settings, logger
+
+WorkUnit = namedtuple('WorkUnit', ['account', 'region'])
+
+SAFETY_MARGIN_MS = 60000  # no unit is started once less than this (plus the slowest batch) is left
+MAX_HAND_OFFS = 20  # follow-up invocations chained by one event, guards against a sweep that never ends
+ACTIONS = ('delete', 'modify')
+
+
+class WorkQueue(ABC):
+    """Abstract class for the queue the handler takes its account x region units from"""
+
+    @abstractmethod
+    def put(self, units: Iterable[WorkUnit]) -> None:
+        """Add units at the end of the queue"""
+        pass
+
+    @abstractmethod
+    def get(self, count: int) -> List[WorkUnit]:
+        """Take up to count units from the front of the queue, an empty list once it is empty"""
+        pass
+
+    @abstractmethod
+    def drain(self) -> List[WorkUnit]:
+        """Take every unit left in the queue"""
+        pass
+
+
+class InMemoryQueue(WorkQueue):
+    """WorkQueue kept in memory, seeded from the invocation event and drained into the follow-up one"""
+
+    def __init__(self, units: Iterable[WorkUnit] = ()) -> None:
+        """
+        Initializer that takes in one optional param.
+
+        :param units: (optional) The units the queue starts with
+        """
+        self._units = deque(units)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'InMemoryQueue({len(self._units)})'  # pragma: no cover
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def put(self, units: Iterable[WorkUnit]) -> None:
+        with self._lock:
+            self._units.extend(units)
+
+    def get(self, count: int) -> List[WorkUnit]:
+        with self._lock:
+            return [self._units.popleft() for _ in range(min(count, len(self._units)))]
+
+    def drain(self) -> List[WorkUnit]:
+        with self._lock:
+            units, self._units = list(self._units), deque()
+            return units
+
+
+def invoke_follow_up(payload: Dict[str, Any], context: Any) -> None:
+    """
+    Hand the checkpoint over to a new asynchronous invocation of the running function.
+
+    :param payload: (required) The event of the follow-up invocation (see SweepHandler.checkpoint)
+    :param context: (required) The Lambda context of the running invocation
+    :return: None
+    """
+    create_boto3(service='lambda', boto_type='boto_client').invoke(
+        FunctionName=context.invoked_function_arn, InvocationType='Event', Payload=json.dumps(payload).encode())
+    logger.info("[+] Handed %s unit(s) off to a follow-up invocation", len(payload['units']))
+
+
+class SweepHandler:
+    """
+    Action-oriented class that runs queued account x region units within the invocation time.
+
+    Units are taken in batches of max_workers and each batch runs concurrently. Before a batch is
+    started the remaining invocation time is checked against the safety margin plus the slowest batch
+    so far; once it runs short the units not started are checkpointed and handed off to a follow-up invocation.
+    The deletion waits (e.g. a NAT gateway) are capped at the remaining time minus the safety margin, so a
+    batch never runs into the hard timeout; a unit that failed because its waits were cut short is handed off
+    with the others and picked up again by the follow-up.
+    """
+
+    def __init__(self, action: str, queue: WorkQueue, role_name: Optional[str] = None,
+                 hand_off: Callable[[Dict[str, Any], Any], None] = invoke_follow_up,
+                 safety_margin_ms: int = SAFETY_MARGIN_MS, max_workers: Optional[int] = None,
+                 expiry_threshold: Optional[int] = None) -> None:
+        """
+        Initializer that takes in two required and five optional params.
+
+        :param action: (required) A string containing the option of the sweep (i.e., 'delete' or 'modify')
+        :param queue: (required) The WorkQueue holding the units to process
+        :param role_name: (optional) The name of the role assumed in the accounts of the units (required with accounts)
+        :param hand_off: (optional) A callable taking the checkpoint and the Lambda context, it starts the follow-up
+        :param safety_margin_ms: (optional) The invocation time in milliseconds kept free for the checkpoint
+        :param max_workers: (optional) The number of units processed at the same time (the max_workers setting)
+        :param expiry_threshold: (optional) Renew the assumed role credentials when fewer seconds than this are left
+        """
+        settings = get_settings()
+        self.action = action
+        self.queue = queue
+        self.role_name = role_name
+        self.hand_off = hand_off
+        self.safety_margin_ms = safety_margin_ms
+        self.max_workers = max_workers or settings.max_workers
+        self.expiry_threshold = expiry_threshold or settings.credential_expiry_threshold
+        self.accounts: Dict[str, AccountSession] = {}
+
+    def __repr__(self):
+        return f'SweepHandler({self.action}, {self.queue})'  # pragma: no cover
+
+    def _account(self, account_id: Optional[str]) -> Optional[AccountSession]:
+        """Return the AccountSession of an account, shared by all its units, None for the ambient account"""
+        if account_id is None:
+            return None
+        return self.accounts.setdefault(account_id, AccountSession(account_id, self.role_name, self.expiry_threshold))
+
+    def _process_unit(self, unit: WorkUnit) -> RegionResult:
+        """Process one unit, an unexpected error only fails this unit"""
+        try:
+            return process_region(unit.region, self.action, account=self._account(unit.account))
+        except Exception as err:
+            logger.error("[-] Region: '%s' raised an unexpected error: %s", unit.region, err)
+            return RegionResult(unit.region, 'failed', unit.account)
+
+    def checkpoint(self, units: List[WorkUnit], hand_offs: int) -> Dict[str, Any]:
+        """
+        Build the event of the follow-up invocation.
+
+        :param units: (required) The units left in the queue
+        :param hand_offs: (required) The number of hand-offs that led to the running invocation
+        :return: A dict containing the action, role name, leftover units and the hand-off count
+        """
+        return {'action': self.action, 'role_name': self.role_name, 'hand_offs': hand_offs + 1,
+                'units': [unit._asdict() for unit in units]}
+
+    def run(self, context: Any, hand_offs: int = 0) -> Dict[str, Any]:
+        """
+        Process queued units until the queue is empty or the invocation runs short of time.
+
+        :param context: (required) The Lambda context, only get_remaining_time_in_millis() is used
+        :param hand_offs: (optional) The number of hand-offs that led to the running invocation
+        :return: A dict containing the RegionResults, the number of leftover units and whether they were handed off
+        """
+        results: List[RegionResult] = []
+        slowest_batch_ms = 0.0
+        deadline = time.monotonic() + (context.get_remaining_time_in_millis() - self.safety_margin_ms) / 1000
+        set_wait_deadline(deadline)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='unit') as executor:
+                while context.get_remaining_time_in_millis() > self.safety_margin_ms + slowest_batch_ms:
+                    batch = self.queue.get(self.max_workers)
+                    if not batch:
+                        break
+                    for unit in batch:  # sessions are created here, the workers only read them
+                        self._account(unit.account)
+                    start = time.monotonic()
+                    batch_results = list(executor.map(self._process_unit, batch))
+                    slowest_batch_ms = max(slowest_batch_ms, (time.monotonic() - start) * 1000)
+                    cut_short = time.monotonic() >= deadline
+                    for unit, result in zip(batch, batch_results):
+                        if cut_short and result.status == 'failed':
+                            self.queue.put([unit])  # the deadline stopped its waits, the follow-up retries it
+                        else:
+                            results.append(result)
+        finally:
+            set_wait_deadline(None)
+
+        leftover = self.queue.drain()
+        handed_off = False
+        if leftover and hand_offs >= MAX_HAND_OFFS:
+            logger.error("[-] %s unit(s) left after %s hand-offs, not handing them off again", len(leftover),
+                         hand_offs)
+        elif leftover:
+            logger.warning("[!] %s ms left, checkpointing %s unit(s)", context.get_remaining_time_in_millis(),
+                           len(leftover))
+            self.hand_off(self.checkpoint(leftover, hand_offs), context)
+            handed_off = True
+        return {'results': [result._asdict() for result in results], 'remaining': len(leftover),
+                'handed_off': handed_off}
+
+
+def _accounts_from_event(event: Dict[str, Any]) -> List[str]:
+    """
+    Find the account IDs to sweep in an invocation event.
+
+    :param event: (required) Either a dict with an 'accounts' list or an EventBridge event of a Control Tower
+                  'CreateManagedAccount' or an Organizations 'CreateAccountResult'
+    :return: A list of account IDs, empty to sweep the account the function runs in
+    """
+    if event.get('accounts'):
+        return list(event['accounts'])
+    details = event.get('detail', {}).get('serviceEventDetails', {})
+    account_id = (details.get('createManagedAccountStatus', {}).get('account', {}).get('accountId') or
+                  details.get('createAccountStatus', {}).get('accountId'))
+    return [account_id] if account_id else []
+
+
+def handler(event: Dict[str, Any], context: Any, queue: Optional[WorkQueue] = None,
+            hand_off: Callable[[Dict[str, Any], Any], None] = invoke_follow_up) -> Dict[str, Any]:
+    """
+    Lambda entry point.
+
+    A first invocation builds the account x region units from the event (the account created by an account
+    vending event, an 'accounts' list, or the account the function runs in); a follow-up invocation carries
+    the leftover 'units' of the previous one. The action and role name come from the event or the
+    SWEEP_ACTION and SWEEP_ROLE_NAME environment variables.
+
+    :param event: (required) The invocation event
+    :param context: (required) The Lambda context
+    :param queue: (optional) The WorkQueue to use, an InMemoryQueue seeded from the event when omitted
+    :param hand_off: (optional) A callable taking the checkpoint and the context, it starts the follow-up invocation
+    :return: A dict containing the RegionResults, the number of leftover units and whether they were handed off
+
+    :raise A custom error (UserArgNotFoundError) when the action is neither 'delete' nor 'modify'
+    :raise ValueError if the event names accounts and no role name is given
+    """
+    create_logger()
+    clear_describe_caches()  # a warm container keeps the pool, the cached responses belong to the previous run
+    action = event.get('action') or os.environ.get('SWEEP_ACTION', 'delete')
+    role_name = event.get('role_name') or os.environ.get('SWEEP_ROLE_NAME')
+    if action not in ACTIONS:
+        raise UserArgNotFoundError
+    sweep = SweepHandler(action, queue if queue is not None else InMemoryQueue(), role_name=role_name,
+                         hand_off=hand_off)
+    failed: List[RegionResult] = []
+    if 'units' in event:
+        sweep.queue.put(WorkUnit(unit['account'], unit['region']) for unit in event['units'])
+    else:
+        accounts = _accounts_from_event(event)
+        if accounts and not role_name:
+            raise ValueError('A role name is required to sweep other accounts')
+        units, failed = build_work_units([sweep._account(account_id) for account_id in accounts] or None)
+        sweep.queue.put(WorkUnit(account.account_id if account else None, current_region)
+                        for account, current_region in units)
+    summary = sweep.run(context, hand_offs=event.get('hand_offs', 0))
+    summary['results'] += [result._asdict() for result in failed]
+    return summary
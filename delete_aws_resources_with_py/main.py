@@ -3,16 +3,23 @@
 # !/usr/bin/env python
 
 # Standard Library imports
-from typing import List
-from collections import namedtuple
+import asyncio
+import json
+import optparse
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import namedtuple, Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 # Local app imports
 from delete_aws_resources_with_py.utils import (
     logger,
     create_boto3,
-    get_args,
-    SKIP_REGION_LIST,
+    get_options,
+    get_settings,
+    create_logger,
 )
 from delete_aws_resources_with_py.resource_updates import (
     UpdateNaclResource,
@@ -21,13 +28,61 @@ from delete_aws_resources_with_py.resource_updates import (
 from delete_aws_resources_with_py.resource_delete import Delete
 from delete_aws_resources_with_py.default_resources import Resource
 from delete_aws_resources_with_py.errors import NoDefaultVpcExistsError, UserArgNotFoundError
-from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference
+from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference, SsmSweepResult
+from delete_aws_resources_with_py.accounts import AccountSession, Credentials
+from delete_aws_resources_with_py.session_pool import configure_session_pool
+from delete_aws_resources_with_py.instrumentation import get_recorder
+from delete_aws_resources_with_py.state_cache import RegionStateCache
+from delete_aws_resources_with_py.async_engine import AsyncEngine
+from delete_aws_resources_with_py.journal import (
+    Journal,
+    RegionJournal,
+    STEP_NACL_RULES,
+    STEP_REGION,
+    STEP_SG_RULES,
+    STEP_SSM
+)
+from delete_aws_resources_with_py.planner import (
+    build_plan,
+    build_region_plan,
+    read_plan,
+    resource_from_plan,
+    write_plan
+)
+from delete_aws_resources_with_py.verification import (
+    Verifier,
+    VerificationResult,
+    format_compliance_matrix,
+    passed,
+    summarize,
+    write_compliance_matrix
+)
 
 
 #  VPC resources created by AWS 'https://docs.aws.amazon.com/vpc/latest/userguide/default-vpc.html'
 
+RegionResult = namedtuple('RegionResult', ['region', 'status', 'account'], defaults=(None,))
+
+
+def _modify_steps(resource_obj: Resource, default_sg_rules: Optional[Dict[str, list]] = None,
+                  nacl_workers: Optional[int] = None) -> Tuple[Tuple[str, Callable[[], bool]], ...]:
+    """
+    List the journal steps of the 'modify' option and the callables running them, in order.
+
+    :param resource_obj: (required) An instantiated resource object from default_resources module
+    :param default_sg_rules: (optional) The default SG rules of a saved plan, described again when None
+    :param nacl_workers: (optional) The number of NACL entries removed at the same time (NACL_ENTRY_WORKERS)
+    :return: A tuple of (journal step, callable) tuples
+    """
+    update_sg_resource = UpdateSgResource(resource_obj, default_sg_rules)
+    update_nacl_resource = UpdateNaclResource(resource_obj, nacl_workers)
+    return ((STEP_SG_RULES, update_sg_resource.revoke_sg_rules),
+            (STEP_NACL_RULES, update_nacl_resource.update_nacl_rules))
+
 
-def _execute_changes_on_resources(resource_obj: Resource, user_arg: str) -> bool:
+def _execute_changes_on_resources(resource_obj: Resource, user_arg: str,
+                                  default_sg_rules: Optional[Dict[str, list]] = None,
+                                  region_journal: Optional[RegionJournal] = None) -> bool:
     """
     Function that instantiates the classes from the resource_* modules.
 
@@ -35,6 +90,8 @@ def _execute_changes_on_resources(resource_obj: Resource, user_arg: str) -> bool
 
     :param resource_obj: (required) An instantiated resource object from default_resources module
     :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete' or 'modify')
+    :param default_sg_rules: (optional) The default SG rules of a saved plan, described again when None
+    :param region_journal: (optional) A RegionJournal, the steps it shows as done are skipped and new ones recorded
     :return: A boolean representing whether the requested action was completed successfully
 
     :raise A custom error class that will be used to log that no default VPC exists in the current region
@@ -42,95 +99,729 @@ def _execute_changes_on_resources(resource_obj: Resource, user_arg: str) -> bool
     if not resource_obj.vpc_id:
         raise NoDefaultVpcExistsError
     if user_arg == 'delete':
-        del_resource = Delete(resource_obj)
+        del_resource = Delete(resource_obj) if region_journal is None else \
+            Delete(resource_obj, completed=region_journal.done_steps(), on_success=region_journal.record)
         if del_resource.delete_resources():
             return True
     elif user_arg == "modify":
-        update_sg_resource = UpdateSgResource(resource_obj)
-        update_nacl_resource = UpdateNaclResource(resource_obj)
-        if update_sg_resource.revoke_sg_rules() and update_nacl_resource.update_nacl_rules():
-            return True
+        for step, func in _modify_steps(resource_obj, default_sg_rules):
+            if region_journal and region_journal.is_done(step):
+                continue
+            if not func():
+                return False
+            if region_journal:
+                region_journal.record(step)
+        return True
 
 
 def _check_user_arg_response(user_arg: str) -> bool:
     """
     Check to see if arg passed from user is valid.
 
-    Needs to be either 'delete' or 'modify', will raise error is neither.
+    Needs to be either 'delete', 'modify', 'plan', 'apply' or 'ssm', will raise error is neither.
 
     :param user_arg: (required) A string representing the arg passed at the CLI
-    :return A boolean representing whether the arg is one of the two correct options
+    :return A boolean representing whether the arg is one of the correct options
 
     :raise A custom error that will log out that the arg passed was incorrect
     """
-    if user_arg not in ['delete', 'modify']:  # validate cmd line arg
+    if user_arg not in ['delete', 'modify', 'plan', 'apply', 'ssm']:  # validate cmd line arg
         raise UserArgNotFoundError
     return True
 
 
-def _get_region_list() -> List[str]:
+def _credential_kwargs(credentials: Optional[Credentials]) -> dict:
+    """
+    Turn assumed role credentials into the keyword args expected by create_boto3.
+
+    :param credentials: (optional) A Credentials NamedTuple, None to use the ambient credentials
+    :return: A dict containing the access_key, secret_key, session_token and account_id (empty when no credentials)
+    """
+    if credentials is None:
+        return {}
+    return {'access_key': credentials.access_key, 'secret_key': credentials.secret_key,
+            'session_token': credentials.session_token, 'account_id': credentials.account_id}
+
+
+def _get_region_list(credentials: Optional[Credentials] = None) -> List[str]:
     """
     Return a list of active regions to be iterated through.
 
     If there are 'region errors' a region arg may need to be passed
     (e.g., region='us-east-1') or add default region to aws_credentials file.
 
-    :return A list containing all active regions NOT listed in the SKIP_REGION_LIST (config.json)
+    :param credentials: (optional) A Credentials NamedTuple used to list the regions of another account
+    :return A list containing all active regions NOT listed in the skip_regions setting (config.json)
     """
-    get_region_object = create_boto3(service='ec2', boto_type='boto_client').describe_regions()
-    return [x['RegionName'] for x in get_region_object['Regions'] if x['RegionName'] not in SKIP_REGION_LIST]
+    get_region_object = create_boto3(service='ec2', boto_type='boto_client',
+                                     **_credential_kwargs(credentials)).describe_regions()
+    return [x['RegionName'] for x in get_region_object['Regions'] if x['RegionName'] not in get_settings().skip_regions]
 
 
-def _create_boto_objects(current_region: str):
+def _create_boto_objects(current_region: str, credentials: Optional[Credentials] = None):
     """
     Basic function that will generate three instantiated boto objects.
 
     These will be returned as a NamedTuple.
 
     :param current_region: (required) A string containing the current region, used to instantiate the objects
+    :param credentials: (optional) A Credentials NamedTuple used to instantiate the objects in another account
     :return: A NamedTuple containing the instantiated boto objects
     """
     boto_tuple = namedtuple('boto_tuple', ['ssm_client', 'ec2_resource', 'ec2_client'])
+    creds = _credential_kwargs(credentials)
     return boto_tuple(
-        ssm_client=create_boto3(service='ssm', boto_type='boto_client', region=current_region),
-        ec2_resource=create_boto3(service='ec2', boto_type="boto_resource", region=current_region),
-        ec2_client=create_boto3(service='ec2', boto_type="boto_client", region=current_region)
+        ssm_client=create_boto3(service='ssm', boto_type='boto_client', region=current_region, **creds),
+        ec2_resource=create_boto3(service='ec2', boto_type="boto_resource", region=current_region, **creds),
+        ec2_client=create_boto3(service='ec2', boto_type="boto_client", region=current_region, **creds)
     )
 
 
-def main() -> None:
+def _verify_clean_region(current_region: str, credentials: Optional[Credentials] = None,
+                         ssm_disabled: Optional[bool] = None) -> bool:
+    """
+    Cheaply confirm a region is still clean: one default VPC lookup and one SSM setting lookup.
+
+    No boto3 resource is created and the VPC inventory is not described. The SSM setting is only
+    looked up when the SSM stage did not already report it.
+
+    :param current_region: (required) A string containing the region to verify
+    :param credentials: (optional) A Credentials NamedTuple used to verify a region of another account
+    :param ssm_disabled: (optional) Whether the SSM stage left public sharing disabled, None when it did not run
+    :return: A boolean result that represents whether the region has no default VPC and SSM sharing disabled
+    """
+    if ssm_disabled is False:
+        return False
+    creds = _credential_kwargs(credentials)
+    if create_boto3(service='ec2', boto_type='boto_client', region=current_region, **creds).describe_vpcs(
+            Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs']:
+        return False
+    if ssm_disabled:
+        return True
+    ssm_client = create_boto3(service='ssm', boto_type='boto_client', region=current_region, **creds)
+    return not SsmPreference(ssm_client=ssm_client, region=current_region).get_current_service_setting_check()
+
+
+def _check_cached_region(current_region: str, account: Optional[AccountSession], state_cache: RegionStateCache,
+                         ssm_disabled: Optional[bool] = None) -> Optional[RegionResult]:
+    """
+    Fast path for a region the state cache remembers as clean.
+
+    :param current_region: (required) A string containing the region to check
+    :param account: (optional) The AccountSession of the region, None for the ambient account
+    :param state_cache: (required) The RegionStateCache loaded by main
+    :param ssm_disabled: (optional) Whether the SSM stage left public sharing disabled, None when it did not run
+    :return: A RegionResult when the region is still clean ('cached_clean' inside the TTL, 'no_default_vpc'
+             after a verification), None when it needs to be fully processed
+    """
+    account_id = account.account_id if account else None
+    if not state_cache.is_clean(account_id, current_region):
+        return None
+    if state_cache.is_fresh(account_id, current_region):
+        logger.info("[!] Region: '%s' was verified clean within the TTL, skipping", current_region)
+        return RegionResult(current_region, 'cached_clean', account_id)
+    if _verify_clean_region(current_region, account.credentials if account else None, ssm_disabled):
+        logger.info("[!] Region: '%s' is still clean, continuing\n", current_region)
+        return RegionResult(current_region, 'no_default_vpc', account_id)
+    logger.info("[!] Region: '%s' is no longer clean, processing it", current_region)
+    return None
+
+
+def process_region(current_region: str, user_arg: str, account: Optional[AccountSession] = None,
+                   journal: Optional[Journal] = None, state_cache: Optional[RegionStateCache] = None,
+                   skip_ssm: bool = False, ssm_disabled: Optional[bool] = None) -> RegionResult:
+    """
+    Run the full pipeline (boto objects -> SSM preferences -> VPC changes) for a single region.
+
+    This is the unit of work handed to the worker pool. The worker thread is renamed after
+    the account and region so every log line emitted while processing it can be attributed to them.
+
+    :param current_region: (required) A string containing the region to process
+    :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete' or 'modify')
+    :param account: (optional) An AccountSession to process the region in another account
+    :param journal: (optional) A Journal every completed step is recorded in, steps it already holds are skipped
+    :param state_cache: (optional) A RegionStateCache, regions it remembers as clean take the fast path
+    :param skip_ssm: (optional) Leave the SSM preferences to the SSM sweep stage that ran before
+    :param ssm_disabled: (optional) Whether the SSM stage left public sharing disabled, the fast path does not
+                         look the setting up again
+    :return: A RegionResult NamedTuple containing the region and the outcome ('success', 'failed', 'no_default_vpc',
+             'cached_clean')
+    """
+    account_id = account.account_id if account else None
+    threading.current_thread().name = f'{account_id}/{current_region}' if account else current_region
+    if state_cache:
+        cached = _check_cached_region(current_region, account, state_cache, ssm_disabled)
+        if cached:
+            return cached
+    region_journal = journal.for_region(user_arg, account_id, current_region) if journal else None
+    try:
+        boto_tup = _create_boto_objects(current_region, account.credentials if account else None)
+        obj = Resource(boto_resource=boto_tup.ec2_resource, boto_client=boto_tup.ec2_client,
+                       region=current_region, inventory=True)  # instantiate the Resource object
+        logger.info("[!] Performing '%s' actions on region: '%s'", user_arg, current_region)
+        logger.info("========================================================================================\n")
+        if not skip_ssm and (region_journal is None or not region_journal.is_done(STEP_SSM)):
+            SsmPreference(ssm_client=boto_tup.ssm_client, region=current_region).check_ssm_preferences()
+            if region_journal:
+                region_journal.record(STEP_SSM)
+        if _execute_changes_on_resources(obj, user_arg, region_journal=region_journal):
+            logger.info("[+] **All VPC %s actions successfully performed in '%s' region**\n\n", user_arg,
+                        current_region)
+            if region_journal:
+                region_journal.record(STEP_REGION)
+            return RegionResult(current_region, 'success', account_id)
+        logger.error("[-] Not all VPC %s actions were performed in '%s' region\n", user_arg, current_region)
+        return RegionResult(current_region, 'failed', account_id)
+    except NoDefaultVpcExistsError:
+        logger.info("[!] Region: '%s' does not have a default VPC, continuing\n", current_region)
+        if region_journal:
+            region_journal.record(STEP_REGION)
+        return RegionResult(current_region, 'no_default_vpc', account_id)
+
+
+async def _execute_changes_async(engine: AsyncEngine, resource_obj: Resource, user_arg: str,
+                                 region_journal: Optional[RegionJournal] = None) -> bool:
+    """
+    Asyncio counterpart of _execute_changes_on_resources, the delete graph tasks and their waits are coroutines.
+
+    Every modify step is awaited on the I/O threads, its NACL entries are removed one at a time so the step
+    does not start threads of its own.
+
+    :param engine: (required) The AsyncEngine the blocking calls are awaited on
+    :param resource_obj: (required) An instantiated resource object from default_resources module
+    :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete' or 'modify')
+    :param region_journal: (optional) A RegionJournal, the steps it shows as done are skipped and new ones recorded
+    :return: A boolean representing whether the requested action was completed successfully
+
+    :raise A custom error class that will be used to log that no default VPC exists in the current region
+    """
+    if not resource_obj.vpc_id:
+        raise NoDefaultVpcExistsError
+    if user_arg == 'modify':
+        for step, func in _modify_steps(resource_obj, nacl_workers=1):
+            if region_journal and region_journal.is_done(step):
+                continue
+            if not await engine.call(func):
+                return False
+            if region_journal:
+                region_journal.record(step)
+        return True
+    del_resource = Delete(resource_obj) if region_journal is None else \
+        Delete(resource_obj, completed=region_journal.done_steps(), on_success=region_journal.record)
+    try:
+        graph = await engine.call(del_resource.build_graph)
+        return all((await engine.run_graph(graph)).values())
+    except Exception as err:
+        logger.error("GeneralException: error=%s func=%s", err, 'delete_resources')
+        return False
+
+
+async def process_region_async(engine: AsyncEngine, current_region: str, user_arg: str,
+                               account: Optional[AccountSession] = None, journal: Optional[Journal] = None,
+                               state_cache: Optional[RegionStateCache] = None, skip_ssm: bool = False,
+                               ssm_disabled: Optional[bool] = None) -> RegionResult:
+    """
+    Asyncio counterpart of process_region, every blocking call is awaited on the engine I/O threads.
+
+    :param engine: (required) The AsyncEngine the blocking calls are awaited on
+    :param current_region: (required) A string containing the region to process
+    :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete' or 'modify')
+    :param account: (optional) An AccountSession to process the region in another account
+    :param journal: (optional) A Journal every completed step is recorded in, steps it already holds are skipped
+    :param state_cache: (optional) A RegionStateCache, regions it remembers as clean take the fast path
+    :param skip_ssm: (optional) Leave the SSM preferences to the SSM sweep stage that ran before
+    :param ssm_disabled: (optional) Whether the SSM stage left public sharing disabled, the fast path does not
+                         look the setting up again
+    :return: A RegionResult NamedTuple containing the region and the outcome
+    """
+    account_id = account.account_id if account else None
+    if state_cache:
+        cached = await engine.call(_check_cached_region, current_region, account, state_cache, ssm_disabled)
+        if cached:
+            return cached
+    region_journal = journal.for_region(user_arg, account_id, current_region) if journal else None
+    try:
+        credentials = await engine.call(lambda: account.credentials) if account else None
+        boto_tup = await engine.call(_create_boto_objects, current_region, credentials)
+        obj = await engine.call(Resource, boto_resource=boto_tup.ec2_resource, boto_client=boto_tup.ec2_client,
+                                region=current_region, inventory=True)
+        logger.info("[!] Performing '%s' actions on region: '%s'", user_arg, current_region)
+        if not skip_ssm and (region_journal is None or not region_journal.is_done(STEP_SSM)):
+            await engine.call(SsmPreference(ssm_client=boto_tup.ssm_client, region=current_region)
+                              .check_ssm_preferences)
+            if region_journal:
+                region_journal.record(STEP_SSM)
+        if await _execute_changes_async(engine, obj, user_arg, region_journal):
+            logger.info("[+] **All VPC %s actions successfully performed in '%s' region**\n\n", user_arg,
+                        current_region)
+            if region_journal:
+                region_journal.record(STEP_REGION)
+            return RegionResult(current_region, 'success', account_id)
+        logger.error("[-] Not all VPC %s actions were performed in '%s' region\n", user_arg, current_region)
+        return RegionResult(current_region, 'failed', account_id)
+    except NoDefaultVpcExistsError:
+        logger.info("[!] Region: '%s' does not have a default VPC, continuing\n", current_region)
+        if region_journal:
+            region_journal.record(STEP_REGION)
+        return RegionResult(current_region, 'no_default_vpc', account_id)
+
+
+def _plan_region(current_region: str, plan_action: str, account: Optional[AccountSession] = None) -> Dict[str, Any]:
+    """
+    Describe a single region and build its plan, nothing is changed.
+
+    :param current_region: (required) A string containing the region to plan
+    :param plan_action: (required) A string containing the planned option (i.e., 'delete' or 'modify')
+    :param account: (optional) An AccountSession to plan the region in another account
+    :return: A dict containing the region plan built by the planner module
+    """
+    account_id = account.account_id if account else None
+    threading.current_thread().name = f'{account_id}/{current_region}' if account else current_region
+    boto_tup = _create_boto_objects(current_region, account.credentials if account else None)
+    obj = Resource(boto_resource=boto_tup.ec2_resource, boto_client=boto_tup.ec2_client,
+                   region=current_region, inventory=True)
+    region_plan = build_region_plan(obj, SsmPreference(ssm_client=boto_tup.ssm_client, region=current_region),
+                                    plan_action, account_id)
+    logger.info("[!] Planned %s mutating API call(s) for '%s' in region: '%s'", region_plan['api_calls'],
+                plan_action, current_region)
+    return region_plan
+
+
+def _apply_region_plan(region_plan: Dict[str, Any], account: Optional[AccountSession] = None) -> RegionResult:
+    """
+    Run the actions of a saved region plan, the resources are not described again.
+
+    :param region_plan: (required) A region plan dict read from a plan file
+    :param account: (optional) An AccountSession to apply the plan in another account
+    :return: A RegionResult NamedTuple containing the region and the outcome ('success', 'failed', 'no_default_vpc')
+    """
+    current_region, user_arg = region_plan['region'], region_plan['action']
+    account_id = account.account_id if account else None
+    threading.current_thread().name = f'{account_id}/{current_region}' if account else current_region
+    try:
+        boto_tup = _create_boto_objects(current_region, account.credentials if account else None)
+        logger.info("[!] Applying the '%s' plan on region: '%s'", user_arg, current_region)
+        logger.info("========================================================================================\n")
+        if region_plan['ssm_update']:
+            SsmPreference(ssm_client=boto_tup.ssm_client, region=current_region).disable_public_sharing()
+        if not region_plan['vpc_id']:
+            raise NoDefaultVpcExistsError
+        obj = resource_from_plan(region_plan, boto_tup.ec2_resource, boto_tup.ec2_client)
+        if _execute_changes_on_resources(obj, user_arg, region_plan['default_sg_rules']):
+            logger.info("[+] **All planned VPC %s actions successfully performed in '%s' region**\n\n", user_arg,
+                        current_region)
+            return RegionResult(current_region, 'success', account_id)
+        logger.error("[-] Not all planned VPC %s actions were performed in '%s' region\n", user_arg, current_region)
+        return RegionResult(current_region, 'failed', account_id)
+    except NoDefaultVpcExistsError:
+        logger.info("[!] Region: '%s' does not have a default VPC in the plan, continuing\n", current_region)
+        return RegionResult(current_region, 'no_default_vpc', account_id)
+
+
+def _sweep_ssm_region(current_region: str, account: Optional[AccountSession] = None) -> SsmSweepResult:
+    """
+    Check and update the SSM public sharing setting of a single region, nothing else is described.
+
+    :param current_region: (required) A string containing the region to sweep
+    :param account: (optional) An AccountSession to sweep the region in another account
+    :return: A SsmSweepResult NamedTuple containing the setting before and after the sweep
+    """
+    ssm_client = create_boto3(service='ssm', boto_type='boto_client', region=current_region,
+                              **_credential_kwargs(account.credentials if account else None))
+    return SsmPreference(ssm_client=ssm_client, region=current_region).sweep(
+        account.account_id if account else None)
+
+
+def _verify_region(current_region: str, action: str, account: Optional[AccountSession] = None,
+                   **kwargs: Any) -> VerificationResult:
+    """
+    Re-describe a single region and confirm the end state of an option.
+
+    :param current_region: (required) A string containing the region to verify
+    :param action: (required) A string containing the option that ran (i.e., 'delete', 'modify' or 'ssm')
+    :param account: (optional) An AccountSession to verify the region of another account
+    :param kwargs: (optional) Keyword args passed to the Verifier (e.g. attempts)
+    :return: A VerificationResult NamedTuple containing every check and whether it passed
+    """
+    creds = _credential_kwargs(account.credentials if account else None)
+    return Verifier(ec2_client=create_boto3(service='ec2', boto_type='boto_client', region=current_region, **creds),
+                    ssm_client=create_boto3(service='ssm', boto_type='boto_client', region=current_region, **creds),
+                    region=current_region, **kwargs).verify(action, account.account_id if account else None)
+
+
+async def _verify_region_async(engine: AsyncEngine, current_region: str, action: str,
+                               account: Optional[AccountSession] = None, **kwargs: Any) -> VerificationResult:
+    """
+    Asyncio counterpart of _verify_region, the checks are awaited on the engine I/O threads and their backoff
+    on the event loop.
+
+    :param engine: (required) The AsyncEngine the blocking calls are awaited on
+    :param current_region: (required) A string containing the region to verify
+    :param action: (required) A string containing the option that ran (i.e., 'delete', 'modify' or 'ssm')
+    :param account: (optional) An AccountSession to verify the region of another account
+    :param kwargs: (optional) Keyword args passed to the Verifier (e.g. attempts)
+    :return: A VerificationResult NamedTuple containing every check and whether it passed
+    """
+    creds = _credential_kwargs((await engine.call(lambda: account.credentials)) if account else None)
+    ec2_client = await engine.call(create_boto3, service='ec2', boto_type='boto_client', region=current_region,
+                                   **creds)
+    ssm_client = await engine.call(create_boto3, service='ssm', boto_type='boto_client', region=current_region,
+                                   **creds)
+    return await Verifier(ec2_client=ec2_client, ssm_client=ssm_client, region=current_region, **kwargs).verify_async(
+        action, engine.call, account.account_id if account else None)
+
+
+def _run_verification_stage(targets: list, action: str, run: Callable[[list], Tuple[list, List[RegionResult]]],
+                            matrix_file: Optional[str] = None,
+                            engine: Optional[AsyncEngine] = None) -> List[RegionResult]:
+    """
+    Verify every (account, region) target concurrently and log out the compliance matrix.
+
+    :param targets: (required) A list of (account, region) tuples the sweep targeted
+    :param action: (required) A string containing the option that ran (i.e., 'delete', 'modify' or 'ssm')
+    :param run: (required) The engine runner taking the units (i.e., _run_in_pool or _run_async bound to its engine)
+    :param matrix_file: (optional) A string containing the path of the CSV file the matrix is written to
+    :param engine: (optional) The AsyncEngine run is bound to, the regions are then verified as coroutines
+    :return: A list of 'verify_failed' RegionResults, one per region that is not compliant
+    """
+    verify = partial(_verify_region_async, engine) if engine else _verify_region
+    units = [(account, current_region, partial(verify, current_region, action, account=account))
+             for account, current_region in targets]
+    verifications, failed = run(units)
+    totals = summarize(verifications)
+    logger.info("[!] Verification of %s region(s): compliant=%s, non_compliant=%s, errored=%s\n%s",
+                len(targets), totals['compliant'], totals['non_compliant'], len(failed),
+                format_compliance_matrix(verifications))
+    if matrix_file:
+        write_compliance_matrix(verifications, matrix_file)
+    return [RegionResult(result.region, 'verify_failed', result.account) for result in verifications
+            if not passed(result)] + [result._replace(status='verify_failed') for result in failed]
+
+
+def _run_ssm_stage(work_units: list, user_arg: str, run: Callable[[list], Tuple[list, List[RegionResult]]],
+                   journal: Optional[Journal] = None,
+                   state_cache: Optional[RegionStateCache] = None) -> Tuple[List[SsmSweepResult], List[RegionResult]]:
+    """
+    Sweep the SSM public sharing setting of every (account, region) unit concurrently.
+
+    Regions the journal shows as done and regions the state cache verified clean within the TTL are left out.
+
+    :param work_units: (required) A list of (account, region) tuples built by build_work_units
+    :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete', 'modify' or 'ssm')
+    :param run: (required) The engine runner taking the units (i.e., _run_in_pool or _run_async bound to its engine)
+    :param journal: (optional) A Journal the completed SSM steps are recorded in
+    :param state_cache: (optional) A RegionStateCache, regions it verified clean within the TTL are skipped
+    :return: A tuple containing the SsmSweepResults and the RegionResults of the units that raised
+    """
+    units = []
+    for account, current_region in work_units:
+        account_id = account.account_id if account else None
+        if journal and journal.is_done(user_arg, account_id, current_region, STEP_SSM):
+            continue
+        if state_cache and state_cache.is_fresh(account_id, current_region):
+            continue
+        units.append((account, current_region, partial(_sweep_ssm_region, current_region, account=account)))
+    ssm_results, failed = run(units)
+    for result in ssm_results:
+        if journal and result.after == 'Disable':
+            journal.record(user_arg, result.account, result.region, STEP_SSM)
+    _log_ssm_summary(ssm_results)
+    return ssm_results, failed
+
+
+def _log_ssm_summary(ssm_results: List[SsmSweepResult]) -> None:
+    """
+    Log out the SSM public sharing setting of every swept region before and after the sweep.
+
+    :param ssm_results: (required) A list of SsmSweepResult NamedTuples
+    :return: None
+    """
+    changed = [result for result in ssm_results if result.before != result.after]
+    logger.info("[!] SSM sweep finished for %s region(s), %s updated", len(ssm_results), len(changed))
+    for result in sorted(ssm_results, key=lambda result: (result.account or '', result.region)):
+        log = logger.info if result.after == 'Disable' else logger.error
+        log("[%s] SSM public sharing in Region: '%s'%s: '%s' -> '%s'", '+' if result.after == 'Disable' else '-',
+            result.region, f" Account: '{result.account}'" if result.account else '', result.before, result.after)
+
+
+def build_work_units(accounts: Optional[List[AccountSession]]) -> Tuple[list, List[RegionResult]]:
+    """
+    Build the account x region matrix that is handed to the worker pool.
+
+    :param accounts: (optional) A list of AccountSession objects, None to only sweep the ambient account
+    :return: A tuple containing the list of (account, region) units and the RegionResults of accounts
+             whose role could not be assumed
+    """
+    if not accounts:
+        return [(None, current_region) for current_region in _get_region_list()], []
+    units, failed = [], []
+    for account in accounts:
+        try:
+            units.extend((account, current_region) for current_region in _get_region_list(account.credentials))
+        except Exception as err:  # an account we cannot get into must not stop the remaining ones
+            logger.error("[-] Unable to list the regions of account '%s': %s", account.account_id, err)
+            failed.append(RegionResult('*', 'failed', account.account_id))
+    return units, failed
+
+
+def _log_region_summary(results: List[RegionResult]) -> None:
+    """
+    Log out the aggregated outcome of every processed region.
+
+    A region can have more than one row (e.g. 'success' then 'verify_failed'), the regions are counted once.
+
+    :param results: (required) A list of RegionResult NamedTuples returned by the workers
+    :return: None
+    """
+    totals = Counter(result.status for result in results)
+    logger.info("[!] Sweep finished for %s region(s): %s", len({(result.account, result.region) for result in results}),
+                ", ".join(f"{status}={count}" for status, count in sorted(totals.items())))
+    for result in sorted(results, key=lambda result: (result.account or '', result.region)):
+        if result.status == 'failed':
+            if result.account:
+                logger.error("[-] Account: '%s' Region: '%s' did not complete successfully", result.account,
+                             result.region)
+            else:
+                logger.error("[-] Region: '%s' did not complete successfully", result.region)
+
+
+def _write_report(results: list, report_file: str) -> None:
+    """
+    Write the consolidated result report of a sweep as JSON.
+
+    :param results: (required) A list of RegionResult (or, for the 'ssm' option, SsmSweepResult) NamedTuples
+    :param report_file: (required) A string containing the path of the JSON file to write
+    :return: None
+    """
+    report = [result._asdict() for result in sorted(results, key=lambda result: (result.account or '',
+                                                                                 result.region))]
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info("[+] Result report written to '%s'", report_file)
+
+
+def _run_in_pool(units: List[Tuple[Optional[AccountSession], str, Callable[[], Any]]],
+                 max_workers: int) -> Tuple[list, List[RegionResult]]:
+    """
+    Run one task per (account, region) unit on a bounded worker pool.
+
+    :param units: (required) A list of (account, region, task) tuples, the task takes no args
+    :param max_workers: (required) The maximum number of regions processed at the same time
+    :return: A tuple containing the values returned by the tasks and the RegionResults of the tasks that raised
+    """
+    values, failed = [], []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='region') as executor:
+        futures = {executor.submit(task): (account, current_region) for account, current_region, task in units}
+        for future in as_completed(futures):
+            account, current_region = futures[future]
+            try:
+                values.append(future.result())
+            except Exception as err:  # one broken region must not stop the remaining ones
+                logger.error("[-] Region: '%s' raised an unexpected error: %s", current_region, err)
+                failed.append(RegionResult(current_region, 'failed', account.account_id if account else None))
+    return values, failed
+
+
+def _run_async(units: List[Tuple[Optional[AccountSession], str, Callable[[], Any]]],
+               engine: AsyncEngine) -> Tuple[list, List[RegionResult]]:
+    """
+    Run one task per (account, region) unit on the asyncio engine.
+
+    :param units: (required) A list of (account, region, task) tuples, the task takes no args and is either
+                  a coroutine function or a blocking callable (awaited on the engine I/O threads as one call)
+    :param engine: (required) The AsyncEngine to run the units on
+    :return: A tuple containing the values returned by the tasks and the RegionResults of the tasks that raised
+    """
+    async_units = [(account, current_region, task if asyncio.iscoroutinefunction(getattr(task, 'func', task))
+                    else partial(engine.call, task)) for account, current_region, task in units]
+    values, failed = [], []
+    for account, current_region, value, err in engine.run_units(async_units):
+        if err is None:
+            values.append(value)
+        else:
+            logger.error("[-] Region: '%s' raised an unexpected error: %s", current_region, err)
+            failed.append(RegionResult(current_region, 'failed', account.account_id if account else None))
+    return values, failed
+
+
+def _skip_journaled_units(work_units: list, journal: Journal, user_arg: str) -> Tuple[list, List[RegionResult]]:
+    """
+    Drop the (account, region) units a previous run completed, they are not described again.
+
+    :param work_units: (required) A list of (account, region) tuples built by build_work_units
+    :param journal: (required) The Journal loaded from the previous run
+    :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete' or 'modify')
+    :return: A tuple containing the remaining units and a 'skipped' RegionResult per completed unit
+    """
+    remaining, done = [], []
+    for account, current_region in work_units:
+        account_id = account.account_id if account else None
+        if journal.is_done(user_arg, account_id, current_region, STEP_REGION):
+            done.append(RegionResult(current_region, 'skipped', account_id))
+        else:
+            remaining.append((account, current_region))
+    logger.info("[!] Resuming: %s region(s) already completed, %s remaining", len(done), len(remaining))
+    return remaining, done
+
+
+def _update_state_cache(state_cache: RegionStateCache, results: List[RegionResult], user_arg: str,
+                        ssm_results: Iterable[SsmSweepResult] = ()) -> None:
+    """
+    Remember the regions a sweep left clean and forget the others, then save the state file.
+
+    The regions the journal skipped keep their entry, they were not processed by this run.
+
+    :param state_cache: (required) The RegionStateCache loaded by main
+    :param results: (required) A list of RegionResult NamedTuples returned by the workers
+    :param user_arg: (required) A string representing the arg passed by user (i.e., 'delete' or 'modify')
+    :param ssm_results: (optional) The SsmSweepResults of the SSM stage, regions left public are forgotten
+    :return: None
+    """
+    public = {(result.account, result.region) for result in ssm_results if result.after != 'Disable'}
+    public.update((result.account, result.region) for result in results if result.status == 'ssm_failed')
+    for result in results:
+        if result.status == 'cached_clean' or result.region == '*':
+            continue
+        if (result.account, result.region) in public:
+            state_cache.forget(result.account, result.region)
+        elif result.status == 'skipped':
+            continue  # resumed from the journal, the entry of the run that completed it stays
+        elif result.status == 'no_default_vpc' or (result.status == 'success' and user_arg == 'delete'):
+            state_cache.mark_clean(result.account, result.region)
+        else:
+            state_cache.forget(result.account, result.region)
+    state_cache.save()
+
+
+def _plan_units(plan: Dict[str, Any], role_name: Optional[str],
+                expiry_threshold: int) -> List[Tuple[Optional[AccountSession], str, Callable[[], Any]]]:
+    """
+    Turn the region plans of a saved plan into work units, assuming the role again in planned accounts.
+
+    :param plan: (required) A dict containing the plan document read from a plan file
+    :param role_name: (optional) The name of the role assumed in every planned account
+    :param expiry_threshold: (required) Renew the assumed role credentials when fewer seconds than this are left
+    :return: A list of (account, region, task) tuples
+
+    :raise ValueError when the plan covers other accounts and no role name is passed
+    """
+    sessions = {}
+    units = []
+    for region_plan in plan['regions']:
+        account_id = region_plan['account']
+        if account_id and not role_name:
+            raise ValueError(f"The plan covers account '{account_id}', --role-name is required to apply it")
+        account = sessions.setdefault(account_id, AccountSession(account_id, role_name, expiry_threshold)) \
+            if account_id else None
+        units.append((account, region_plan['region'], partial(_apply_region_plan, region_plan, account)))
+    return units
+
+
+def main(options: optparse.Values) -> None:
     """
     Main function that will call the other functions in the main module.
 
+    Regions are processed concurrently by a bounded worker pool, so the wall-clock
+    time of a sweep approaches the time of the slowest region. When account IDs are
+    passed, the role is assumed in every account and the account x region matrix is swept.
+    The SSM public sharing setting of every region is swept concurrently in its own stage before
+    the VPC work, the 'ssm' option only runs that stage.
+    The 'plan' option only describes the resources and emits the planned actions as JSON,
+    the 'apply' option runs a saved plan without describing the resources again.
     This will log out the details on the actions being attempted and whether
     all actions performed successfully.
 
-    :raise A custom error (UserArgNotFoundError) that represents when the user enters an incorrect arg
+    :param options: (required) The CLI options parsed by utils.get_options, the numeric ones default to their
+                    config.json setting (e.g. max_workers, max_pool_connections, state_ttl, max_concurrency)
 
-    :raise A custom error (NoDefaultVpcExistsError) that represents when a region doesn't have a default VPC
+    :raise A custom error (UserArgNotFoundError) that represents when the user enters an incorrect arg
     """
-    args = get_args()
+    args = options.sanitize_option
     if not _check_user_arg_response(args):
         raise UserArgNotFoundError
-    region_list = _get_region_list()
-    for current_region in region_list:
-        try:
-            boto_tup = _create_boto_objects(current_region)
-            obj = Resource(boto_resource=boto_tup.ec2_resource, boto_client=boto_tup.ec2_client,
-                           region=current_region)  # instantiate the Resource object
-            logger.info("[!] Performing '%s' actions on region: '%s'", args, current_region)
-            logger.info("========================================================================================\n")
-            SsmPreference(ssm_client=boto_tup.ssm_client, region=current_region).check_ssm_preferences()
-            if _execute_changes_on_resources(obj, args):
-                logger.info("[+] **All VPC %s actions successfully performed in '%s' region**\n\n", args,
-                            current_region)
-        except NoDefaultVpcExistsError:
-            logger.info("[!] Region: '%s' does not have a default VPC, continuing\n", current_region)
-            continue
+    configure_session_pool(options.max_pool_connections)  # every pooled client is sized from the options
+    expiry_threshold = options.credential_expiry_threshold
+    plan_action, plan_file = options.plan_action, options.plan_file
+    state_cache, ssm_results = None, []
+    async_engine = AsyncEngine(options.max_concurrency, options.max_workers) if options.engine == 'asyncio' \
+        else None
+    run = partial(_run_async, engine=async_engine) if async_engine \
+        else partial(_run_in_pool, max_workers=options.max_workers)
+    if args == 'apply':
+        plan = read_plan(plan_file)
+        units, results = _plan_units(plan, options.role_name, expiry_threshold), []
+        targets = [(account, current_region) for account, current_region, _ in units]
+        logger.info("[!] Applying a '%s' plan of %s mutating API call(s)", plan['action'], plan['api_calls'])
+    else:
+        account_sessions = [AccountSession(account_id, options.role_name, expiry_threshold)
+                            for account_id in options.accounts] if options.accounts else None
+        work_units, results = build_work_units(account_sessions)
+        targets = list(work_units)
+        journal = Journal(options.journal_file, options.resume) if options.journal_file and args != 'plan' \
+            else None
+        if journal and options.resume:
+            work_units, done = _skip_journaled_units(work_units, journal, args)
+            results.extend(done)
+        state_cache = RegionStateCache(options.state_file, options.state_ttl) \
+            if options.state_file and args in ('delete', 'modify') else None
+        if args != 'plan':  # the SSM stage runs for every region before (or, with 'ssm', instead of) the VPC work
+            ssm_results, failed = _run_ssm_stage(work_units, args, run, journal, state_cache)
+            ssm_results.extend(SsmSweepResult(result.region, result.account, None, None) for result in failed)
+        if args == 'ssm':
+            for result in ssm_results:
+                results.append(RegionResult(result.region, 'success' if result.after == 'Disable' else 'failed',
+                                            result.account))
+                if journal and result.after == 'Disable':
+                    journal.record(args, result.account, result.region, STEP_REGION)
+            work_units = []
+        else:
+            results.extend(RegionResult(result.region, 'ssm_failed', result.account) for result in ssm_results
+                           if result.after != 'Disable')
+        extra = {key: value for key, value in (('journal', journal), ('state_cache', state_cache)) if value}
+        if args == 'plan':
+            worker = partial(_plan_region, plan_action=plan_action)
+        elif async_engine:
+            worker = partial(process_region_async, async_engine, user_arg=args, skip_ssm=True, **extra)
+        else:
+            worker = partial(process_region, user_arg=args, skip_ssm=True, **extra)
+        ssm_disabled = {(result.account, result.region): result.after == 'Disable' for result in ssm_results}
+        units = []
+        for account, current_region in work_units:
+            # the fast path of a cached region reuses the SSM stage result instead of reading the setting again
+            kwargs = {'ssm_disabled': ssm_disabled.get((account.account_id if account else None, current_region))} \
+                if state_cache else {}
+            units.append((account, current_region, partial(worker, current_region, account=account, **kwargs)))
+    values, failed = run(units)
+    results.extend(failed)
+    if args == 'plan':
+        plan = build_plan(plan_action, values)
+        plan_json = write_plan(plan, plan_file)
+        logger.info("[+] Plan of %s mutating API call(s) over %s region(s) built", plan['api_calls'],
+                    len(plan['regions']))
+        if plan_file:
+            logger.info("[+] Plan written to '%s'", plan_file)
+        else:
+            print(plan_json)
+        results.extend(RegionResult(region_plan['region'], 'planned', region_plan['account'])
+                       for region_plan in plan['regions'])
+    else:
+        results.extend(values)
+    if options.verify and args != 'plan':
+        results.extend(_run_verification_stage(targets, plan['action'] if args == 'apply' else args, run,
+                                               options.verify_file, async_engine))
+    if state_cache:
+        _update_state_cache(state_cache, results, args, ssm_results)
+    _log_region_summary(results)
+    get_recorder().log_summary()
+    if options.report_file:
+        _write_report(ssm_results if args == 'ssm' else results, options.report_file)
+    if options.metrics_file:
+        get_recorder().export(options.metrics_file, options.metrics_format)
 
 
 if __name__ == "__main__":
     try:
-        main()
+        create_logger()
+        main(get_options())
     except UserArgNotFoundError:
         logger.error("[-] Entered an incorrect option, use -h or --help for more information")
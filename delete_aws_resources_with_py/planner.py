@@ -0,0 +1,191 @@
+"""Module containing the dry-run planner that turns Resource data into an action plan"""
+
+# Standard Library imports
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Local App imports
+from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference
+from delete_aws_resources_with_py.default_resources import Resource
+from delete_aws_resources_with_py.resource_delete import build_rtb_index, build_sg_reference_index
+from delete_aws_resources_with_py.resource_updates import UpdateNaclResource, UpdateSgResource
+
+PLAN_VERSION = 1
+
+
+def _action(operation: str, **params: Any) -> Dict[str, Any]:
+    """
+    Describe a single mutating AWS API call.
+
+    :param operation: (required) A string containing the AWS API operation name (e.g. 'DeleteSubnet')
+    :param params: (optional) The params of the API call
+    :return: A dict containing the operation and its params
+    """
+    return {'operation': operation, 'params': params}
+
+
+def _delete_actions(resource_obj: Resource) -> List[Dict[str, Any]]:
+    """
+    List the mutating API calls the 'delete' option makes in a region.
+
+    :param resource_obj: (required) Instantiated Resource object (inventory mode) with the VPC data
+    :return: A list of action dicts, in the order the Delete class runs them
+    """
+    actions = []
+    actions.extend(_action('DeleteNatGateway', NatGatewayId=nat_gateway.id) for nat_gateway in resource_obj.nat_gateway
+                   if nat_gateway.state != 'deleting')
+    actions.extend(_action('DeleteVpcEndpoints', VpcEndpointIds=[endpoint.id]) for endpoint in resource_obj.endpoint
+                   if endpoint.state != 'deleting')
+    for eni in resource_obj.eni:
+        if not eni.requester_managed:
+            if eni.attachment_id:
+                actions.append(_action('DetachNetworkInterface', AttachmentId=eni.attachment_id, Force=True))
+            actions.append(_action('DeleteNetworkInterface', NetworkInterfaceId=eni.id))
+    actions.extend(_action('DeleteVpcPeeringConnection', VpcPeeringConnectionId=peering.id)
+                   for peering in resource_obj.peering)
+    actions.extend(_action('DeleteEgressOnlyInternetGateway', EgressOnlyInternetGatewayId=eigw.id)
+                   for eigw in resource_obj.eigw)
+    for igw in resource_obj.igw:
+        actions.append(_action('DetachInternetGateway', InternetGatewayId=igw.id, VpcId=resource_obj.vpc_id))
+        actions.append(_action('DeleteInternetGateway', InternetGatewayId=igw.id))
+    for route_table_id, entry in build_rtb_index(resource_obj.route_table).items():
+        if not entry.is_main:
+            actions.extend(_action('DisassociateRouteTable', AssociationId=association_id)
+                           for association_id in entry.subnet_association_ids)
+            actions.append(_action('DeleteRouteTable', RouteTableId=route_table_id))
+    actions.extend(_action('DeleteSubnet', SubnetId=subnet.id) for subnet in resource_obj.subnet)
+    actions.extend(_action('DeleteNetworkAcl', NetworkAclId=acl.id) for acl in resource_obj.acl if not acl.is_default)
+    for sg_id, entry in build_sg_reference_index(resource_obj.sgs).items():
+        if entry.ingress:
+            actions.append(_action('RevokeSecurityGroupIngress', GroupId=sg_id, IpPermissions=entry.ingress))
+        if entry.egress:
+            actions.append(_action('RevokeSecurityGroupEgress', GroupId=sg_id, IpPermissions=entry.egress))
+    actions.extend(_action('DeleteSecurityGroup', GroupId=sg.id) for sg in resource_obj.sgs
+                   if sg.group_name != 'default')
+    actions.append(_action('DeleteVpc', VpcId=resource_obj.vpc_id))
+    return actions
+
+
+def _modify_actions(resource_obj: Resource, default_sg_rules: Dict[str, list]) -> List[Dict[str, Any]]:
+    """
+    List the mutating API calls the 'modify' option makes in a region.
+
+    :param resource_obj: (required) Instantiated Resource object (inventory mode) with the VPC data
+    :param default_sg_rules: (required) A dict containing the default SG IDs and their SG rules
+    :return: A list of action dicts, in the order the Update* classes run them
+    """
+    update_sg = UpdateSgResource(resource_obj, default_sg_rules)
+    actions = [_action('RevokeSecurityGroupEgress', GroupId=group_id, SecurityGroupRuleIds=rule_ids)
+               for group_id, rule_ids in update_sg.find_egress_sg_rule(default_sg_rules).items()]
+    actions.extend(_action('RevokeSecurityGroupIngress', GroupId=group_id, SecurityGroupRuleIds=rule_ids)
+                   for group_id, rule_ids in update_sg.find_ingress_sg_rule(default_sg_rules).items())
+    for acl in resource_obj.acl:
+        if acl.is_default:
+            actions.extend(_action('DeleteNetworkAclEntry', NetworkAclId=acl.id, Egress=egress,
+                                   RuleNumber=rule_number)
+                           for egress, rule_number in UpdateNaclResource.find_nacl_entries(acl))
+    return actions
+
+
+def build_region_plan(resource_obj: Resource, ssm_preference: SsmPreference, action: str,
+                      account: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the plan of a region without changing anything.
+
+    The plan keeps the inventory records (and the default SG rules for 'modify') so it can be
+    applied later without describing the resources again.
+
+    :param resource_obj: (required) Instantiated Resource object (inventory mode) with the VPC data
+    :param ssm_preference: (required) Instantiated SsmPreference object of the region
+    :param action: (required) A string containing the planned option (i.e., 'delete' or 'modify')
+    :param account: (optional) A string containing the account ID the region belongs to
+    :return: A dict containing the region plan and the expected number of mutating API calls
+    """
+    plan = {
+        'region': resource_obj.region,
+        'account': account,
+        'action': action,
+        'ssm_update': ssm_preference.get_current_service_setting_check(),
+        'vpc_id': resource_obj.vpc_id,
+        'records': {},
+        'default_sg_rules': {},
+        'actions': [],
+    }
+    if plan['ssm_update']:
+        plan['actions'].append(_action('UpdateServiceSetting', SettingId=ssm_preference.public_share_setting,
+                                       SettingValue='Disable'))
+    if resource_obj.vpc_id:
+        plan['records'] = resource_obj.to_records()
+        if action == 'delete':
+            plan['actions'].extend(_delete_actions(resource_obj))
+        else:
+            plan['default_sg_rules'] = {
+                group_id: [{'SecurityGroupRuleId': rule['SecurityGroupRuleId'], 'IsEgress': rule['IsEgress']}
+                           for rule in rules]
+                for group_id, rules in UpdateSgResource(resource_obj).check_for_default_sg().items()}
+            plan['actions'].extend(_modify_actions(resource_obj, plan['default_sg_rules']))
+    plan['api_calls'] = len(plan['actions'])
+    return plan
+
+
+def build_plan(action: str, region_plans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the region plans into one plan document.
+
+    :param action: (required) A string containing the planned option (i.e., 'delete' or 'modify')
+    :param region_plans: (required) A list of region plan dicts built by build_region_plan
+    :return: A dict containing the plan document
+    """
+    region_plans = sorted(region_plans, key=lambda plan: (plan['account'] or '', plan['region']))
+    return {
+        'version': PLAN_VERSION,
+        'action': action,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'api_calls': sum(plan['api_calls'] for plan in region_plans),
+        'regions': region_plans,
+    }
+
+
+def write_plan(plan: Dict[str, Any], plan_file: Optional[str] = None) -> str:
+    """
+    Serialize a plan document as JSON and write it to a file when one is passed.
+
+    :param plan: (required) A dict containing the plan document
+    :param plan_file: (optional) A string containing the path of the file to write
+    :return: A string containing the JSON plan
+    """
+    plan_json = json.dumps(plan, indent=2, default=str)
+    if plan_file:
+        with open(plan_file, 'w') as f:
+            f.write(plan_json)
+    return plan_json
+
+
+def read_plan(plan_file: str) -> Dict[str, Any]:
+    """
+    Read a plan document saved by write_plan.
+
+    :param plan_file: (required) A string containing the path of the plan file
+    :return: A dict containing the plan document
+
+    :raise ValueError if the plan was written by an incompatible version
+    """
+    with open(plan_file, 'r') as f:
+        plan = json.load(f)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version: {plan.get('version')}")
+    return plan
+
+
+def resource_from_plan(region_plan: Dict[str, Any], boto_resource: Any, boto_client: Any) -> Resource:
+    """
+    Rebuild the Resource object of a region from its plan, without calling the AWS API.
+
+    :param region_plan: (required) A region plan dict built by build_region_plan
+    :param boto_resource: (required) Instantiated boto3 resource
+    :param boto_client: (required) Instantiated boto3 client
+    :return: An instantiated Resource in inventory mode
+    """
+    return Resource.from_records(boto_resource, boto_client, region_plan['region'], region_plan['vpc_id'],
+                                 region_plan['records'])
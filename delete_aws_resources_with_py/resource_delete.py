@@ -1,144 +1,310 @@
 """Module containing the class to delete resources"""
 
+# Standard Library imports
+from collections import namedtuple
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional
+
 # Local App imports
-from delete_aws_resources_with_py.default_resources import Resource
-from delete_aws_resources_with_py.utils import logger, error_handler
+from delete_aws_resources_with_py.default_resources import EniRecord, Resource
+from delete_aws_resources_with_py.dependency_graph import DependencyGraph, TaskSteps
+from delete_aws_resources_with_py.status_poller import StatusPoller, POLL_DELAY, WAIT_TIMEOUT
+from delete_aws_resources_with_py.utils import logger, error_handler, get_settings
+
+RouteTableIndexEntry = namedtuple('RouteTableIndexEntry', ['is_main', 'subnet_association_ids'])
+#  The rules of a SG that reference a custom SG of the VPC, reduced to what the revoke calls need
+SgReferenceIndexEntry = namedtuple('SgReferenceIndexEntry', ['ingress', 'egress'])
+
+
+def build_rtb_index(route_tables: Iterable[Any]) -> Dict[str, RouteTableIndexEntry]:
+    """
+    Build an index of the current regions route table(s) in a single pass.
+
+    Each route table ID maps to whether it is the 'Main' rtb and to the association IDs of the
+    subnets explicitly associated with it. Used by the Delete class and the planner.
+    :param route_tables: (required) The route table resources or RouteTableRecords of the VPC
+    :return A dict containing the route table ID and a RouteTableIndexEntry NamedTuple
+    """
+    index = {}
+    for route_table in route_tables:
+        associations = route_table.associations_attribute or []
+        index[route_table.id] = RouteTableIndexEntry(
+            is_main=any(association.get('Main') for association in associations),
+            subnet_association_ids=[association['RouteTableAssociationId'] for association in associations
+                                    if association.get('SubnetId')])
+    return index
+
+
+def build_sg_reference_index(sgs: Iterable[Any]) -> Dict[str, SgReferenceIndexEntry]:
+    """
+    Build an index of the rules referencing the custom SGs of the VPC in a single pass over the SG records.
+
+    A custom SG cannot be deleted while a rule of another SG (custom or default) references it, each
+    referencing SG ID maps to the ingress and egress permissions holding only those group references.
+    A SG referencing itself does not block its own deletion and records without rules are skipped.
+    Used by the Delete class and the planner.
+    :param sgs: (required) The SgRecords of the VPC
+    :return A dict containing the referencing SG ID and a SgReferenceIndexEntry NamedTuple
+    """
+    sgs = list(sgs)
+    custom_ids = {sg.id for sg in sgs if sg.group_name != 'default'}
+    index = {}
+    for sg in sgs:
+        directions = []
+        for permissions in (sg.ip_permissions, sg.ip_permissions_egress):
+            references = []
+            for permission in permissions or []:
+                pairs = [{'GroupId': pair['GroupId']} for pair in permission.get('UserIdGroupPairs', [])
+                         if pair.get('GroupId') in custom_ids and pair['GroupId'] != sg.id]
+                if pairs:
+                    references.append(dict({key: permission[key] for key in ('IpProtocol', 'FromPort', 'ToPort')
+                                            if key in permission}, UserIdGroupPairs=pairs))
+            directions.append(references)
+        if any(directions):
+            index[sg.id] = SgReferenceIndexEntry(*directions)
+    return index
 
 
 class Delete:
     """Action-oriented class for deleting default resources"""
 
-    def __init__(self, resource_obj: Resource) -> None:
+    def __init__(self, resource_obj: Resource, max_workers: Optional[int] = None, completed: Iterable[str] = (),
+                 on_success: Optional[Callable[[str], None]] = None, poll_delay: float = POLL_DELAY,
+                 wait_timeout: float = WAIT_TIMEOUT, poller: Optional[StatusPoller] = None) -> None:
         """
         Initializer that takes an instantiated Resource class object with VPC data.
 
         :param resource_obj: (required) Instantiated Resource object with necessary data
+        :param max_workers: (optional) The maximum number of independent resources deleted at the same time
+                            (the max_workers setting when omitted)
+        :param completed: (optional) The task names (e.g. 'igw:igw-123') a previous run already completed
+        :param on_success: (optional) A callable taking the task name, called after every completed deletion
+        :param poll_delay: (optional) The seconds between two describe calls while waiting for a deletion
+        :param wait_timeout: (optional) The seconds a deletion is waited for before the task fails
+        :param poller: (optional) The StatusPoller shared by the waits of the region, one is created when omitted
         """
         self.resource_obj = resource_obj
+        self.max_workers = max_workers or get_settings().max_workers
+        self.completed = completed
+        self.on_success = on_success
+        self.poller = poller or StatusPoller(resource_obj.boto_client, resource_obj.region, interval=poll_delay,
+                                             timeout=wait_timeout)
 
-    def _delete_default_igw(self) -> bool:
+    def _delete_nat_gateway(self, nat_gateway_id: str, state: str) -> TaskSteps:
         """
-        Actions related to Internet Gateway deletion from default VPC.
+        Actions related to NAT gateway deletion from default VPC, the deletion is waited for.
 
-        This method will take the current regions igw id and detach from the default VPC and then delete.
+        Its ENI and public address are only released once the NAT gateway is 'deleted', the subnet
+        and the IGW cannot be removed before. The wait is yielded to the graph runner (see TaskSteps).
+        :param nat_gateway_id: (required) A string containing the NAT gateway ID
+        :param state: (required) A string containing the state the NAT gateway was found in
         :return A boolean result that represents whether the action was successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
         """
+        logger.info("[!] Attempting to delete NAT gateway: '%s' in Region: '%s'", nat_gateway_id,
+                    self.resource_obj.region)
+        if state != 'deleting':
+            self.resource_obj.boto_client.delete_nat_gateway(NatGatewayId=nat_gateway_id)
+        if not (yield 'nat_gateway_deleted', nat_gateway_id):
+            return False
+        logger.info("[+] '%s' in Region: '%s' was successfully deleted\n", nat_gateway_id, self.resource_obj.region)
+        return True
 
-        for igw in self.resource_obj.igw:
-            logger.info("[!] Attempting to detach and delete IGW-ID: '%s' in Region: '%s'", igw.id,
-                        self.resource_obj.region)
-            igw.detach_from_vpc(VpcId=self.resource_obj.vpc_id)
-            igw.delete()
-            logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", igw.id,
-                        self.resource_obj.region)
+    def _delete_vpc_endpoint(self, endpoint_id: str, state: str) -> TaskSteps:
+        """
+        Actions related to VPC endpoint deletion from default VPC, the deletion is waited for (yielded).
+
+        :param endpoint_id: (required) A string containing the VPC endpoint ID
+        :param state: (required) A string containing the state the VPC endpoint was found in
+        :return A boolean result that represents whether the action was successfully completed
 
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Attempting to delete VPC endpoint: '%s' in Region: '%s'", endpoint_id,
+                    self.resource_obj.region)
+        if state != 'deleting':
+            unsuccessful = self.resource_obj.boto_client.delete_vpc_endpoints(
+                VpcEndpointIds=[endpoint_id]).get('Unsuccessful')
+            if unsuccessful:
+                logger.error("[-] Unable to delete '%s' in Region: '%s': %s", endpoint_id, self.resource_obj.region,
+                             unsuccessful[0].get('Error'))
+                return False
+        if not (yield 'vpc_endpoint_deleted', endpoint_id):
+            return False
+        logger.info("[+] '%s' in Region: '%s' was successfully deleted\n", endpoint_id, self.resource_obj.region)
         return True
 
-    def _delete_default_subnet(self) -> bool:
+    def _delete_eni(self, eni: EniRecord) -> TaskSteps:
         """
-        Actions related to Subnet deletion from default VPC.
+        Actions related to the deletion of a leftover ENI from default VPC, it is detached first when attached.
+        The detachment and the deletion are waited for (yielded).
 
-        This method will the current regions subnet id and loop through all created subnets
-        in the default VPC. It will delete each found subnet.
+        :param eni: (required) The EniRecord of the ENI
         :return A boolean result that represents whether the action was successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
         """
+        logger.info("[!] Attempting to delete ENI: '%s' in Region: '%s'", eni.id, self.resource_obj.region)
+        client = self.resource_obj.boto_client
+        if eni.attachment_id:
+            client.detach_network_interface(AttachmentId=eni.attachment_id, Force=True)
+            if not (yield 'eni_available', eni.id):
+                return False
+        client.delete_network_interface(NetworkInterfaceId=eni.id)
+        if not (yield 'eni_deleted', eni.id):
+            return False
+        logger.info("[+] '%s' in Region: '%s' was successfully deleted\n", eni.id, self.resource_obj.region)
+        return True
+
+    def _delete_peering(self, peering_id: str) -> bool:
+        """
+        Actions related to the deletion of a peering connection of the default VPC.
 
-        for subnet in self.resource_obj.subnet:
-            logger.info("[!] Attempting to detach and delete Subnet-ID: '%s' in Region: '%s'", subnet.id,
-                        self.resource_obj.region)
-            subnet.delete()
-            logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", subnet.id,
-                        self.resource_obj.region)
+        :param peering_id: (required) A string containing the VPC peering connection ID
+        :return A boolean result that represents whether the action was successfully completed
 
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Attempting to delete peering connection: '%s' in Region: '%s'", peering_id,
+                    self.resource_obj.region)
+        self.resource_obj.boto_client.delete_vpc_peering_connection(VpcPeeringConnectionId=peering_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully deleted\n", peering_id, self.resource_obj.region)
         return True
 
-    def _delete_default_rtb(self) -> bool:
+    def _delete_eigw(self, eigw_id: str) -> bool:
         """
-        Actions related to RouteTable deletion from default VPC; cannot delete the default RouteTable.
+        Actions related to Egress-only Internet Gateway deletion from default VPC.
 
-        This method will look at what the current regions route table(s) and determine
-        if it is the 'Main' rtb, or if it is a custom rtb. If it is custom it will delete, and
-        if it is the 'Main' rtb it will be skipped.
+        :param eigw_id: (required) A string containing the Egress-only Internet Gateway ID
         :return A boolean result that represents whether the action was successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
         """
-        for route_table in self.resource_obj.route_table:
-            #  found the route table associations
-            associated_attribute = [routeTable.associations_attribute for routeTable in
-                                    self.resource_obj.route_table]
-            #  check to see if it is the default the route table, this cannot be removed
-            if [rtb_ass[0]['RouteTableId'] for rtb_ass in associated_attribute if rtb_ass[0]['Main'] is True]:
-                logger.info("[!] '%s'' is the main route table, this cannot be removed continuing\n",
-                            route_table.id)
-                continue
-            logger.info("[!] Attempting to detach and delete RTB: '%s' in Region: '%s'", route_table.id,
-                        self.resource_obj.region)
-            self.resource_obj.boto_resource.RouteTable(route_table.id).delete()
-            logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", route_table.id,
-                        self.resource_obj.region)
+        logger.info("[!] Attempting to delete egress-only IGW: '%s' in Region: '%s'", eigw_id,
+                    self.resource_obj.region)
+        self.resource_obj.boto_client.delete_egress_only_internet_gateway(EgressOnlyInternetGatewayId=eigw_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully deleted\n", eigw_id, self.resource_obj.region)
+        return True
+
+    def _delete_igw(self, igw_id: str) -> TaskSteps:
+        """
+        Actions related to Internet Gateway deletion from default VPC.
 
+        This method will take an igw id and detach it from the default VPC, wait for the detachment (yielded)
+        and then delete it.
+        :param igw_id: (required) A string containing the Internet Gateway ID
+        :return A boolean result that represents whether the action was successfully completed
+
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Attempting to detach and delete IGW-ID: '%s' in Region: '%s'", igw_id,
+                    self.resource_obj.region)
+        self.resource_obj.boto_client.detach_internet_gateway(InternetGatewayId=igw_id,
+                                                              VpcId=self.resource_obj.vpc_id)
+        if not (yield 'igw_detached', igw_id):
+            return False
+        self.resource_obj.boto_client.delete_internet_gateway(InternetGatewayId=igw_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", igw_id,
+                    self.resource_obj.region)
         return True
 
-    def _delete_default_nacl(self) -> bool:
+    def _delete_subnet(self, subnet_id: str) -> bool:
         """
-        Actions related to NACL deletion from default VPC; cannot delete the default NACL.
+        Actions related to Subnet deletion from default VPC.
 
-        This method will look at the current regions NACL(s) and determine whether
-        the NACL is the default VPC NACL or a custom NACL. If it is a custom NACL it will be
-        deleted, if it is the default VPC NACL it will be skipped.
+        :param subnet_id: (required) A string containing the Subnet ID
         :return A boolean result that represents whether the action was successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
         """
+        logger.info("[!] Attempting to detach and delete Subnet-ID: '%s' in Region: '%s'", subnet_id,
+                    self.resource_obj.region)
+        self.resource_obj.boto_client.delete_subnet(SubnetId=subnet_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", subnet_id,
+                    self.resource_obj.region)
+        return True
+
+    def _delete_rtb(self, route_table_id: str, entry: RouteTableIndexEntry) -> bool:
+        """
+        Actions related to RouteTable deletion from default VPC; the 'Main' rtb is never passed in.
 
-        for acl in self.resource_obj.acl:
-            if not acl.is_default:
-                logger.info("[!] Attempting to remove NACL-ID: '%s' for Region: '%s'", acl.id,
-                            self.resource_obj.region)
-                acl.delete()
-                logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", acl.id,
-                            self.resource_obj.region)
-            logger.info("[!] '%s' is the default NACL, this cannot be removed continuing\n", acl.id)
-            continue
+        The custom rtb is disassociated from its subnets and then deleted.
+        :param route_table_id: (required) A string containing the RouteTable ID
+        :param entry: (required) The RouteTableIndexEntry NamedTuple built for the rtb
+        :return A boolean result that represents whether the action was successfully completed
+
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Attempting to detach and delete RTB: '%s' in Region: '%s'", route_table_id,
+                    self.resource_obj.region)
+        for association_id in entry.subnet_association_ids:
+            self.resource_obj.boto_client.disassociate_route_table(AssociationId=association_id)
+        self.resource_obj.boto_client.delete_route_table(RouteTableId=route_table_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", route_table_id,
+                    self.resource_obj.region)
+        return True
 
+    def _delete_nacl(self, acl_id: str) -> bool:
+        """
+        Actions related to NACL deletion from default VPC; the default NACL is never passed in.
+
+        :param acl_id: (required) A string containing the NACL ID
+        :return A boolean result that represents whether the action was successfully completed
+
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Attempting to remove NACL-ID: '%s' for Region: '%s'", acl_id,
+                    self.resource_obj.region)
+        self.resource_obj.boto_client.delete_network_acl(NetworkAclId=acl_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", acl_id,
+                    self.resource_obj.region)
         return True
 
-    def _delete_default_sg(self) -> bool:
+    def _revoke_sg_references(self, sg_id: str, entry: SgReferenceIndexEntry) -> bool:
         """
-        Actions related to SG deletion from default VPC; cannot delete the default SG.
+        Actions related to revoking the rules of a SG that reference the custom SGs, one call per direction.
 
-        This method will look at the current regions SG(s) and determine whether
-        the SG is the default VPC SG or a custom SG. If it is a custom SG it will be
-        deleted, if it is the default VPC SG it will be skipped.
+        :param sg_id: (required) A string containing the ID of the referencing Security Group
+        :param entry: (required) The SgReferenceIndexEntry NamedTuple built for the SG
         :return A boolean result that represents whether the action was successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
         """
+        logger.info("[!] Attempting to revoke the SG references of SG-ID: '%s' for Region: '%s'", sg_id,
+                    self.resource_obj.region)
+        client = self.resource_obj.boto_client
+        if entry.ingress:
+            client.revoke_security_group_ingress(GroupId=sg_id, IpPermissions=entry.ingress)
+        if entry.egress:
+            client.revoke_security_group_egress(GroupId=sg_id, IpPermissions=entry.egress)
+        logger.info("[+] SG references of '%s' in Region: '%s' were successfully revoked\n", sg_id,
+                    self.resource_obj.region)
+        return True
+
+    def _delete_sg(self, sg_id: str) -> bool:
+        """
+        Actions related to SG deletion from default VPC; the default SG is never passed in.
 
-        for sg in self.resource_obj.sgs:
-            if sg.group_name != 'default':
-                logger.info("[!] Attempting to remove SG-ID: '%s' for Region: '%s'", sg.id,
-                            self.resource_obj.region)
-                sg.delete()
-                logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", sg.id,
-                            self.resource_obj.region)
-            logger.info("[!] '%s' is the default SG, this cannot be removed continuing\n", sg.id)
-            continue
+        :param sg_id: (required) A string containing the Security Group ID
+        :return A boolean result that represents whether the action was successfully completed
 
+        :raise A Boto3 AWS ClientError that was created during the API call
+        """
+        logger.info("[!] Attempting to remove SG-ID: '%s' for Region: '%s'", sg_id,
+                    self.resource_obj.region)
+        self.resource_obj.boto_client.delete_security_group(GroupId=sg_id)
+        logger.info("[+] '%s' in Region: '%s' was successfully detached and deleted\n", sg_id,
+                    self.resource_obj.region)
         return True
 
-    def _delete_default_vpc(self) -> bool:
+    def _delete_default_vpc(self) -> TaskSteps:
         """
         Actions related to the deletion of the default VPC.
 
         This method performs the actual deletion of the default VPC and needs to be
-        the last method called to avoid errors with resources still existing
-        (excluding default NACL, SG, and RTB).
+        the last task run to avoid errors with resources still existing
+        (excluding default NACL, SG, and RTB). The deletion is waited for (yielded).
         :return A boolean result that represents whether the action was successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
@@ -146,28 +312,105 @@ class Delete:
 
         logger.info("[!] Attempting to remove VPC-ID: '%s' for Region: '%s'", self.resource_obj.vpc_id,
                     self.resource_obj.region)
-        self.resource_obj.current_vpc_resource.delete()
+        vpc_id = self.resource_obj.vpc_id
+        self.resource_obj.boto_client.delete_vpc(VpcId=vpc_id)
+        self.resource_obj.invalidate_vpc_id()
+        if not (yield 'vpc_deleted', vpc_id):
+            return False
         logger.info("[+] Default VPC in Region: '%s' was successfully detached and deleted\n",
                     self.resource_obj.region)
 
         return True
 
+    def build_graph(self) -> DependencyGraph:
+        """
+        Model the default VPC resources and their dependencies as a DependencyGraph.
+
+        - NAT gateways, VPC endpoints, leftover ENIs, peering connections, egress-only IGWs and custom RTBs
+          do not depend on anything, the slow NAT gateway and endpoint deletions are waited for in parallel
+        - IGWs depend on the NAT gateways, VPC endpoints and ENIs (a public or Elastic IP mapped to any of
+          them blocks the IGW detachment)
+        - Subnets depend on the custom RTBs (their associations are removed first) and on the NAT gateways,
+          VPC endpoints and ENIs living in them
+        - Custom SGs depend on the VPC endpoints and ENIs using them and on the revocation of every rule
+          referencing a custom SG (one task per referencing SG), the SGs are then deleted in parallel
+        - Custom NACLs depend on the subnets associated with them
+        - The VPC depends on every other task
+        The default RTB, NACL and SG cannot be removed and are left to the VPC deletion, requester managed
+        ENIs go away with the resource owning them.
+        :return An instantiated DependencyGraph with one task per resource
+        """
+        graph = DependencyGraph(max_workers=self.max_workers, thread_name_prefix=self.resource_obj.region,
+                                completed=self.completed, on_success=self.on_success, poller=self.poller)
+
+        nat_tasks, interface_tasks = [], []
+        for nat_gateway in self.resource_obj.nat_gateway:
+            nat_tasks.append(f'nat:{nat_gateway.id}')
+            graph.add_task(nat_tasks[-1], partial(self._delete_nat_gateway, nat_gateway.id, nat_gateway.state))
+        for endpoint in self.resource_obj.endpoint:
+            interface_tasks.append(f'vpce:{endpoint.id}')
+            graph.add_task(interface_tasks[-1], partial(self._delete_vpc_endpoint, endpoint.id, endpoint.state))
+        for eni in self.resource_obj.eni:
+            if eni.requester_managed:
+                logger.info("[!] '%s' is managed by the resource owning it, continuing\n", eni.id)
+                continue
+            interface_tasks.append(f'eni:{eni.id}')
+            graph.add_task(interface_tasks[-1], partial(self._delete_eni, eni))
+        for peering in self.resource_obj.peering:
+            graph.add_task(f'pcx:{peering.id}', partial(self._delete_peering, peering.id))
+        for eigw in self.resource_obj.eigw:
+            graph.add_task(f'eigw:{eigw.id}', partial(self._delete_eigw, eigw.id))
+
+        for igw in self.resource_obj.igw:
+            graph.add_task(f'igw:{igw.id}', partial(self._delete_igw, igw.id), depends_on=nat_tasks + interface_tasks)
+
+        rtb_tasks = []
+        for route_table_id, entry in build_rtb_index(self.resource_obj.route_table).items():
+            if entry.is_main:
+                logger.info("[!] '%s' is the main route table, this cannot be removed continuing\n",
+                            route_table_id)
+                continue
+            rtb_tasks.append(f'rtb:{route_table_id}')
+            graph.add_task(rtb_tasks[-1], partial(self._delete_rtb, route_table_id, entry))
+
+        subnet_ids = [subnet.id for subnet in self.resource_obj.subnet]
+        for subnet_id in subnet_ids:
+            graph.add_task(f'subnet:{subnet_id}', partial(self._delete_subnet, subnet_id),
+                           depends_on=rtb_tasks + nat_tasks + interface_tasks)
+
+        for acl in self.resource_obj.acl:
+            if acl.is_default:
+                logger.info("[!] '%s' is the default NACL, this cannot be removed continuing\n", acl.id)
+                continue
+            associated = [f"subnet:{association['SubnetId']}" for association in acl.associations or []
+                          if association.get('SubnetId') in subnet_ids]
+            graph.add_task(f'nacl:{acl.id}', partial(self._delete_nacl, acl.id), depends_on=associated)
+
+        sg_reference_tasks = []
+        for sg_id, entry in build_sg_reference_index(self.resource_obj.sgs).items():
+            sg_reference_tasks.append(f'sgref:{sg_id}')
+            graph.add_task(sg_reference_tasks[-1], partial(self._revoke_sg_references, sg_id, entry))
+        for sg in self.resource_obj.sgs:
+            if sg.group_name == 'default':
+                logger.info("[!] '%s' is the default SG, this cannot be removed continuing\n", sg.id)
+                continue
+            graph.add_task(f'sg:{sg.id}', partial(self._delete_sg, sg.id),
+                           depends_on=interface_tasks + sg_reference_tasks)
+
+        graph.add_task(f'vpc:{self.resource_obj.vpc_id}', self._delete_default_vpc, depends_on=list(graph.tasks))
+        return graph
+
     @error_handler
     def delete_resources(self) -> bool:
         """
         Method to run all the action methods and return True if all successful.
 
-        This is the main method called that handles all the calls to the
-        other methods in the order necessary to perform the default VPC
-        deletion step.
-        :return A boolean result that represents whether all method calls were successfully completed
+        This is the main method called, it schedules the deletions through a DependencyGraph
+        so independent resources are deleted in parallel and the default VPC is only deleted
+        once everything it depends on is confirmed gone.
+        :return A boolean result that represents whether all deletions were successfully completed
 
         :raise A Boto3 AWS ClientError that was created during the API call
         """
-        self._delete_default_igw()
-        self._delete_default_subnet()
-        self._delete_default_rtb()
-        self._delete_default_nacl()
-        self._delete_default_sg()
-        self._delete_default_vpc()
-        return True
+        results = self.build_graph().run()
+        return all(results.values())
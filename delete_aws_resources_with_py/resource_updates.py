@@ -1,13 +1,19 @@
 """Module that contains classes for updating resources."""
 
 # Standard Library imports
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 from abc import ABC, abstractmethod
 
 # Local App imports
 from delete_aws_resources_with_py.default_resources import Resource
 from delete_aws_resources_with_py.utils import logger, error_handler
 
+DEFAULT_NACL_RULE_NUMBERS = (32767, 32768)  # the IPv4 and IPv6 catch-all deny entries, they cannot be deleted
+LEGACY_NACL_RULE_NUMBER = 100  # the allow-all entry of a default NACL, used when the entries are unknown
+SG_RULES_PAGE_SIZE = 1000  # the most rules describe_security_group_rules returns per page
+NACL_ENTRY_WORKERS = 4  # NACL entries deleted at once, kept small as every region and graph thread may run one
+
 
 class UpdateResource(ABC):
     """Abstract Class meant to be inherited."""
@@ -20,119 +26,195 @@ class UpdateResource(ABC):
 class UpdateNaclResource(UpdateResource):
     """Action-oriented class that handles the modification of default NACL"""
 
-    def __init__(self, resource_obj: Resource) -> None:
+    def __init__(self, resource_obj: Resource, max_workers: Optional[int] = None) -> None:
         """
         Initializer that takes an instantiated Resource class object with VPC data.
 
         :param resource_obj: (required) Instantiated Resource object with necessary data
+        :param max_workers: (optional) The maximum number of NACL entries deleted at the same time
+                            (NACL_ENTRY_WORKERS when omitted)
         """
         super().__init__(resource_obj)
         self.resource_obj = resource_obj
+        self.max_workers = max_workers or NACL_ENTRY_WORKERS
+
+    @staticmethod
+    def find_nacl_entries(acl: Any) -> List[Tuple[bool, int]]:
+        """
+        Static method that lists the entries to remove from a default NACL.
+
+        Every entry except the catch-all deny ones (32767 for IPv4, 32768 for IPv6) is removed, in both
+        directions. A NaclRecord saved without its entries (e.g. in an older plan file) falls back to rule 100
+        in both directions.
+
+        :param acl: (required) A NACL resource or NaclRecord
+        :return: A list of (egress flag, rule number) tuples, empty when the NACL is already locked down
+        """
+        entries = getattr(acl, 'entries', None)
+        if entries is None:
+            return [(egress, LEGACY_NACL_RULE_NUMBER) for egress in (True, False)]
+        return sorted({(entry['Egress'], entry['RuleNumber']) for entry in entries
+                       if entry['RuleNumber'] not in DEFAULT_NACL_RULE_NUMBERS}, reverse=True)
+
+    def _delete_nacl_entry(self, acl_id: str, egress: bool, rule_number: int) -> bool:
+        """
+        Delete one NACL entry, an entry that is already gone counts as deleted.
+
+        :param acl_id: (required) A string containing the NACL ID
+        :param egress: (required) A boolean selecting the outbound (True) or inbound (False) entry
+        :param rule_number: (required) The rule number of the entry
+        :return: A boolean that represents whether the entry is gone
+        """
+        try:
+            self.resource_obj.boto_client.delete_network_acl_entry(Egress=egress, NetworkAclId=acl_id,
+                                                                   RuleNumber=rule_number)
+        except Exception as err:
+            if getattr(err, 'response', {}).get('Error', {}).get('Code') == 'InvalidNetworkAclEntry.NotFound':
+                return True
+            logger.error("[-] Unable to remove %s NACL rule %s from '%s': %s",
+                         'outbound' if egress else 'inbound', rule_number, acl_id, err)
+            return False
+        return True
 
     def update_nacl_rules(self) -> bool:
         """Actions related to removing inbound/outbound rules from the default NACL"""
 
+        succeeded = True
         for acl in self.resource_obj.acl:
-            if acl.is_default:
-                logger.info("[!] Attempting to remove inbound & outbound NACL rule for '%s'", acl.id)
-                egress_flags = [True, False]
-                [self.resource_obj.boto_client.delete_network_acl_entry(Egress=x, NetworkAclId=acl.id,
-                                                                        RuleNumber=100)
-                 for x in
-                 egress_flags]  # use list comp to pass in the True/False bool into the AWS API call; both are needed
+            if not acl.is_default:
+                continue
+            entries = self.find_nacl_entries(acl)
+            if not entries:
+                logger.info("[+] Default NACL '%s' only has the catch-all deny rules, no action taken\n", acl.id)
+                continue
+            logger.info("[!] Attempting to remove %s inbound & outbound NACL rule(s) for '%s'", len(entries), acl.id)
+            if self.max_workers == 1:  # e.g. on an asyncio engine I/O thread, no thread is started
+                deleted = [self._delete_nacl_entry(acl.id, *entry) for entry in entries]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(entries))) as executor:
+                    deleted = list(executor.map(lambda entry: self._delete_nacl_entry(acl.id, *entry), entries))
+            if all(deleted):
                 logger.info("[!] Successfully removed inbound & outbound NACL rules for '%s'\n", acl.id)
+            succeeded = succeeded and all(deleted)
 
-        return True
+        return succeeded
 
 
 class UpdateSgResource(UpdateResource):
     """Action-oriented class that handles the modification of default SG"""
 
-    def __init__(self, resource_obj: Resource) -> None:
+    def __init__(self, resource_obj: Resource, default_sg_rules: Optional[Dict[str, list]] = None) -> None:
         """
         Initializer that takes an instantiated Resource class object with VPC data.
 
         :param resource_obj: (required) Instantiated Resource object with necessary data
+        :param default_sg_rules: (optional) The default SG rules already fetched (e.g. from a saved plan),
+                                 the AWS API is only called for them when this is None
         """
         super().__init__(resource_obj)
         self.resource_obj = resource_obj
+        self.default_sg_rules = default_sg_rules
 
     @staticmethod
-    def _find_egress_sg_rule(sg_rules: Dict[Any, list]) -> Dict['str', 'str']:
+    def _group_sg_rules(sg_rules: Dict[Any, list], is_egress: bool) -> Dict[str, List[str]]:
         """
-        Static method that generates a dict containing the SG egress rule(s).
+        Static method that groups every SG rule ID of one direction per Security Group.
 
-        :param sg_rules: (required) A dict that contains any type of key (usually a str) and a string val
-        :return: A dict that contains the Security Group ID and the Security Group Rule ID both as strings
+        :param sg_rules: (required) A dict that contains any type of key (usually a str) and a list of SG rules
+        :param is_egress: (required) A boolean selecting the egress (True) or ingress (False) rules
+        :return: A dict that contains the Security Group ID and a list of Security Group Rule IDs as strings
         """
-        return {k: el['SecurityGroupRuleId'] for k, v in sg_rules.items() for el in v if el['IsEgress']}
+        grouped = {}
+        for k, v in sg_rules.items():
+            for el in v:
+                if el['IsEgress'] is is_egress:
+                    grouped.setdefault(k, []).append(el['SecurityGroupRuleId'])
+        return grouped
 
-    @staticmethod
-    def _find_ingress_sg_rule(sg_rules: Dict[Any, list]):
+    def find_egress_sg_rule(self, sg_rules: Dict[Any, list]) -> Dict[str, List[str]]:
         """
-        Static method that generates a dict containing the SG ingress rule(s).
+        Method that generates a dict containing the SG egress rule(s) grouped per SG.
 
-        :param sg_rules: (required) A dict that contains any type of key (usually a str) and a string val
-        :return: A dict that contains the Security Group ID and the Security Group Rule ID both as strings
+        :param sg_rules: (required) A dict that contains any type of key (usually a str) and a list of SG rules
+        :return: A dict that contains the Security Group ID and a list of every egress Security Group Rule ID
         """
-        return {k: el['SecurityGroupRuleId'] for k, v in sg_rules.items() for el in v if not el['IsEgress']}
+        return self._group_sg_rules(sg_rules, is_egress=True)
 
-    def _get_sg_rules(self, sg_id: str) -> Dict[str, Any]:
+    def find_ingress_sg_rule(self, sg_rules: Dict[Any, list]) -> Dict[str, List[str]]:
         """
-        Method that calls the AWS API to get a list of the Security Group rules.
+        Method that generates a dict containing the SG ingress rule(s) grouped per SG.
 
-        :param sg_id: (required) A string that contains the Security Group ID used to get the SG rule ID's
-        :return: A dict that contains a complex structure (i.e. {'something': [{'something_else: 1}])
+        :param sg_rules: (required) A dict that contains any type of key (usually a str) and a list of SG rules
+        :return: A dict that contains the Security Group ID and a list of every ingress Security Group Rule ID
+        """
+        return self._group_sg_rules(sg_rules, is_egress=False)
+
+    def _get_sg_rules(self, sg_ids: Union[str, List[str]], next_token: Optional[str] = None) -> Dict[str, Any]:
         """
+        Method that calls the AWS API to get one page of the Security Group rules of one or more SGs.
 
+        :param sg_ids: (required) A string or a list of strings containing the Security Group ID(s) used to get
+                       the SG rule ID's
+        :param next_token: (optional) The NextToken of the previous page, the first page is fetched when None
+        :return: A dict that contains a complex structure (i.e. {'something': [{'something_else: 1}])
+        """
+        kwargs = {'NextToken': next_token} if next_token else {}
         return self.resource_obj.boto_client.describe_security_group_rules(
-            Filters=[{'Name': 'group-id', 'Values': [sg_id]}])
+            Filters=[{'Name': 'group-id', 'Values': [sg_ids] if isinstance(sg_ids, str) else list(sg_ids)}],
+            MaxResults=SG_RULES_PAGE_SIZE, **kwargs)
 
-    def _check_for_default_sg(self) -> Dict[Any, Any]:
+    def check_for_default_sg(self) -> Dict[Any, Any]:
         """
-        Method used to filter for default Security Groups in current it VPC.
+        Method used to fetch the rules of every default Security Group in the current VPC.
 
+        The rules of all the default SGs are requested at once and every page is followed, each rule is
+        put in the bucket of the SG it belongs to as the pages come in.
         :return: A dict containing complex structure (i.e. {'something': [{'something_else: 1}])
         """
+        sg_ids = [sg.id for sg in self.resource_obj.sgs if sg.group_name == 'default']
         out_dict = {}
-        for sg in self.resource_obj.sgs:
-            if sg.group_name == 'default':
-                sg_rule = self._get_sg_rules(sg.id)
-                out_dict[sg.id] = sg_rule['SecurityGroupRules']
+        next_token = None
+        while sg_ids:
+            page = self._get_sg_rules(sg_ids, next_token)
+            for sg_rule in page['SecurityGroupRules']:
+                out_dict.setdefault(sg_rule['GroupId'], []).append(sg_rule)
+            next_token = page.get('NextToken')
+            if not next_token:
+                break
         return out_dict
 
-    def _revoke_ingress_sg_rule(self, sg_rules: Dict[str, str]) -> bool:
+    def _revoke_ingress_sg_rule(self, sg_rules: Dict[str, List[str]]) -> bool:
         """
-        A method for deleting the default Security Group ingress rule(s).
+        A method for deleting the default Security Group ingress rule(s), one batched call per SG.
 
-        :param sg_rules: (required) A dict containing the Security Group ID and Security Group Rule ID as strings
+        :param sg_rules: (required) A dict containing the Security Group ID and a list of Security Group Rule IDs
         :return: A boolean that represents whether the deletion event was successful
 
         :raise A Boto3 API ClientError created by AWS during the API call
         """
 
         for k, v in sg_rules.items():
-            logger.info("[!] Attempting to remove inbound SG rule '%s' in Region: '%s'",
-                        v, self.resource_obj.region)
+            logger.info("[!] Attempting to remove inbound SG rule(s) '%s' from '%s' in Region: '%s'",
+                        v, k, self.resource_obj.region)
             self.resource_obj.boto_client.revoke_security_group_ingress(GroupId=k,
-                                                                        SecurityGroupRuleIds=[v])
+                                                                        SecurityGroupRuleIds=v)
         return True
 
-    def _revoke_egress_sg_rule(self, sg_rules: Dict[str, str]) -> bool:
+    def _revoke_egress_sg_rule(self, sg_rules: Dict[str, List[str]]) -> bool:
         """
-        A method for deleting the default Security Group egress rule(s).
+        A method for deleting the default Security Group egress rule(s), one batched call per SG.
 
-        :param sg_rules: (required) A dict containing the Security Group ID and Security Group Rule ID as strings
+        :param sg_rules: (required) A dict containing the Security Group ID and a list of Security Group Rule IDs
         :return: A boolean that represents whether the deletion event was successful
 
         :raise A Boto3 API ClientError created by AWS during the API call
         """
 
         for k, v in sg_rules.items():
-            logger.info("[!] Attempting to remove outbound SG rule '%s' in Region: '%s'",
-                        v, self.resource_obj.region)
+            logger.info("[!] Attempting to remove outbound SG rule(s) '%s' from '%s' in Region: '%s'",
+                        v, k, self.resource_obj.region)
             self.resource_obj.boto_client.revoke_security_group_egress(GroupId=k,
-                                                                       SecurityGroupRuleIds=[v])
+                                                                       SecurityGroupRuleIds=v)
         return True
 
     @error_handler
@@ -142,9 +224,9 @@ class UpdateSgResource(UpdateResource):
 
         :return: Boolean result the represents whether the actions were successfully completed
         """
-        default_sg = self._check_for_default_sg()
-        if self._revoke_egress_sg_rule(self._find_egress_sg_rule(default_sg)):
+        default_sg = self.default_sg_rules if self.default_sg_rules is not None else self.check_for_default_sg()
+        if self._revoke_egress_sg_rule(self.find_egress_sg_rule(default_sg)):
             logger.info("[+] Outbound SG rule in Region: '%s' was successfully removed\n", self.resource_obj.region)
-        if self._revoke_ingress_sg_rule(self._find_ingress_sg_rule(default_sg)):
+        if self._revoke_ingress_sg_rule(self.find_ingress_sg_rule(default_sg)):
             logger.info("[+] Inbound SG rule in Region: '%s' was successfully removed\n", self.resource_obj.region)
         return True
@@ -0,0 +1,241 @@
+"""Module containing the adaptive retry and throttling layer used by every boto3 client"""
+
+# Standard Library imports
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.utils import logger
+
+THROTTLING_ERROR_CODES = frozenset([
+    'RequestLimitExceeded',
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'SlowDown',
+])
+TRANSIENT_ERROR_CODES = frozenset([
+    'DependencyViolation',  # e.g. an IGW detach that has not propagated yet
+    'InternalError',
+    'InternalFailure',
+    'ServiceUnavailable',
+    'Unavailable',
+    'RequestTimeout',
+    'RequestTimeoutException',
+])
+
+MAX_ATTEMPTS = 6
+BASE_DELAY = 0.5
+MAX_DELAY = 20.0
+
+
+def retry_config(**kwargs: Any) -> Any:
+    """
+    Build the botocore Config of the pooled clients.
+
+    botocore's own retry handler is limited to a single attempt so retries are only decided here.
+    :param kwargs: (optional) Other Config options (e.g. max_pool_connections)
+    :return: A botocore.config.Config
+    """
+    from botocore.config import Config  # botocore is only imported once a client is needed
+    return Config(retries={'mode': 'standard', 'total_max_attempts': 1}, **kwargs)
+
+
+def is_throttling_error(error_code: Optional[str]) -> bool:
+    """
+    Check whether an AWS error code means the request was throttled.
+
+    :param error_code: (required) A string containing the AWS error code (e.g. 'RequestLimitExceeded')
+    :return: A boolean result that represents whether the error is a throttling error
+    """
+    return error_code in THROTTLING_ERROR_CODES
+
+
+def is_retryable_error(error_code: Optional[str]) -> bool:
+    """
+    Check whether an AWS error code is worth retrying.
+
+    :param error_code: (required) A string containing the AWS error code (e.g. 'DependencyViolation')
+    :return: A boolean result that represents whether the call should be retried
+    """
+    return error_code in THROTTLING_ERROR_CODES or error_code in TRANSIENT_ERROR_CODES
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose refill rate adapts to throttling responses.
+
+    The rate is halved whenever AWS throttles a request and grows back additively
+    with every successful request, so concurrent workers in the same region back off together.
+    """
+
+    def __init__(self, rate: float = 20.0, min_rate: float = 0.5, max_rate: float = 50.0,
+                 increase: float = 0.5) -> None:
+        """
+        Initializer that takes in four optional params.
+
+        :param rate: (optional) The starting number of requests allowed per second
+        :param min_rate: (optional) The lowest rate the bucket can be lowered to
+        :param max_rate: (optional) The highest rate the bucket can be raised to
+        :param increase: (optional) The rate added after every successful request
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self._tokens = max(1.0, rate)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'TokenBucket({self.rate}, {self.min_rate}, {self.max_rate}, {self.increase})'  # pragma: no cover
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill, capped at one second worth of requests"""
+        now = time.monotonic()
+        self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_throttle(self) -> None:
+        """Halve the rate after AWS throttled a request"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, max(1.0, self.rate))
+
+    def on_success(self) -> None:
+        """Raise the rate a little after a successful request"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+_buckets: Dict[Tuple[Optional[str], str, Optional[str]], TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(region: Optional[str], account: Optional[str] = None,
+                     service: Optional[str] = None) -> TokenBucket:
+    """
+    Return the TokenBucket shared by every client of an (account, region, service), creating it on first use.
+
+    The API rate limits apply per account, region and service, so the accounts of a sweep do not throttle
+    each other and neither do EC2 and SSM. The account ID is used rather than the access key, the key of
+    assumed role credentials changes on every refresh while the learned rate has to carry over.
+
+    :param region: (required) A string containing the region (None for clients without a region)
+    :param account: (optional) A string containing the AWS account ID, None for the ambient account
+    :param service: (optional) A string containing the service name (e.g. 'ec2', 'ssm')
+    :return: The TokenBucket for the (account, region, service)
+    """
+    with _buckets_lock:
+        return _buckets.setdefault((account, region or 'global', service), TokenBucket())
+
+
+class AdaptiveRetryHandler:
+    """
+    Action-oriented class registered on the botocore 'needs-retry' event.
+
+    It classifies the error of every attempt, feeds throttling responses back into the region's
+    TokenBucket and returns an exponential backoff delay with full jitter when the call is retryable.
+    """
+
+    def __init__(self, bucket: TokenBucket, max_attempts: int = MAX_ATTEMPTS, base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY) -> None:
+        """
+        Initializer that takes in one required and three optional params.
+
+        :param bucket: (required) The TokenBucket of the region the client belongs to
+        :param max_attempts: (optional) The maximum number of attempts (first call included)
+        :param base_delay: (optional) The delay in seconds the exponential backoff starts from
+        :param max_delay: (optional) The maximum delay in seconds between two attempts
+        """
+        self.bucket = bucket
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def __repr__(self):
+        return f'AdaptiveRetryHandler({self.bucket}, {self.max_attempts})'  # pragma: no cover
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Compute the delay before the next attempt (full jitter).
+
+        :param attempts: (required) The number of attempts made so far
+        :return: A float containing the number of seconds to sleep
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def __call__(self, attempts: int, response: Any = None, caught_exception: Optional[Exception] = None,
+                 operation: Any = None, **kwargs: Any) -> Optional[float]:
+        """
+        Decide whether an attempt needs to be retried.
+
+        :param attempts: (required) The number of attempts made so far
+        :param response: (optional) A tuple containing the http response and the parsed response
+        :param caught_exception: (optional) The exception raised while sending the request, only connection
+                                 errors and timeouts are retried
+        :param operation: (optional) The botocore OperationModel of the call
+        :return: The number of seconds to sleep before retrying, None when the call should not be retried
+        """
+        if caught_exception is not None:
+            import botocore.exceptions
+            error_code = type(caught_exception).__name__
+            retryable = isinstance(caught_exception, (botocore.exceptions.HTTPClientError,
+                                                      botocore.exceptions.ConnectionError))
+        else:
+            error_code = response[1].get('Error', {}).get('Code') if response else None
+            if error_code is None:
+                self.bucket.on_success()
+                return None
+            retryable = is_retryable_error(error_code)
+
+        if is_throttling_error(error_code):
+            self.bucket.on_throttle()
+        if not retryable:
+            return None
+        operation_name = getattr(operation, 'name', 'unknown')
+        if attempts >= self.max_attempts:
+            logger.warning("[-] Giving up on '%s' after %s attempts: %s", operation_name, attempts, error_code)
+            return None
+        delay = self.backoff(attempts)
+        logger.warning("[!] '%s' failed with '%s', retrying in %.2fs (attempt %s/%s)", operation_name,
+                       error_code, delay, attempts, self.max_attempts)
+        return delay
+
+
+def install_retry_handlers(client: Any, region: Optional[str], account: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Register the token bucket and the AdaptiveRetryHandler on a boto3 client.
+
+    The bucket is taken before every HTTP attempt ('before-send') and the handler decides
+    on retries ('needs-retry'), which covers direct calls, paginators and resource objects alike.
+
+    :param client: (required) An instantiated boto3 client (for a resource pass resource.meta.client)
+    :param region: (required) A string containing the region of the client
+    :param account: (optional) A string containing the AWS account ID of the client, None for the ambient account
+    :param kwargs: (optional) Keyword args passed to the AdaptiveRetryHandler (e.g. max_attempts)
+    :return: The same client, to allow chaining
+    """
+    bucket = get_token_bucket(region, account, client.meta.service_model.service_name)
+    service_id = client.meta.service_model.service_id.hyphenize()
+    client.meta.events.register(f'before-send.{service_id}', lambda **_: bucket.acquire(),
+                                unique_id='delete-aws-resources-token-bucket')
+    client.meta.events.register_first(f'needs-retry.{service_id}', AdaptiveRetryHandler(bucket, **kwargs),
+                                      unique_id='delete-aws-resources-adaptive-retry')
+    return client
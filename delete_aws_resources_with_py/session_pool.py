@@ -0,0 +1,167 @@
+"""Module containing the shared boto3 session and the client/resource pool built on it"""
+
+# Standard Library imports
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.describe_cache import DescribeCache, install_describe_cache
+from delete_aws_resources_with_py.instrumentation import install_instrumentation
+from delete_aws_resources_with_py.retry import install_retry_handlers, retry_config
+
+PoolKey = Tuple[str, Optional[str], Optional[str]]
+SecretKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+class BotoSessionPool:
+    """
+    Action-oriented class that hands out boto3 clients and resources from one shared session.
+
+    The service models are loaded once by the shared session. Clients are thread-safe and reused
+    per (service, region, account); resources are not thread-safe, so they are reused per thread.
+    Only the client built with the latest credentials of an account is kept, when the assumed role
+    credentials are refreshed the next request replaces it and the old client is released.
+    The client and the resources of one (service, region, account) share a DescribeCache, which
+    lives as long as the pool (i.e., one run).
+    """
+
+    def __init__(self, max_pool_connections: int = 10) -> None:
+        """
+        Initializer that takes in one optional param.
+
+        :param max_pool_connections: (optional) The size of the HTTP connection pool of every client
+        """
+        import boto3  # imported on first use, importing the package stays cheap
+        self.max_pool_connections = max_pool_connections
+        self.config = retry_config(max_pool_connections=max_pool_connections)
+        self._session = boto3.session.Session()
+        self._clients: Dict[PoolKey, Tuple[SecretKey, Any]] = {}
+        self._caches: Dict[PoolKey, DescribeCache] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()  # creating clients from a shared session is not thread-safe
+
+    def __repr__(self):
+        return f'BotoSessionPool({self.max_pool_connections})'  # pragma: no cover
+
+    def _create(self, factory: Any, service: str, region: Optional[str], access_key: Optional[str],
+                secret_key: Optional[str], session_token: Optional[str]) -> Any:
+        """
+        Create a client or resource from the shared session while holding the lock.
+
+        :param factory: (required) The bound session method to call (session.client or session.resource)
+        :return: The instantiated boto3 client or resource
+        """
+        with self._lock:
+            return factory(service, region_name=region, aws_access_key_id=access_key,
+                           aws_secret_access_key=secret_key, aws_session_token=session_token, config=self.config)
+
+    @staticmethod
+    def _key(service: str, region: Optional[str], access_key: Optional[str],
+             account_id: Optional[str]) -> PoolKey:
+        """Build the pool key, the access key stands in for the account when no account ID is passed"""
+        return service, region, account_id if account_id is not None else access_key
+
+    def _install(self, client: Any, key: PoolKey, account_id: Optional[str]) -> Any:
+        """Register the retry, instrumentation and describe cache handlers on a new client"""
+        with self._lock:
+            cache = self._caches.setdefault(key, DescribeCache())
+        client = install_retry_handlers(client, key[1], account_id)  # throttled per (account, region, service)
+        return install_describe_cache(install_instrumentation(client), cache)
+
+    def clear_describe_caches(self) -> None:
+        """Drop the cached describe responses of every client and resource, e.g. between two runs"""
+        with self._lock:
+            for cache in self._caches.values():
+                cache.clear()
+
+    def client(self, service: str, region: Optional[str] = None, access_key: Optional[str] = None,
+               secret_key: Optional[str] = None, session_token: Optional[str] = None,
+               account_id: Optional[str] = None) -> Any:
+        """
+        Return the pooled client for (service, region, account), creating it on first use or when the credentials
+        of the account changed (the client built with the previous ones is dropped).
+
+        :param service: (required) AWS service passed as a string (e.g. 'ec2', 'ssm')
+        :param region: (optional) AWS region passed as a string
+        :param access_key: (optional) AWS STS Access Key string
+        :param secret_key: (optional) AWS STS Secret Key string
+        :param session_token: (optional) AWS STS Session Token string
+        :param account_id: (optional) AWS account ID the credentials belong to, None for the ambient account
+        :return: An instantiated boto3 client with the retry, instrumentation and cache handlers installed
+        """
+        key = self._key(service, region, access_key, account_id)
+        secret = (access_key, secret_key, session_token)
+        entry = self._clients.get(key)
+        if entry is None or entry[0] != secret:
+            client = self._install(
+                self._create(self._session.client, service, region, access_key, secret_key, session_token), key,
+                account_id)
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is None or entry[0] != secret:
+                    entry = self._clients[key] = (secret, client)
+        return entry[1]
+
+    def resource(self, service: str, region: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None, session_token: Optional[str] = None,
+                 account_id: Optional[str] = None) -> Any:
+        """
+        Return the calling thread's resource for (service, region, account), creating it on first use or when the
+        credentials of the account changed (the resource built with the previous ones is dropped).
+
+        :param service: (required) AWS service passed as a string (e.g. 'ec2')
+        :param region: (optional) AWS region passed as a string
+        :param access_key: (optional) AWS STS Access Key string
+        :param secret_key: (optional) AWS STS Secret Key string
+        :param session_token: (optional) AWS STS Session Token string
+        :param account_id: (optional) AWS account ID the credentials belong to, None for the ambient account
+        :return: An instantiated boto3 resource owned by the calling thread
+        """
+        resources = self._local.__dict__.setdefault('resources', {})
+        key = self._key(service, region, access_key, account_id)
+        secret = (access_key, secret_key, session_token)
+        if key not in resources or resources[key][0] != secret:
+            resource = self._create(self._session.resource, service, region, access_key, secret_key, session_token)
+            self._install(resource.meta.client, key, account_id)
+            resources[key] = (secret, resource)
+        return resources[key][1]
+
+
+_pool: Optional[BotoSessionPool] = None
+_pool_size: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def configure_session_pool(max_pool_connections: int) -> None:
+    """
+    Set the connection pool size and drop the shared pool (and every pooled client and resource).
+
+    The next get_session_pool() call builds a new pool with this size.
+    :param max_pool_connections: (required) The size of the HTTP connection pool of every client
+    :return: None
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        _pool, _pool_size = None, max_pool_connections
+
+
+def clear_describe_caches() -> None:
+    """Drop the cached describe responses of the shared pool, if there is one"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.clear_describe_caches()
+
+
+def get_session_pool(max_pool_connections: int = 10) -> BotoSessionPool:
+    """
+    Return the shared pool, creating it on first use.
+
+    :param max_pool_connections: (optional) The pool size used unless configure_session_pool() set one
+    :return: The shared BotoSessionPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BotoSessionPool(_pool_size or max_pool_connections)
+        return _pool
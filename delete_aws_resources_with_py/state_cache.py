@@ -0,0 +1,84 @@
+"""Module containing the persisted per account/region state cache used to fast path clean regions"""
+
+# Standard Library imports
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+# Local App imports
+from delete_aws_resources_with_py.utils import logger
+
+RegionState = namedtuple('RegionState', ['no_default_vpc', 'ssm_disabled', 'verified'])
+
+
+class RegionStateCache:
+    """
+    Action-oriented class that remembers which regions were last seen clean.
+
+    A region is clean when it has no default VPC and its SSM public sharing setting is 'Disable'.
+    Inside the TTL a clean region is skipped, after it only a cheap verification is needed.
+    """
+
+    def __init__(self, state_file: str, ttl: int = 86400) -> None:
+        """
+        Initializer that takes in one required and one optional param.
+
+        :param state_file: (required) A string containing the path of the JSON state file
+        :param ttl: (optional) The number of seconds a verified clean region is trusted without any API call
+        """
+        self.state_file = state_file
+        self.ttl = ttl
+        self._states: Dict[str, RegionState] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(state_file):
+            with open(state_file, 'r') as f:
+                self._states = {key: RegionState(**state) for key, state in json.load(f).items()}
+
+    def __repr__(self):
+        return f'RegionStateCache({self.state_file}, {self.ttl})'  # pragma: no cover
+
+    @staticmethod
+    def _key(account: Optional[str], region: str) -> str:
+        return f"{account or 'default'}/{region}"
+
+    def get(self, account: Optional[str], region: str) -> Optional[RegionState]:
+        """
+        Return the cached state of a region.
+
+        :param account: (required) A string containing the account ID, None for the ambient account
+        :param region: (required) A string containing the region
+        :return: A RegionState NamedTuple, None when the region was never recorded
+        """
+        with self._lock:
+            return self._states.get(self._key(account, region))
+
+    def is_clean(self, account: Optional[str], region: str) -> bool:
+        """Check whether the region was last seen without a default VPC and with SSM sharing disabled"""
+        state = self.get(account, region)
+        return bool(state and state.no_default_vpc and state.ssm_disabled)
+
+    def is_fresh(self, account: Optional[str], region: str) -> bool:
+        """Check whether the region is clean and was verified within the TTL"""
+        return self.is_clean(account, region) and time.time() - self.get(account, region).verified < self.ttl
+
+    def mark_clean(self, account: Optional[str], region: str) -> None:
+        """Record that the region was just verified clean"""
+        with self._lock:
+            self._states[self._key(account, region)] = RegionState(True, True, time.time())
+
+    def forget(self, account: Optional[str], region: str) -> None:
+        """Drop the region, it is fully processed on the next run"""
+        with self._lock:
+            self._states.pop(self._key(account, region), None)
+
+    def save(self) -> None:
+        """Write the state file (atomically, a crash never leaves a partial file)"""
+        with self._lock:
+            states = {key: state._asdict() for key, state in sorted(self._states.items())}
+        with open(f'{self.state_file}.tmp', 'w') as f:
+            json.dump(states, f, indent=2)
+        os.replace(f'{self.state_file}.tmp', self.state_file)
+        logger.info("[+] Region state cache written to '%s'", self.state_file)
@@ -0,0 +1,238 @@
+"""Module containing the shared poller that waits for asynchronous detach/delete operations to complete"""
+
+# Standard Library imports
+import asyncio
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.describe_cache import bypass_describe_cache
+from delete_aws_resources_with_py.utils import logger
+
+#  How a kind of pending resource is described in bulk and when it counts as done. A resource missing
+#  from the response counts as done (it is gone).
+PollSpec = namedtuple('PollSpec', ['operation', 'result_key', 'id_key', 'filter_name', 'done'])
+
+POLL_SPECS = {
+    'igw_detached': PollSpec('describe_internet_gateways', 'InternetGateways', 'InternetGatewayId',
+                             'internet-gateway-id',
+                             lambda item: all(attachment.get('State') == 'detached'
+                                              for attachment in item.get('Attachments', []))),
+    'nat_gateway_deleted': PollSpec('describe_nat_gateways', 'NatGateways', 'NatGatewayId', 'nat-gateway-id',
+                                    lambda item: item['State'] in ('deleted', 'failed')),
+    # describe_vpc_endpoints is called with VpcEndpointIds, an ID that is gone fails the call (see _describe)
+    'vpc_endpoint_deleted': PollSpec('describe_vpc_endpoints', 'VpcEndpoints', 'VpcEndpointId', None,
+                                     lambda item: item['State'].lower() == 'deleted'),
+    'eni_available': PollSpec('describe_network_interfaces', 'NetworkInterfaces', 'NetworkInterfaceId',
+                              'network-interface-id', lambda item: item['Status'] == 'available'),
+    'eni_deleted': PollSpec('describe_network_interfaces', 'NetworkInterfaces', 'NetworkInterfaceId',
+                            'network-interface-id', lambda item: False),
+    'vpc_deleted': PollSpec('describe_vpcs', 'Vpcs', 'VpcId', 'vpc-id', lambda item: False),
+}
+MAX_FILTER_VALUES = 200  # the most values a describe filter accepts
+POLL_DELAY = 5.0  # seconds between two ticks
+WAIT_TIMEOUT = 900.0  # seconds a task waits before it fails
+
+PendingKey = Tuple[str, str]
+
+_wait_deadline: Optional[float] = None  # time.monotonic() value no wait of the process may outlast
+
+
+def set_wait_deadline(deadline: Optional[float]) -> None:
+    """
+    Cap every StatusPoller wait of the process at a deadline (e.g. the end of a Lambda invocation).
+
+    :param deadline: (required) A time.monotonic() value, None removes the cap
+    :return: None
+    """
+    global _wait_deadline
+    _wait_deadline = deadline
+
+
+def _is_not_found(err: Exception) -> bool:
+    """Check whether a botocore ClientError reports a resource that does not exist"""
+    return getattr(err, 'response', {}).get('Error', {}).get('Code', '').endswith('NotFound')
+
+
+class StatusPoller:
+    """
+    Action-oriented class that waits for the asynchronous operations of one region in bulk.
+
+    Every waiting task registers the (kind, resource ID) it waits for and blocks. A single polling
+    thread describes all the pending IDs of a kind with one multi-ID call per tick and wakes up the
+    tasks whose resource is done, so the poll traffic does not grow with the number of waiting tasks.
+    The thread stops once nothing is pending. Coroutines wait through wait_async() instead, their ticks
+    are run by a single polling task on the event loop and no thread is held between two ticks.
+    """
+
+    def __init__(self, client: Any, region: str, interval: float = POLL_DELAY,
+                 timeout: float = WAIT_TIMEOUT) -> None:
+        """
+        Initializer that takes in two required and two optional params.
+
+        :param client: (required) An instantiated boto3 EC2 client of the region
+        :param region: (required) A string value containing the region, used in the log lines
+        :param interval: (optional) The seconds between two ticks
+        :param timeout: (optional) The seconds a task waits before giving up, unless wait() is given another one
+        """
+        self.client = client
+        self.region = region
+        self.interval = interval
+        self.timeout = timeout
+        self._pending: Dict[PendingKey, List[Callable[[], Any]]] = {}  # the wake-up callables of every waiter
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ticker: Optional['asyncio.Task'] = None
+
+    def __repr__(self):
+        return f'StatusPoller({self.region}, {self.interval})'  # pragma: no cover
+
+    def wait(self, kind: str, resource_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a resource is done or the timeout is reached.
+
+        :param kind: (required) A POLL_SPECS key (e.g. 'nat_gateway_deleted')
+        :param resource_id: (required) A string containing the ID of the resource
+        :param timeout: (optional) The seconds to wait, the poller timeout when omitted (capped at the wait
+                        deadline when one is set)
+        :return: A boolean result that represents whether the resource is done
+        """
+        if kind not in POLL_SPECS:
+            raise ValueError(f"Unknown poll kind '{kind}'")
+        event = threading.Event()
+        with self._lock:
+            self._pending.setdefault((kind, resource_id), []).append(event.set)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'{self.region}-poller', daemon=True)
+                self._thread.start()
+        timeout = self._timeout(timeout)
+        if event.wait(timeout):
+            return True
+        self._drop((kind, resource_id), event.set)
+        logger.error("[-] Timed out after %ss waiting for %s '%s' in Region: '%s'", timeout, kind, resource_id,
+                     self.region)
+        return False
+
+    async def wait_async(self, kind: str, resource_id: str, call: Optional[Callable[..., Awaitable[Any]]] = None,
+                         timeout: Optional[float] = None) -> bool:
+        """
+        Await until a resource is done or the timeout is reached, without holding a thread.
+
+        :param kind: (required) A POLL_SPECS key (e.g. 'nat_gateway_deleted')
+        :param resource_id: (required) A string containing the ID of the resource
+        :param call: (optional) A coroutine function awaiting a blocking callable (e.g. AsyncEngine.call), the ticks
+                     are run through it; the default executor of the loop is used when omitted
+        :param timeout: (optional) The seconds to wait, the poller timeout when omitted (capped at the wait
+                        deadline when one is set)
+        :return: A boolean result that represents whether the resource is done
+        """
+        if kind not in POLL_SPECS:
+            raise ValueError(f"Unknown poll kind '{kind}'")
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        wake = partial(loop.call_soon_threadsafe, event.set)  # the ticks run on another thread
+        with self._lock:
+            self._pending.setdefault((kind, resource_id), []).append(wake)
+            if self._ticker is None or self._ticker.done():
+                self._ticker = loop.create_task(self._run_async(call or partial(loop.run_in_executor, None)))
+        timeout = self._timeout(timeout)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.error("[-] Timed out after %ss waiting for %s '%s' in Region: '%s'", timeout, kind, resource_id,
+                         self.region)
+            return False
+        finally:
+            if not event.is_set():
+                self._drop((kind, resource_id), wake)
+
+    def _timeout(self, timeout: Optional[float]) -> float:
+        """Return the seconds a wait may last, the poller timeout when omitted, capped at the wait deadline"""
+        timeout = self.timeout if timeout is None else timeout
+        if _wait_deadline is not None:
+            timeout = max(0.0, min(timeout, _wait_deadline - time.monotonic()))
+        return timeout
+
+    def _drop(self, key: PendingKey, wake: Callable[[], Any]) -> None:
+        """Unregister the wake-up callable of a waiter that gave up, the key goes once nobody waits for it"""
+        with self._lock:
+            wakers = self._pending.get(key, [])
+            if wake in wakers:
+                wakers.remove(wake)
+            if not wakers:
+                self._pending.pop(key, None)
+
+    def _describe(self, spec: PollSpec, ids: List[str]) -> List[Dict[str, Any]]:
+        """Describe the pending IDs of one kind in as few calls as the filter limit allows"""
+        items = []
+        for start in range(0, len(ids), MAX_FILTER_VALUES):
+            chunk = ids[start:start + MAX_FILTER_VALUES]
+            if spec.filter_name:
+                kwargs = {'Filters': [{'Name': spec.filter_name, 'Values': chunk}]}
+            else:
+                kwargs = {'VpcEndpointIds': chunk}
+            try:
+                items.extend(getattr(self.client, spec.operation)(**kwargs)[spec.result_key])
+            except Exception as err:
+                if spec.filter_name or not _is_not_found(err):
+                    raise
+                # an ID that is gone fails the whole call, the chunk is asked for one ID at a time instead
+                for resource_id in chunk:
+                    try:
+                        items.extend(getattr(self.client, spec.operation)(
+                            VpcEndpointIds=[resource_id])[spec.result_key])
+                    except Exception as single_err:
+                        if not _is_not_found(single_err):
+                            raise
+        return items
+
+    def tick(self) -> Set[PendingKey]:
+        """
+        Describe every pending resource once, one call per kind, and wake up the tasks whose resource is done.
+        The describe calls bypass the describe cache, the live state is what is polled for.
+
+        :return: A set containing the (kind, resource ID) tuples found done
+        """
+        with self._lock:
+            by_kind: Dict[str, List[str]] = {}
+            for kind, resource_id in self._pending:
+                by_kind.setdefault(kind, []).append(resource_id)
+        done = set()
+        for kind, ids in by_kind.items():
+            spec = POLL_SPECS[kind]
+            try:
+                with bypass_describe_cache():
+                    items = {item[spec.id_key]: item for item in self._describe(spec, sorted(ids))}
+            except Exception as err:  # e.g. throttling past the retries, the next tick tries again
+                logger.warning("[!] Polling %s in Region: '%s' failed: %s", kind, self.region, err)
+                continue
+            done.update((kind, resource_id) for resource_id in ids
+                        if resource_id not in items or spec.done(items[resource_id]))
+        with self._lock:
+            for key in done:
+                for wake in self._pending.pop(key, []):
+                    wake()
+        return done
+
+    def _run(self) -> None:
+        """Tick until nothing is pending"""
+        while True:
+            self.tick()
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            time.sleep(self.interval)
+
+    async def _run_async(self, call: Callable[..., Awaitable[Any]]) -> None:
+        """Tick until nothing is pending, every tick is awaited through call and the loop sleeps in between"""
+        while True:
+            await call(self.tick)
+            with self._lock:
+                if not self._pending:
+                    return
+            await asyncio.sleep(self.interval)
@@ -1,40 +1,81 @@
 """Module containing Utility Functions"""
-import json
 # Standard Library imports
+import json
 import logging
 import optparse
-
-# Third-party imports
-import boto3
-import botocore.exceptions
+import os
+from collections import namedtuple
+from typing import List, Optional
 
 #####################################
-# Get Environment Variables
+# Settings (config.json)
 #####################################
-with open('config.json', 'r') as f:
-    data = json.load(f)
+CONFIG_FILE = 'config.json'
+CONFIG_ENV = 'DELETE_AWS_RESOURCES_CONFIG'  # overrides the lookup, e.g. in a Lambda package
+
+Settings = namedtuple('Settings', ['skip_regions', 'logging_level', 'max_workers', 'credential_expiry_threshold',
+                                   'max_pool_connections', 'journal_file', 'state_ttl', 'max_concurrency'])
+
+_settings: Optional[Settings] = None
+
+
+def _find_config_file() -> Optional[str]:
+    """Return the first existing config file: $DELETE_AWS_RESOURCES_CONFIG, ./config.json, then the repo's one"""
+    candidates = [os.environ.get(CONFIG_ENV), os.path.join(os.getcwd(), CONFIG_FILE),
+                  os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), CONFIG_FILE)]
+    return next((path for path in candidates if path and os.path.isfile(path)), None)
+
+
+def load_settings(config_file: Optional[str] = None) -> Settings:
+    """
+    Read the settings and make them the ones returned by get_settings().
+    :param config_file: (optional) Path of the JSON config file, looked up when omitted (the defaults are used
+                        when no file is found)
+    :return: A Settings NamedTuple
+    """
+    global _settings
+    config_file = config_file or _find_config_file()
+    data = {}
+    if config_file:
+        with open(config_file, 'r') as f:
+            data = json.load(f)
+    _settings = Settings(
+        skip_regions=data.get('skip_regions', []),
+        logging_level=data.get('logging_level', 'INFO'),
+        max_workers=data.get('max_workers', 8),
+        credential_expiry_threshold=data.get('credential_expiry_threshold', 300),
+        max_pool_connections=data.get('max_pool_connections', 16),
+        journal_file=data.get('journal_file', 'sweep_journal.jsonl'),
+        state_ttl=data.get('state_ttl', 86400),
+        max_concurrency=data.get('max_concurrency', 64),
+    )
+    return _settings
 
-SKIP_REGION_LIST = data.get('skip_regions')
+
+def get_settings() -> Settings:
+    """Return the settings, they are read on first use instead of when the package is imported"""
+    return _settings or load_settings()
 
 
 #####################################
 # Create logger func
 #####################################
-def create_logger() -> logging:
+def create_logger(level: Optional[str] = None) -> logging.Logger:
     """
-    Create a logger
+    Configure the root logger, called once by the entry points (importing the package leaves logging untouched)
+    :param level: (optional) The logging level name, the 'logging_level' setting when omitted
     :return: logger
     """
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(levelname)s: %(message)s')
+    logging.basicConfig(level=level or get_settings().logging_level,
+                        format='%(asctime)s: %(levelname)s: [%(threadName)s] %(message)s')
     log = logging.getLogger()
-    # log.setLevel(logging.INFO)
 
     logging.getLogger('boto').setLevel(logging.CRITICAL)
     logging.getLogger('botocore').setLevel(logging.CRITICAL)
     return log
 
 
-logger = create_logger()  # create logger func
+logger = logging.getLogger()
 
 
 ###########################
@@ -48,10 +89,12 @@ def error_handler(func):
         try:
             result = func(*args, **kwargs)
             return result
-        except botocore.exceptions.ClientError as err:
-            logger.error("ClientError: error=%s func=%s", err, func.__name__)
         except Exception as err:
-            logger.error("GeneralException: error=%s func=%s", err, func.__name__)
+            from botocore.exceptions import ClientError  # already loaded by the failed call
+            if isinstance(err, ClientError):
+                logger.error("ClientError: error=%s func=%s", err, func.__name__)
+            else:
+                logger.error("GeneralException: error=%s func=%s", err, func.__name__)
 
     return inner_func
 
@@ -59,16 +102,19 @@ def error_handler(func):
 #######################################
 # Option Parser
 #######################################
-parser = optparse.OptionParser()
-
-
-def get_args() -> str:
-    """Function used to trigger and handle CLI args passed by user"""
+def build_parser(settings: Optional[Settings] = None) -> optparse.OptionParser:
+    """
+    Build the CLI option parser, its defaults come from the settings
+    :param settings: (optional) A Settings NamedTuple, get_settings() when omitted
+    :return: An optparse.OptionParser
+    """
+    settings = settings or get_settings()
+    parser = optparse.OptionParser()
     parser.add_option(
         "-o",
         "--option",
         dest="sanitize_option",
-        help="Requires either (delete OR modify)"
+        help="Requires either (delete OR modify OR plan OR apply OR ssm)"
              "** delete option **\n"
              "- Deletes Internet Gateway"
              "- Deletes Subnets"
@@ -80,16 +126,168 @@ def get_args() -> str:
              "** modify option **\n"
              "- Updates default NACL (removes inbound/outbound rules)"
              "- Updates default SG (removes inbound/outbound rules)"
-             "- Updates SSM parameter preferences to block public access"
+             "- Updates SSM parameter preferences to block public access\n\n"
+             "** plan option **\n"
+             "- Describes the resources and emits the --plan-action actions as JSON, nothing is changed\n\n"
+             "** apply option **\n"
+             "- Runs the actions of the plan saved in --plan-file\n\n"
+             "** ssm option **\n"
+             "- Only updates SSM parameter preferences to block public access, no VPC work"
+    )
+    parser.add_option(
+        "-w",
+        "--max-workers",
+        dest="max_workers",
+        type="int",
+        default=settings.max_workers,
+        help="Number of regions to process concurrently (default: %default)"
+    )
+    parser.add_option(
+        "--max-pool-connections",
+        dest="max_pool_connections",
+        type="int",
+        default=settings.max_pool_connections,
+        help="Size of the HTTP connection pool of every pooled boto3 client (default: %default)"
+    )
+    parser.add_option(
+        "-a",
+        "--accounts",
+        dest="accounts",
+        help="Comma separated list of account IDs to sweep by assuming --role-name in each of them"
+    )
+    parser.add_option(
+        "-r",
+        "--role-name",
+        dest="role_name",
+        help="Name of the role assumed in every account passed with --accounts"
+    )
+    parser.add_option(
+        "--credential-expiry-threshold",
+        dest="credential_expiry_threshold",
+        type="int",
+        default=settings.credential_expiry_threshold,
+        help="Renew the assumed role credentials when fewer seconds than this are left (default: %default)"
+    )
+    parser.add_option(
+        "--report-file",
+        dest="report_file",
+        help="Path of a JSON file the consolidated result report is written to"
+    )
+
+    parser.add_option(
+        "--plan-action",
+        dest="plan_action",
+        type="choice",
+        choices=["delete", "modify"],
+        default="delete",
+        help="Option planned by '-o plan', either delete or modify (default: %default)"
+    )
+    parser.add_option(
+        "--plan-file",
+        dest="plan_file",
+        help="Path of the JSON plan written by '-o plan' (printed when omitted) and read by '-o apply'"
+    )
+
+    parser.add_option(
+        "--metrics-file",
+        dest="metrics_file",
+        help="Path of a file every AWS API call (operation, region, latency, retries, error code) is exported to"
+    )
+    parser.add_option(
+        "--metrics-format",
+        dest="metrics_format",
+        type="choice",
+        choices=["jsonl", "prometheus"],
+        default="jsonl",
+        help="Format of --metrics-file, JSON lines or a Prometheus textfile (default: %default)"
     )
-    parsing_input = parser.parse_args()
 
-    (options, args) = parsing_input
+    parser.add_option(
+        "--journal-file",
+        dest="journal_file",
+        help="Path of the journal every completed step is appended to "
+             "(default with --resume: '%s')" % settings.journal_file
+    )
+    parser.add_option(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        default=False,
+        help="Skip the regions and steps the journal of a previous sweep shows as done"
+    )
+
+    parser.add_option(
+        "--state-file",
+        dest="state_file",
+        help="Path of the region state cache, regions it remembers as clean (no default VPC, SSM sharing disabled) "
+             "are skipped within --state-ttl and cheaply verified after it"
+    )
+    parser.add_option(
+        "--state-ttl",
+        dest="state_ttl",
+        type="int",
+        default=settings.state_ttl,
+        help="Seconds a verified clean region is skipped without any API call (default: %default)"
+    )
+
+    parser.add_option(
+        "--engine",
+        dest="engine",
+        type="choice",
+        choices=["threads", "asyncio"],
+        default="threads",
+        help="Execution engine, 'threads' runs one worker per region, 'asyncio' runs every account x region unit "
+             "and every delete task as a coroutine and the AWS calls on --max-workers I/O threads "
+             "(default: %default)"
+    )
+    parser.add_option(
+        "--max-concurrency",
+        dest="max_concurrency",
+        type="int",
+        default=settings.max_concurrency,
+        help="Number of account x region units in progress at the same time with '--engine asyncio' "
+             "(default: %default)"
+    )
+    parser.add_option(
+        "--verify",
+        dest="verify",
+        action="store_true",
+        default=False,
+        help="Re-describe every target region after the sweep (polling until the changes are visible) and log out "
+             "a pass/fail compliance matrix"
+    )
+    parser.add_option(
+        "--verify-file",
+        dest="verify_file",
+        help="Path of a CSV file the compliance matrix is written to (implies --verify)"
+    )
+    return parser
+
+
+def get_options(argv: Optional[List[str]] = None) -> optparse.Values:
+    """Function used to parse and validate all CLI args passed by user"""
+    parser = build_parser()
+    (options, args) = parser.parse_args(argv)
 
     if not options.sanitize_option:
         parser.error("[-] Please specify an option flag, --help for more info")
-    else:
-        return options.sanitize_option
+    if options.max_workers < 1:
+        parser.error("[-] --max-workers needs to be a positive number")
+    if options.max_concurrency < 1:
+        parser.error("[-] --max-concurrency needs to be a positive number")
+    if options.accounts:
+        options.accounts = [account.strip() for account in options.accounts.split(',') if account.strip()]
+        if not options.role_name:
+            parser.error("[-] --role-name is required when --accounts is passed")
+    if options.resume and not options.journal_file:
+        options.journal_file = get_settings().journal_file
+    if options.sanitize_option == 'apply' and not options.plan_file:
+        parser.error("[-] --plan-file is required with the apply option")
+    if options.verify_file:
+        options.verify = True
+    if options.verify and options.sanitize_option == 'plan':
+        parser.error("[-] --verify cannot be used with the plan option, nothing is changed")
+    return options
 
 
 #######################################
@@ -97,22 +295,30 @@ def get_args() -> str:
 #######################################
 
 @error_handler
-def create_boto3(service: str, boto_type: str, region=None, access_key=None, secret_key=None, session_token=None):
+def create_boto3(service: str, boto_type: str, region=None, access_key=None, secret_key=None, session_token=None,
+                 account_id=None):
     """
     Create a boto3 client or resource based AWS service passed (e.g. 'sts', 's3')
+    Clients and resources come from the shared BotoSessionPool, so service models are loaded once
+    and clients are reused per (service, region, credentials); every client gets the adaptive retry
+    and per (account, region, service) throttling handlers from the retry module.
     :param service: (required) AWS resource passed as a string (e.g. 'sts', 'ssm', 'ec2', etc...)
     :param boto_type: (required) Type of boto3 instantiation wanted (i.e. 'boto_client' OR 'boto_resource')
     :param region: (optional) AWS region passed as a string (optional)
     :param access_key: (optional) AWS STS Access Key string obtained for cross-account assume role actions (optional)
     :param secret_key: (optional) AWS STS Secret Key string obtained for cross-account assume role actions (optional)
     :param session_token: (optional) AWS STS Session Token string obtained for cross-account assume role actions (optional)
+    :param account_id: (optional) AWS account ID the credentials belong to, None for the ambient account (optional)
     :return: Initialized boto3 client or resource
     """
+    from delete_aws_resources_with_py.session_pool import get_session_pool  # its handlers log through this module
+
+    pool = get_session_pool(get_settings().max_pool_connections)
     if boto_type == 'boto_client':
-        return boto3.client(service, region_name=region, aws_access_key_id=access_key, aws_secret_access_key=secret_key, aws_session_token=session_token)
+        return pool.client(service, region, access_key, secret_key, session_token, account_id)
 
     elif boto_type == 'boto_resource':
-        return boto3.resource(service, region_name=region, aws_access_key_id=access_key, aws_secret_access_key=secret_key, aws_session_token=session_token)
+        return pool.resource(service, region, access_key, secret_key, session_token, account_id)
 
     else:
         logger.error(
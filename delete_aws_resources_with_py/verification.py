@@ -0,0 +1,226 @@
+"""Module containing the verification stage that confirms the end state of a sweep"""
+
+# Standard Library imports
+import asyncio
+import csv
+import time
+from collections import namedtuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Local App imports
+from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference
+from delete_aws_resources_with_py.describe_cache import bypass_describe_cache
+from delete_aws_resources_with_py.resource_updates import DEFAULT_NACL_RULE_NUMBERS
+from delete_aws_resources_with_py.utils import logger
+
+VerificationResult = namedtuple('VerificationResult', ['region', 'account', 'action', 'checks'])
+
+CHECK_VPC_DELETED = 'default_vpc_deleted'
+CHECK_NACL_RULES_REMOVED = 'nacl_rules_removed'
+CHECK_SG_RULES_REVOKED = 'sg_rules_revoked'
+CHECK_SSM_DISABLED = 'ssm_sharing_disabled'
+CHECKS = (CHECK_VPC_DELETED, CHECK_NACL_RULES_REMOVED, CHECK_SG_RULES_REVOKED, CHECK_SSM_DISABLED)
+
+#  The checks confirming each option, the SSM setting is changed by every option
+ACTION_CHECKS = {
+    'delete': (CHECK_VPC_DELETED, CHECK_SSM_DISABLED),
+    'modify': (CHECK_NACL_RULES_REMOVED, CHECK_SG_RULES_REVOKED, CHECK_SSM_DISABLED),
+    'ssm': (CHECK_SSM_DISABLED,),
+}
+
+
+def passed(result: VerificationResult) -> bool:
+    """Check whether every check of a region passed"""
+    return all(result.checks.values())
+
+
+class Verifier:
+    """
+    Action-oriented class that re-describes a region and confirms the end state of an option.
+
+    Every check is polled with an exponential backoff, so a change that is not visible yet
+    (the describe calls are eventually consistent) does not fail the check straight away. The
+    checks bypass the describe cache, every attempt reads the live state. verify_async is the
+    asyncio counterpart: it awaits every attempt on the engine I/O threads and the backoff on
+    the event loop, so no thread is held between two attempts.
+    """
+
+    def __init__(self, ec2_client: Any, ssm_client: Any, region: str, attempts: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 8.0) -> None:
+        """
+        Initializer that takes in three required and three optional params.
+
+        :param ec2_client: (required) An instantiated boto3 client for EC2
+        :param ssm_client: (required) An instantiated boto3 client for SSM
+        :param region: (required) A string value containing the region to verify
+        :param attempts: (optional) The number of times a failing check is run before it fails
+        :param base_delay: (optional) The delay in seconds before the second attempt, doubled for every next one
+        :param max_delay: (optional) The maximum delay in seconds between two attempts
+        """
+        self.ec2_client = ec2_client
+        self.ssm_client = ssm_client
+        self.region = region
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def __repr__(self):
+        return f'Verifier({self.region}, {self.attempts})'  # pragma: no cover
+
+    def _default_vpc_id(self) -> Optional[str]:
+        """Return the ID of the default VPC of the region, None when there is none"""
+        vpcs = self.ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs']
+        return vpcs[0]['VpcId'] if vpcs else None
+
+    def check_vpc_deleted(self) -> bool:
+        """Check that the region no longer has a default VPC"""
+        return self._default_vpc_id() is None
+
+    def check_nacl_rules_removed(self) -> bool:
+        """Check that the default NACL of the default VPC only has its catch-all deny entries left"""
+        vpc_id = self._default_vpc_id()
+        if vpc_id is None:
+            return True
+        acls = self.ec2_client.describe_network_acls(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]},
+                                                              {'Name': 'default', 'Values': ['true']}])
+        return not [entry for acl in acls['NetworkAcls'] for entry in acl['Entries']
+                    if entry['RuleNumber'] not in DEFAULT_NACL_RULE_NUMBERS]
+
+    def check_sg_rules_revoked(self) -> bool:
+        """Check that the default SG of the default VPC has no inbound or outbound rule left"""
+        vpc_id = self._default_vpc_id()
+        if vpc_id is None:
+            return True
+        sgs = self.ec2_client.describe_security_groups(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]},
+                                                                {'Name': 'group-name', 'Values': ['default']}])
+        return not [sg for sg in sgs['SecurityGroups'] if sg['IpPermissions'] or sg['IpPermissionsEgress']]
+
+    def check_ssm_disabled(self) -> bool:
+        """Check that the SSM document public sharing setting is 'Disable'"""
+        return not SsmPreference(ssm_client=self.ssm_client, region=self.region).get_current_service_setting_check()
+
+    def _attempt(self, check: Callable[[], bool]) -> Tuple[bool, Any]:
+        """Run a check once on the live state, return whether it passed and the reason when it did not"""
+        try:
+            with bypass_describe_cache():
+                if check():
+                    return True, None
+            return False, 'not in the expected state yet'
+        except Exception as err:  # an error is a failed attempt, it does not stop the other checks
+            return False, err
+
+    def _backoff(self, name: str, attempt: int, reason: Any) -> float:
+        """Return the delay before the next attempt of a check and log it out"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        logger.info("[!] Check '%s' in '%s' %s, polling again in %.1fs", name, self.region, reason, delay)
+        return delay
+
+    def _poll(self, name: str, check: Callable[[], bool]) -> bool:
+        """
+        Run a check until it passes or the attempts are used up.
+
+        :param name: (required) The name of the check, used in the log lines
+        :param check: (required) A callable taking no args returning whether the check passed
+        :return: A boolean result that represents whether the check passed
+        """
+        for attempt in range(1, self.attempts + 1):
+            succeeded, reason = self._attempt(check)
+            if succeeded:
+                return True
+            if attempt < self.attempts:
+                time.sleep(self._backoff(name, attempt, reason))
+        logger.error("[-] Check '%s' failed in '%s' after %s attempts: %s", name, self.region, self.attempts, reason)
+        return False
+
+    async def _poll_async(self, name: str, check: Callable[[], bool], call: Callable[..., Awaitable[Any]]) -> bool:
+        """
+        Asyncio counterpart of _poll, every attempt is awaited with call and the backoff on the event loop.
+
+        :param name: (required) The name of the check, used in the log lines
+        :param check: (required) A callable taking no args returning whether the check passed
+        :param call: (required) A coroutine function running a blocking callable (i.e., AsyncEngine.call)
+        :return: A boolean result that represents whether the check passed
+        """
+        for attempt in range(1, self.attempts + 1):
+            succeeded, reason = await call(self._attempt, check)
+            if succeeded:
+                return True
+            if attempt < self.attempts:
+                await asyncio.sleep(self._backoff(name, attempt, reason))
+        logger.error("[-] Check '%s' failed in '%s' after %s attempts: %s", name, self.region, self.attempts, reason)
+        return False
+
+    def _checks(self) -> Dict[str, Callable[[], bool]]:
+        """Return every check method by check name"""
+        return {CHECK_VPC_DELETED: self.check_vpc_deleted, CHECK_NACL_RULES_REMOVED: self.check_nacl_rules_removed,
+                CHECK_SG_RULES_REVOKED: self.check_sg_rules_revoked, CHECK_SSM_DISABLED: self.check_ssm_disabled}
+
+    def verify(self, action: str, account: Optional[str] = None) -> VerificationResult:
+        """
+        Run the checks of an option.
+
+        :param action: (required) A string containing the option of the sweep (i.e., 'delete', 'modify' or 'ssm')
+        :param account: (optional) A string containing the account ID the region belongs to
+        :return: A VerificationResult NamedTuple containing a dict of every check name and whether it passed
+        """
+        checks = self._checks()
+        return VerificationResult(self.region, account, action,
+                                  {name: self._poll(name, checks[name]) for name in ACTION_CHECKS[action]})
+
+    async def verify_async(self, action: str, call: Callable[..., Awaitable[Any]],
+                           account: Optional[str] = None) -> VerificationResult:
+        """
+        Asyncio counterpart of verify.
+
+        :param action: (required) A string containing the option of the sweep (i.e., 'delete', 'modify' or 'ssm')
+        :param call: (required) A coroutine function running a blocking callable (i.e., AsyncEngine.call)
+        :param account: (optional) A string containing the account ID the region belongs to
+        :return: A VerificationResult NamedTuple containing a dict of every check name and whether it passed
+        """
+        checks = self._checks()
+        return VerificationResult(self.region, account, action,
+                                  {name: await self._poll_async(name, checks[name], call)
+                                   for name in ACTION_CHECKS[action]})
+
+
+def _matrix_rows(results: List[VerificationResult]) -> List[List[str]]:
+    """Turn the results into the rows of the compliance matrix, a check an option does not need is '-'"""
+    rows = []
+    for result in sorted(results, key=lambda result: (result.account or '', result.region)):
+        cells = ['-' if name not in result.checks else 'PASS' if result.checks[name] else 'FAIL' for name in CHECKS]
+        rows.append([result.account or '-', result.region, result.action, *cells,
+                     'PASS' if passed(result) else 'FAIL'])
+    return rows
+
+
+def format_compliance_matrix(results: List[VerificationResult]) -> str:
+    """
+    Render the pass/fail compliance matrix of a verification stage as a text table.
+
+    :param results: (required) A list of VerificationResult NamedTuples
+    :return: A string containing one line per account and region
+    """
+    rows = [['account', 'region', 'action', *CHECKS, 'compliant']] + _matrix_rows(results)
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def write_compliance_matrix(results: List[VerificationResult], matrix_file: str) -> None:
+    """
+    Write the pass/fail compliance matrix of a verification stage as CSV.
+
+    :param results: (required) A list of VerificationResult NamedTuples
+    :param matrix_file: (required) A string containing the path of the CSV file to write
+    :return: None
+    """
+    with open(matrix_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['account', 'region', 'action', *CHECKS, 'compliant'])
+        writer.writerows(_matrix_rows(results))
+    logger.info("[+] Compliance matrix written to '%s'", matrix_file)
+
+
+def summarize(results: List[VerificationResult]) -> Dict[str, int]:
+    """Count the compliant and non-compliant regions"""
+    compliant = sum(1 for result in results if passed(result))
+    return {'compliant': compliant, 'non_compliant': len(results) - compliant}
@@ -0,0 +1,264 @@
+"""Module containing the moto backed benchmark of the delete and modify options
+
+Run it from the repository root, e.g.:
+
+    python -m tests.benchmark --regions 4 --custom-sgs 5 --sg-rules 20 --output bench.json
+
+The synthetic default VPCs are built with plain boto3 clients, only the calls made by the
+script itself (through create_boto3) are counted. Moto does not implement the SSM service
+settings nor the security group rule IDs calls, those are answered by a 'before-call' stub
+so the call counts stay representative of a real sweep.
+"""
+
+# Standard Library imports
+import json
+import optparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+# Third-party imports
+import boto3
+from botocore.awsrequest import AWSResponse
+from moto import mock_ec2, mock_ssm
+
+# Local App imports
+from delete_aws_resources_with_py.describe_cache import CACHE_HIT_KEY
+from delete_aws_resources_with_py.main import RegionResult, process_region, _run_in_pool
+from delete_aws_resources_with_py.session_pool import configure_session_pool, get_session_pool
+from delete_aws_resources_with_py.utils import create_logger, get_settings, logger
+
+BENCHMARK_VERSION = 1
+
+
+class ApiCallCounter:
+    """
+    Thread-safe counter registered on the 'after-call' event of the shared boto3 session.
+
+    The calls answered by the describe cache never reach AWS and are not counted.
+    """
+
+    def __init__(self) -> None:
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'ApiCallCounter({dict(self.calls)})'  # pragma: no cover
+
+    def __call__(self, model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+        if context.get(CACHE_HIT_KEY):
+            return
+        with self._lock:
+            self.calls[model.name] += 1
+
+
+class MotoGapStub:
+    """
+    Answer the calls moto does not implement with synthetic responses.
+
+    :param sg_rules: (required) The number of rules reported for every default SG (half egress, half ingress)
+    """
+
+    def __init__(self, sg_rules: int) -> None:
+        self.sg_rules = sg_rules
+
+    def __repr__(self):
+        return f'MotoGapStub({self.sg_rules})'  # pragma: no cover
+
+    @staticmethod
+    def _respond(parsed: Dict[str, Any]) -> tuple:
+        parsed['ResponseMetadata'] = {'HTTPStatusCode': 200}
+        return AWSResponse('https://moto', 200, {}, None), parsed
+
+    @staticmethod
+    def remember_params(params: Dict[str, Any], context: Dict[str, Any], **kwargs: Any) -> None:
+        """'before-parameter-build' handler keeping the API params, 'before-call' only gets the serialized body"""
+        context['benchmark_params'] = dict(params)
+
+    def __call__(self, model: Any, context: Dict[str, Any], **kwargs: Any) -> Optional[tuple]:
+        params = context.get('benchmark_params', {})
+        if model.name == 'GetServiceSetting':
+            return self._respond({'ServiceSetting': {'SettingId': params['SettingId'], 'SettingValue': 'Enable'}})
+        if model.name == 'UpdateServiceSetting':
+            return self._respond({})
+        if model.name == 'DescribeSecurityGroupRules':
+            group_ids = [value for f in params.get('Filters', []) if f['Name'] == 'group-id' for value in f['Values']]
+            return self._respond({'SecurityGroupRules': [
+                {'SecurityGroupRuleId': f'sgr-{group_id[3:]}{i:04d}', 'GroupId': group_id, 'IsEgress': i % 2 == 0}
+                for group_id in group_ids for i in range(self.sg_rules)]})
+        if model.name.startswith('RevokeSecurityGroup') and 'SecurityGroupRuleIds' in params:
+            return self._respond({'Return': True})
+        return None
+
+
+def build_synthetic_vpc(region: str, custom_sgs: int, custom_nacls: int, custom_rtbs: int, sg_rules: int) -> None:
+    """
+    Add custom resources to the moto default VPC of a region.
+
+    The default subnets (one per AZ) are created by moto, the custom route tables and NACLs
+    are associated with them round robin.
+
+    :param region: (required) A string containing the mocked region
+    :param custom_sgs: (required) The number of custom SGs to create
+    :param custom_nacls: (required) The number of custom NACLs to create
+    :param custom_rtbs: (required) The number of custom route tables to create
+    :param sg_rules: (required) The number of ingress rules added to every custom SG
+    :return: None
+    """
+    client = boto3.client('ec2', region_name=region)
+    vpc_id = client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'][0]['VpcId']
+    subnet_ids = [subnet['SubnetId'] for subnet in
+                  client.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['Subnets']]
+    igw_id = client.create_internet_gateway()['InternetGateway']['InternetGatewayId']
+    client.attach_internet_gateway(InternetGatewayId=igw_id, VpcId=vpc_id)
+    for i in range(custom_rtbs):
+        rtb_id = client.create_route_table(VpcId=vpc_id)['RouteTable']['RouteTableId']
+        if i < len(subnet_ids):
+            client.associate_route_table(RouteTableId=rtb_id, SubnetId=subnet_ids[i])
+    associations = {association['SubnetId']: association['NetworkAclAssociationId']
+                    for acl in client.describe_network_acls(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])[
+                        'NetworkAcls'] for association in acl['Associations']}
+    for i in range(custom_nacls):
+        acl_id = client.create_network_acl(VpcId=vpc_id)['NetworkAcl']['NetworkAclId']
+        if i < len(subnet_ids):
+            client.replace_network_acl_association(AssociationId=associations[subnet_ids[i]], NetworkAclId=acl_id)
+    for i in range(custom_sgs):
+        group_id = client.create_security_group(GroupName=f'bench-{i}', Description='benchmark',
+                                                VpcId=vpc_id)['GroupId']
+        if sg_rules:
+            client.authorize_security_group_ingress(GroupId=group_id, IpPermissions=[
+                {'IpProtocol': 'tcp', 'FromPort': 1000 + port, 'ToPort': 1000 + port,
+                 'IpRanges': [{'CidrIp': '10.0.0.0/8'}]} for port in range(sg_rules)])
+
+
+def pick_regions(count: int) -> List[str]:
+    """
+    Pick the first regions the script would sweep.
+
+    :param count: (required) The number of regions wanted
+    :return: A list of region names not listed in the skip_regions setting (config.json)
+    """
+    regions = boto3.session.Session().get_available_regions('ec2')
+    return [region for region in regions if region not in get_settings().skip_regions][:count]
+
+
+def _timed(region: str, action: str, timings: Dict[str, float]) -> RegionResult:
+    start = time.perf_counter()
+    try:
+        return process_region(region, action)
+    finally:
+        timings[region] = round(time.perf_counter() - start, 4)
+
+
+def run_benchmark(action: str, regions: List[str], custom_sgs: int = 2, custom_nacls: int = 2,
+                  custom_rtbs: int = 2, sg_rules: int = 4, max_workers: int = 4) -> Dict[str, Any]:
+    """
+    Sweep synthetic default VPCs end to end with one option and measure the sweep.
+
+    :param action: (required) A string containing the option to run (i.e., 'delete' or 'modify')
+    :param regions: (required) A list of mocked regions to build and sweep
+    :param custom_sgs: (optional) The number of custom SGs per region
+    :param custom_nacls: (optional) The number of custom NACLs per region
+    :param custom_rtbs: (optional) The number of custom route tables per region
+    :param sg_rules: (optional) The number of rules per custom SG and per default SG
+    :param max_workers: (optional) The maximum number of regions processed at the same time
+    :return: A dict containing the wall times, the API calls per operation name and the peak memory
+    """
+    with mock_ec2(), mock_ssm():
+        for region in regions:
+            build_synthetic_vpc(region, custom_sgs, custom_nacls, custom_rtbs, sg_rules)
+        configure_session_pool(max_workers)
+        counter = ApiCallCounter()
+        events = get_session_pool()._session.events  # inherited by every client created from the pool
+        events.register('after-call', counter)
+        stub = MotoGapStub(sg_rules)
+        events.register('before-parameter-build', stub.remember_params)
+        events.register('before-call', stub)
+        timings: Dict[str, float] = {}
+        tracemalloc.start()
+        start = time.perf_counter()
+        results, failed = _run_in_pool(
+            [(None, region, partial(_timed, region, action, timings)) for region in regions], max_workers)
+        wall_time = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        configure_session_pool(max_workers)
+    return {
+        'wall_time': round(wall_time, 4),
+        'region_wall_time': dict(sorted(timings.items())),
+        'api_calls': dict(sorted(counter.calls.items())),
+        'api_calls_total': sum(counter.calls.values()),
+        'peak_memory_bytes': peak_memory,
+        'statuses': dict(Counter(result.status for result in results + failed)),
+    }
+
+
+def compare_call_counts(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    List the operations whose call count grew compared to a baseline report with the same scale.
+
+    :param current: (required) A dict containing the current benchmark report
+    :param baseline: (required) A dict containing the baseline benchmark report
+    :return: A list of strings describing every regression, empty when there is none
+    """
+    regressions = []
+    for action, result in current['results'].items():
+        baseline_calls = baseline.get('results', {}).get(action, {}).get('api_calls', {})
+        for operation, count in result['api_calls'].items():
+            if count > baseline_calls.get(operation, 0):
+                regressions.append(f'{action}: {operation} {baseline_calls.get(operation, 0)} -> {count}')
+    return regressions
+
+
+def get_options(argv: Optional[List[str]] = None) -> optparse.Values:
+    """Function used to parse the benchmark CLI args"""
+    parser = optparse.OptionParser()
+    parser.add_option("--regions", dest="regions", type="int", default=3, help="Number of mocked regions")
+    parser.add_option("--custom-sgs", dest="custom_sgs", type="int", default=2, help="Custom SGs per region")
+    parser.add_option("--custom-nacls", dest="custom_nacls", type="int", default=2, help="Custom NACLs per region")
+    parser.add_option("--custom-rtbs", dest="custom_rtbs", type="int", default=2, help="Custom RTBs per region")
+    parser.add_option("--sg-rules", dest="sg_rules", type="int", default=4, help="Rules per SG")
+    parser.add_option("-w", "--max-workers", dest="max_workers", type="int", default=4,
+                      help="Number of regions processed concurrently")
+    parser.add_option("--output", dest="output", default="bench_output.json", help="Path of the JSON report")
+    parser.add_option("--baseline", dest="baseline",
+                      help="Path of a previous JSON report, exit with 1 when an API call count grew")
+    return parser.parse_args(argv)[0]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the delete and modify benchmarks and write the JSON report.
+
+    :param argv: (optional) A list of CLI args, sys.argv is used when None
+    :return: The exit code, 1 when a call count regressed against the baseline
+    """
+    options = get_options(argv)
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        os.environ.setdefault(name, 'testing')
+    create_logger('WARNING')
+    regions = pick_regions(options.regions)
+    scale = {'regions': len(regions), 'custom_sgs': options.custom_sgs, 'custom_nacls': options.custom_nacls,
+             'custom_rtbs': options.custom_rtbs, 'sg_rules': options.sg_rules, 'max_workers': options.max_workers}
+    report = {'version': BENCHMARK_VERSION, 'scale': scale, 'results': {
+        action: run_benchmark(action, regions, options.custom_sgs, options.custom_nacls, options.custom_rtbs,
+                              options.sg_rules, options.max_workers) for action in ('delete', 'modify')}}
+    with open(options.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if options.baseline:
+        with open(options.baseline, 'r') as f:
+            regressions = compare_call_counts(report, json.load(f))
+        for regression in regressions:
+            logger.error("[-] API call count regression: %s", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,13 @@ from moto import mock_ec2, mock_ssm
 
 # Local App imports
 from delete_aws_resources_with_py.default_resources import Resource
+from delete_aws_resources_with_py.session_pool import configure_session_pool
+
+
+@pytest.fixture(autouse=True)
+def session_pool():
+    """Give every test its own pool so pooled clients do not leak between tests."""
+    configure_session_pool(max_pool_connections=10)
 
 
 @pytest.fixture(scope='function')
@@ -50,6 +57,16 @@ def get_resource_obj(ec2_client, ec2_resource):
     return obj
 
 
+@pytest.fixture
+def get_inventory_resource_obj(ec2_client, ec2_resource):
+    vpc_id = ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'][0]['VpcId']
+    igw_id = ec2_client.create_internet_gateway()['InternetGateway']['InternetGatewayId']
+    ec2_client.attach_internet_gateway(InternetGatewayId=igw_id, VpcId=vpc_id)
+    obj = Resource(boto_resource=ec2_resource, boto_client=ec2_client,
+                   region='us-east-1', inventory=True)
+    return obj
+
+
 @pytest.fixture
 def sg_egress_ingress_rule():
     with open('tests/json_files/egress_sg_rule.json', 'rb') as f:
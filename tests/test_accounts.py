@@ -0,0 +1,38 @@
+"""Module containing tests for AccountSession class"""
+
+# Standard Library imports
+from datetime import datetime, timedelta, timezone
+
+# Third-party imports
+import pytest
+from moto import mock_sts
+
+# Local App imports
+from delete_aws_resources_with_py.accounts import AccountSession, Credentials
+
+
+@pytest.fixture
+def sts(aws_credentials, monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with mock_sts():
+        yield
+
+
+def test_account_session_assumes_role(sts):
+    session = AccountSession('111111111111', 'Vending')
+    assert session.role_arn == 'arn:aws:iam::111111111111:role/Vending'
+
+    credentials = session.credentials
+    assert isinstance(credentials, Credentials)
+    assert credentials.access_key and credentials.secret_key and credentials.session_token
+    assert session.credentials is credentials  # still valid, no second assume role call
+
+
+def test_account_session_refreshes_expiring_credentials(sts, mocker):
+    session = AccountSession('111111111111', 'Vending', expiry_threshold=300)
+    expiring = Credentials('key', 'secret', 'token', datetime.now(timezone.utc) + timedelta(seconds=60))
+    session._credentials = expiring
+    spy = mocker.spy(session, '_assume_role')
+
+    assert session.credentials is not expiring
+    assert spy.call_count == 1
@@ -0,0 +1,117 @@
+"""Module containing tests for the async_engine module"""
+
+# Standard Library imports
+import asyncio
+import json
+import threading
+import time
+from functools import partial
+
+# Third-party imports
+import boto3
+from moto import mock_ec2
+
+# Local App imports
+from delete_aws_resources_with_py.async_engine import AsyncEngine
+from delete_aws_resources_with_py.dependency_graph import DependencyGraph
+from delete_aws_resources_with_py.main import main
+from delete_aws_resources_with_py.status_poller import StatusPoller
+from delete_aws_resources_with_py.utils import get_options
+
+REGIONS = ['eu-west-1', 'eu-west-2', 'ap-south-1']
+
+
+def test_run_graph_matches_sync_semantics():
+    graph = DependencyGraph()
+    graph.add_task('a', lambda: True)
+    graph.add_task('b', lambda: False)
+    graph.add_task('c', lambda: True, depends_on=['a'])
+    graph.add_task('d', lambda: True, depends_on=['b'])
+    engine = AsyncEngine()
+
+    results = engine.run_units([(None, 'graph', lambda: engine.run_graph(graph))])
+
+    assert results == [(None, 'graph', graph.run(), None)]
+    assert results[0][2] == {'a': True, 'b': False, 'c': True, 'd': False}
+
+
+def test_run_units_bounds_concurrency():
+    engine = AsyncEngine(max_concurrency=3, io_workers=2)
+    running, peak = [0], [0]
+
+    async def unit(index):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.05)
+        running[0] -= 1
+        if index == 0:
+            raise RuntimeError('boom')
+        return index
+
+    start = time.perf_counter()
+    results = engine.run_units([(None, f'region-{i}', lambda i=i: unit(i)) for i in range(9)])
+
+    assert peak[0] == 3
+    assert time.perf_counter() - start < 0.05 * 9 / 2
+    assert [value for _, _, value, _ in results] == [None] + list(range(1, 9))
+    assert isinstance(results[0][3], RuntimeError)
+
+
+def test_graph_waits_do_not_hold_the_io_threads(mocker):
+    released = threading.Event()
+    client = mocker.Mock()
+    client.describe_nat_gateways.side_effect = lambda Filters: {'NatGateways': [] if released.is_set() else [
+        {'NatGatewayId': nat_id, 'State': 'deleting'} for nat_id in Filters[0]['Values']]}
+    graph = DependencyGraph(poller=StatusPoller(client, 'us-east-1', interval=0.01))
+
+    def delete(nat_id):
+        return (yield 'nat_gateway_deleted', nat_id)
+
+    for index in range(20):
+        graph.add_task(f'nat:{index}', partial(delete, f'nat-{index}'))
+    engine = AsyncEngine(max_concurrency=3, io_workers=1)
+    threads = []
+
+    async def waker():
+        await asyncio.sleep(0.05)
+        threads.extend(thread.name for thread in threading.enumerate())
+        await engine.call(released.set)  # needs the only I/O thread while the 20 tasks wait
+        return True
+
+    start = time.perf_counter()
+    results = engine.run_units([(None, 'graph', lambda: engine.run_graph(graph)), (None, 'waker', waker)])
+
+    assert [value for _, _, value, _ in results] == [{f'nat:{index}': True for index in range(20)}, True]
+    assert time.perf_counter() - start < 1
+    assert len([name for name in threads if name.startswith('async')]) == 1  # the I/O thread, nothing else
+    assert 'us-east-1-poller' not in threads
+    assert max(len(call.kwargs['Filters'][0]['Values']) for call in client.describe_nat_gateways.call_args_list) == 20
+
+
+def _sweep(engine, user_arg, mocker, tmp_path):
+    report_file = tmp_path / f'{engine}-{user_arg}.json'
+    with mock_ec2():
+        for region in REGIONS[:2]:
+            client = boto3.client('ec2', region_name=region)
+            vpc_id = client.describe_vpcs()['Vpcs'][0]['VpcId']
+            client.create_security_group(GroupName='custom', Description='custom', VpcId=vpc_id)
+            client.create_route_table(VpcId=vpc_id)
+        boto3.client('ec2', region_name=REGIONS[2]).delete_vpc(
+            VpcId=boto3.client('ec2', region_name=REGIONS[2]).describe_vpcs()['Vpcs'][0]['VpcId'])
+        main(get_options(['-o', user_arg, '--engine', engine, '--verify', '--report-file', str(report_file)]))
+        remaining = {region: len(boto3.client('ec2', region_name=region).describe_security_groups()[
+            'SecurityGroups']) for region in REGIONS}
+    return json.loads(report_file.read_text()), remaining
+
+
+def test_asyncio_engine_matches_threads(aws_credentials, mocker, tmp_path):
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', return_value=REGIONS)
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.get_current_service_setting_check',
+                 return_value=False)
+
+    threads = _sweep('threads', 'delete', mocker, tmp_path)
+    asyncio_result = _sweep('asyncio', 'delete', mocker, tmp_path)
+
+    assert asyncio_result == threads
+    assert {row['region']: row['status'] for row in threads[0]} == {
+        'eu-west-1': 'success', 'eu-west-2': 'success', 'ap-south-1': 'no_default_vpc'}
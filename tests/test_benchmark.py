@@ -0,0 +1,38 @@
+"""Module containing the call count regression checks built on the benchmark module"""
+
+# Local App imports
+from tests.benchmark import compare_call_counts, pick_regions, run_benchmark
+
+
+def test_delete_call_counts_per_region(aws_credentials):
+    regions = pick_regions(2)
+    result = run_benchmark('delete', regions, custom_sgs=1, custom_nacls=1, custom_rtbs=1, sg_rules=2)
+
+    assert result['statuses'] == {'success': len(regions)}
+    assert set(result['region_wall_time']) == set(regions)
+    assert result['peak_memory_bytes'] > 0
+    for operation in ('DescribeSubnets', 'DescribeSecurityGroups', 'DeleteVpc'):
+        assert result['api_calls'][operation] == len(regions)  # one inventory describe per region
+    assert result['api_calls']['DescribeVpcs'] == 2 * len(regions)  # the inventory and the deletion poll
+    assert result['api_calls']['DescribeInternetGateways'] == 2 * len(regions)  # the inventory and the detach poll
+    assert result['api_calls']['DeleteSecurityGroup'] == len(regions)
+    assert result['api_calls_total'] == sum(result['api_calls'].values())
+
+
+def test_modify_call_counts_per_region(aws_credentials):
+    regions = pick_regions(2)
+    result = run_benchmark('modify', regions, custom_sgs=1, custom_nacls=1, custom_rtbs=1, sg_rules=6)
+
+    assert result['statuses'] == {'success': len(regions)}
+    assert result['api_calls']['DescribeSecurityGroupRules'] == len(regions)
+    assert result['api_calls']['RevokeSecurityGroupIngress'] == len(regions)  # batched per default SG
+    assert result['api_calls']['RevokeSecurityGroupEgress'] == len(regions)
+    assert 'DeleteVpc' not in result['api_calls']
+
+
+def test_compare_call_counts():
+    baseline = {'results': {'delete': {'api_calls': {'DeleteSubnet': 3, 'DescribeVpcs': 1}}}}
+    current = {'results': {'delete': {'api_calls': {'DeleteSubnet': 3, 'DescribeVpcs': 2, 'DescribeTags': 1}}}}
+
+    assert compare_call_counts(baseline, baseline) == []
+    assert compare_call_counts(current, baseline) == ['delete: DescribeVpcs 1 -> 2', 'delete: DescribeTags 0 -> 1']
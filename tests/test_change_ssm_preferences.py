@@ -5,6 +5,16 @@ from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference
 
 def test_get_current_service_setting(ssm_client, fake_boto_client):
     obj = SsmPreference(fake_boto_client, 'us-east-1')
-    assert obj._get_current_service_setting_check() is True
+    assert obj.get_current_service_setting_check() is True
     assert obj._update_public_service_setting_check('Disable') is True
     assert obj.check_ssm_preferences() is None
+
+
+def test_sweep_reports_before_and_after(fake_boto_client, mocker):
+    obj = SsmPreference(fake_boto_client, 'us-east-1')
+    assert tuple(obj.sweep('111111111111')) == ('us-east-1', '111111111111', 'Enable', 'Disable')
+
+    mocker.patch.object(SsmPreference, '_update_public_service_setting_check', return_value=False)
+    assert obj.sweep().after == 'Enable'
+    mocker.patch.object(SsmPreference, 'get_current_service_setting_check', return_value=False)
+    assert tuple(obj.sweep()) == ('us-east-1', None, 'Disable', 'Disable')
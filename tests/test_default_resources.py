@@ -1,7 +1,17 @@
 """Module containing tests for Resource class"""
 
+# Standard Library imports
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 # Local App imports
-from delete_aws_resources_with_py.default_resources import Resource
+from delete_aws_resources_with_py.default_resources import (
+    Resource,
+    IgwRecord,
+    SubnetRecord,
+    NaclRecord,
+    SgRecord
+)
 
 
 def test_resource_class_vpc_present(ec2_client, ec2_resource) -> None:
@@ -14,3 +24,54 @@ def test_resource_class_vpc_present(ec2_client, ec2_resource) -> None:
     assert obj.route_table is not None
     assert obj.acl is not None
     assert obj.sgs is not None
+
+
+def test_resource_class_describes_vpc_once(ec2_client, ec2_resource, mocker) -> None:
+    spy = mocker.spy(ec2_client, 'describe_vpcs')
+    obj = Resource(boto_resource=ec2_resource, boto_client=ec2_client,
+                   region='us-east-1')
+    vpc_id = obj.vpc_id
+
+    assert obj.current_vpc_resource.id == vpc_id
+    assert spy.call_count == 1
+
+    obj.invalidate_vpc_id()
+    assert obj.vpc_id == vpc_id
+    assert spy.call_count == 2
+
+
+def test_resources_look_up_their_vpc_id_concurrently(mocker) -> None:
+    def slow_describe_vpcs(**kwargs):
+        time.sleep(0.3)
+        return {'Vpcs': []}
+
+    clients = [mocker.Mock(describe_vpcs=slow_describe_vpcs) for _ in range(8)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        objs = list(executor.map(lambda client: Resource(boto_resource=None, boto_client=client,
+                                                         region='us-east-1'), clients))
+
+    assert time.perf_counter() - start < 0.3 * len(clients) / 2
+    assert [obj.vpc_id for obj in objs] == [None] * len(clients)
+
+
+def test_resource_class_inventory_mode(ec2_client, ec2_resource, mocker) -> None:
+    vpc_id = ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'][0]['VpcId']
+    igw_id = ec2_client.create_internet_gateway()['InternetGateway']['InternetGatewayId']
+    ec2_client.attach_internet_gateway(InternetGatewayId=igw_id, VpcId=vpc_id)
+    spy = mocker.spy(ec2_client, 'get_paginator')
+
+    obj = Resource(boto_resource=ec2_resource, boto_client=ec2_client,
+                   region='us-east-1', inventory=True)
+
+    assert sorted(call.args[0] for call in spy.call_args_list) == [
+        'describe_egress_only_internet_gateways', 'describe_internet_gateways', 'describe_nat_gateways',
+        'describe_network_acls', 'describe_network_interfaces', 'describe_route_tables',
+        'describe_security_groups', 'describe_subnets', 'describe_vpc_endpoints',
+        'describe_vpc_peering_connections', 'describe_vpc_peering_connections']
+    assert obj.igw == [IgwRecord(igw_id)]
+    assert obj.subnet and all(isinstance(subnet, SubnetRecord) and subnet.default_for_az for subnet in obj.subnet)
+    assert [rtb.associations_attribute[0]['Main'] for rtb in obj.route_table] == [True]
+    assert all(isinstance(acl, NaclRecord) for acl in obj.acl) and obj.acl[0].is_default
+    assert [sg.group_name for sg in obj.sgs if isinstance(sg, SgRecord)] == ['default']
@@ -0,0 +1,79 @@
+"""Module containing tests for DependencyGraph class"""
+
+# Standard Library imports
+import threading
+
+# Third-party imports
+import pytest
+
+# Local App imports
+from delete_aws_resources_with_py.dependency_graph import DependencyGraph
+
+
+def test_dependency_graph_levels():
+    graph = DependencyGraph()
+    graph.add_task('a', lambda: True)
+    graph.add_task('b', lambda: True)
+    graph.add_task('c', lambda: True, depends_on=['a'])
+    graph.add_task('d', lambda: True, depends_on=['b', 'c'])
+
+    assert graph.levels() == [['a', 'b'], ['c'], ['d']]
+    assert graph.run() == {'a': True, 'b': True, 'c': True, 'd': True}
+
+
+def test_dependency_graph_runs_level_in_parallel():
+    barrier = threading.Barrier(3, timeout=5)
+    graph = DependencyGraph(max_workers=3)
+    for name in ['a', 'b', 'c']:
+        graph.add_task(name, lambda: barrier.wait() is not None)
+
+    assert all(graph.run().values())
+
+
+def test_dependency_graph_skips_dependents_of_failed_task():
+    ran = []
+    graph = DependencyGraph()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    graph.add_task('a', fail)
+    graph.add_task('b', lambda: ran.append('b') or True)
+    graph.add_task('c', lambda: ran.append('c') or True, depends_on=['a', 'b'])
+
+    assert graph.run() == {'a': False, 'b': True, 'c': False}
+    assert ran == ['b']
+    assert isinstance(graph.errors['a'], RuntimeError)
+
+
+def test_dependency_graph_answers_the_waits_of_generator_tasks(mocker):
+    poller = mocker.Mock()
+    poller.wait.side_effect = lambda kind, resource_id: resource_id != 'igw-2'
+
+    def delete(igw_id):
+        if not (yield 'igw_detached', igw_id):
+            return False
+        return True
+
+    graph = DependencyGraph(poller=poller)
+    graph.add_task('igw:igw-1', lambda: delete('igw-1'))
+    graph.add_task('igw:igw-2', lambda: delete('igw-2'))
+
+    assert graph.run() == {'igw:igw-1': True, 'igw:igw-2': False}
+    assert sorted(call.args for call in poller.wait.call_args_list) == [
+        ('igw_detached', 'igw-1'), ('igw_detached', 'igw-2')]
+
+
+def test_dependency_graph_rejects_bad_graphs():
+    graph = DependencyGraph()
+    graph.add_task('a', lambda: True, depends_on=['b'])
+    graph.add_task('b', lambda: True, depends_on=['a'])
+    with pytest.raises(ValueError):
+        graph.levels()
+    with pytest.raises(ValueError):
+        graph.add_task('a', lambda: True)
+
+    graph = DependencyGraph()
+    graph.add_task('a', lambda: True, depends_on=['missing'])
+    with pytest.raises(ValueError):
+        graph.levels()
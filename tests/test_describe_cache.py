@@ -0,0 +1,79 @@
+"""Module containing tests for the describe_cache module"""
+
+# Third-party imports
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_ec2
+
+# Local App imports
+from delete_aws_resources_with_py.describe_cache import bypass_describe_cache, resource_type
+from delete_aws_resources_with_py.session_pool import BotoSessionPool
+
+
+def _default_vpc_ids(client):
+    return [vpc['VpcId'] for vpc in client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs']]
+
+
+def test_describe_responses_are_cached_until_a_write_of_the_same_type(aws_credentials):
+    with mock_ec2():
+        pool = BotoSessionPool()
+        client = pool.client('ec2', 'us-east-1')
+        resource = pool.resource('ec2', 'us-east-1')
+        cache = pool._caches[('ec2', 'us-east-1', None)]
+
+        vpc_id = _default_vpc_ids(client)[0]
+        subnets = client.describe_subnets(Filters=[{'Values': [vpc_id], 'Name': 'vpc-id'}])['Subnets']
+        assert client.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['Subnets'] == subnets
+        assert (cache.hits, cache.misses) == (1, 2)  # the params are normalized, the key order does not matter
+
+        resource.create_security_group(GroupName='app', Description='app', VpcId=vpc_id)  # shares the cache
+        client.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])
+        assert cache.hits == 2  # a SG write leaves the subnets cached
+
+        client.delete_subnet(SubnetId=subnets[0]['SubnetId'])
+        assert len(client.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['Subnets']) == \
+            len(subnets) - 1
+        assert cache.hits == 2
+
+        client.delete_vpc(VpcId=client.create_vpc(CidrBlock='10.1.0.0/16')['Vpc']['VpcId'])
+        assert len(cache) == 0  # a VPC write drops the whole region
+        with bypass_describe_cache():
+            assert _default_vpc_ids(client) == [vpc_id]
+        assert len(cache) == 0
+
+
+def test_failed_writes_invalidate_and_recent_writes_are_not_cached(aws_credentials):
+    with mock_ec2():
+        pool = BotoSessionPool()
+        client = pool.client('ec2', 'us-east-1')
+        cache = pool._caches[('ec2', 'us-east-1', None)]
+
+        client.describe_subnets()
+        client.describe_route_tables()
+        with pytest.raises(ClientError):
+            client.delete_subnet(SubnetId='subnet-00000000')  # the write may still have been applied
+        assert [key[1] for key in cache._entries] == []  # the subnets and their side effects, the route tables
+
+        client.describe_subnets()
+        client.describe_security_groups()
+        assert [key[1] for key in cache._entries] == ['DescribeSecurityGroups']  # subnets are within the window
+
+        cache.mutation_window = 0
+        client.describe_subnets()
+        assert [key[1] for key in cache._entries] == ['DescribeSecurityGroups', 'DescribeSubnets']
+
+
+def test_describe_cache_evicts_the_least_recently_used_response(aws_credentials):
+    with mock_ec2():
+        pool = BotoSessionPool()
+        client = pool.client('ec2', 'us-east-1')
+        cache = pool._caches[('ec2', 'us-east-1', None)]
+        cache.max_entries = 2
+
+        client.describe_vpcs()
+        client.describe_subnets()
+        client.describe_vpcs()
+        client.describe_route_tables()  # evicts the subnets, the VPCs were used last
+        assert [key[1] for key in cache._entries] == ['DescribeVpcs', 'DescribeRouteTables']
+        assert resource_type('RevokeSecurityGroupIngress') == 'SecurityGroup'
+        assert resource_type('DescribeEgressOnlyInternetGateways') == 'EgressOnlyInternetGateway'
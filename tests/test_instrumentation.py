@@ -0,0 +1,64 @@
+"""Module containing tests for the instrumentation module"""
+
+# Standard Library imports
+import json
+
+# Third-party imports
+import pytest
+from moto import mock_ec2
+
+# Local App imports
+from delete_aws_resources_with_py.instrumentation import CallRecord, CallRecorder, Histogram, get_recorder
+from delete_aws_resources_with_py.utils import create_boto3
+
+
+def test_create_boto3_clients_are_instrumented(aws_credentials):
+    recorder = get_recorder()
+    recorder.reset()
+    with mock_ec2():
+        client = create_boto3(service='ec2', boto_type='boto_client', region='eu-west-1')
+        client.describe_vpcs()
+        with pytest.raises(client.exceptions.ClientError):
+            client.delete_vpc(VpcId='vpc-12345678')
+        create_boto3(service='ec2', boto_type='boto_resource', region='eu-west-1').meta.client.describe_subnets()
+
+    assert [(record.operation, record.region, record.error_code) for record in recorder.records] == [
+        ('DescribeVpcs', 'eu-west-1', None),
+        ('DeleteVpc', 'eu-west-1', 'InvalidVpcID.NotFound'),
+        ('DescribeSubnets', 'eu-west-1', None)]
+    assert all(record.latency >= 0 and record.retries == 0 for record in recorder.records)
+    assert {row['operation']: row['errors'] for row in recorder.summary()}['DeleteVpc'] == 1
+
+
+def test_histogram_quantiles():
+    hist = Histogram(buckets=(0.1, 1.0))
+    for latency in (0.05, 0.05, 0.5, 3.0):
+        hist.observe(CallRecord('DescribeVpcs', 'us-east-1', latency, 1, None, 0))
+
+    assert hist.counts == [2, 1, 1]
+    assert hist.quantile(0.5) == 0.1
+    assert hist.quantile(0.75) == 1.0
+    assert hist.quantile(1) == 1.0
+    assert hist.retries == 4
+
+
+def test_export_formats(tmp_path):
+    recorder = CallRecorder()
+    recorder.record(CallRecord('DeleteVpc', 'us-east-1', 0.02, 2, 'DependencyViolation', 0))
+    recorder.record(CallRecord('DeleteVpc', 'us-east-1', 0.2, 0, None, 0))
+
+    recorder.export(str(tmp_path / 'calls.jsonl'))
+    lines = (tmp_path / 'calls.jsonl').read_text().splitlines()
+    assert [json.loads(line)['retries'] for line in lines] == [2, 0]
+
+    recorder.export(str(tmp_path / 'calls.prom'), 'prometheus')
+    prom = (tmp_path / 'calls.prom').read_text()
+    labels = 'operation="DeleteVpc",region="us-east-1"'
+    assert f'delete_aws_resources_api_call_seconds_bucket{{{labels},le="0.025"}} 1' in prom
+    assert f'delete_aws_resources_api_call_seconds_bucket{{{labels},le="+Inf"}} 2' in prom
+    assert f'delete_aws_resources_api_call_seconds_count{{{labels}}} 2' in prom
+    assert f'delete_aws_resources_api_call_retries_total{{{labels}}} 2' in prom
+    assert f'delete_aws_resources_api_call_errors_total{{{labels}}} 1' in prom
+
+    with pytest.raises(ValueError):
+        recorder.export(str(tmp_path / 'calls.csv'), 'csv')
@@ -0,0 +1,40 @@
+"""Module containing tests for the journal module"""
+
+# Local App imports
+from delete_aws_resources_with_py.journal import Journal, STEP_REGION, STEP_SSM
+from delete_aws_resources_with_py.resource_delete import Delete
+
+
+def test_journal_survives_a_truncated_line(tmp_path):
+    journal_file = tmp_path / 'journal.jsonl'
+    journal = Journal(str(journal_file))
+    journal.record('delete', None, 'eu-west-1', STEP_SSM)
+    journal.for_region('delete', '111111111111', 'eu-west-2').record(STEP_REGION)
+    with open(journal_file, 'a') as f:
+        f.write('{"action": "delete", "acc')  # the process died mid-write
+
+    resumed = Journal(str(journal_file), resume=True)
+    assert resumed.is_done('delete', None, 'eu-west-1', STEP_SSM)
+    assert resumed.is_done('delete', '111111111111', 'eu-west-2', STEP_REGION)
+    assert not resumed.is_done('modify', None, 'eu-west-1', STEP_SSM)
+    assert resumed.for_region('delete', None, 'eu-west-1').done_steps() == {STEP_SSM}
+
+    assert Journal(str(journal_file)).done_steps('delete', None, 'eu-west-1') == set()
+    assert journal_file.read_text() == ''  # a run without resume starts over
+
+
+def test_delete_skips_and_records_journaled_tasks(get_inventory_resource_obj, tmp_path, mocker):
+    region_journal = Journal(str(tmp_path / 'journal.jsonl')).for_region('delete', None, 'us-east-1')
+    igw_task = f'igw:{get_inventory_resource_obj.igw[0].id}'
+    region_journal.record(igw_task)
+    delete_igw = mocker.patch.object(Delete, '_delete_igw')
+
+    del_res = Delete(get_inventory_resource_obj, completed=region_journal.done_steps(),
+                     on_success=region_journal.record)
+    vpc_task = f'vpc:{get_inventory_resource_obj.vpc_id}'
+    assert del_res.delete_resources() is True
+
+    delete_igw.assert_not_called()
+    done = region_journal.done_steps()
+    assert vpc_task in done
+    assert {f'subnet:{subnet.id}' for subnet in get_inventory_resource_obj.subnet} <= done
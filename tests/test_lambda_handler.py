@@ -0,0 +1,115 @@
+"""Module containing tests for the lambda_handler module"""
+
+# Third-party imports
+import pytest
+
+# Local App imports
+from delete_aws_resources_with_py.accounts import AccountSession
+from delete_aws_resources_with_py.errors import UserArgNotFoundError
+from delete_aws_resources_with_py.lambda_handler import (
+    handler,
+    InMemoryQueue,
+    SweepHandler,
+    WorkUnit,
+    MAX_HAND_OFFS,
+    _accounts_from_event,
+)
+from delete_aws_resources_with_py.main import RegionResult
+from delete_aws_resources_with_py.status_poller import StatusPoller
+
+
+class FakeContext:
+    """Lambda context stand-in whose remaining time is read from a list (the last value repeats)"""
+
+    invoked_function_arn = 'arn:aws:lambda:eu-west-1:111111111111:function:sweep'
+
+    def __init__(self, *remaining_ms):
+        self.remaining_ms = list(remaining_ms)
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms.pop(0) if len(self.remaining_ms) > 1 else self.remaining_ms[0]
+
+
+def _fake_process_region(current_region, user_arg, account=None):
+    if current_region == 'broken-1':
+        raise RuntimeError('boom')
+    return RegionResult(current_region, 'success', account.account_id if account else None)
+
+
+def test_sweep_handler_checkpoints_leftover_units_before_the_deadline(mocker):
+    mocker.patch('delete_aws_resources_with_py.lambda_handler.process_region', side_effect=_fake_process_region)
+    queue = InMemoryQueue(WorkUnit('111111111111', f'eu-west-{n}') for n in range(1, 6))
+    handed_off = []
+    sweep = SweepHandler('delete', queue, role_name='sweeper', hand_off=lambda payload, _: handed_off.append(payload),
+                         safety_margin_ms=1000, max_workers=2)
+
+    # the first read sets the wait deadline, time then runs short before the third batch
+    summary = sweep.run(FakeContext(300000, 300000, 300000, 500), hand_offs=2)
+
+    assert [result['region'] for result in summary['results']] == ['eu-west-1', 'eu-west-2', 'eu-west-3',
+                                                                   'eu-west-4']
+    assert summary['remaining'] == 1 and summary['handed_off'] is True
+    assert handed_off == [{'action': 'delete', 'role_name': 'sweeper', 'hand_offs': 3,
+                           'units': [{'account': '111111111111', 'region': 'eu-west-5'}]}]
+    assert len(queue) == 0
+    assert list(sweep.accounts) == ['111111111111']
+
+
+def test_sweep_handler_caps_the_waits_and_hands_off_the_units_they_cut_short(mocker):
+    client = mocker.Mock()
+    client.describe_vpcs.return_value = {'Vpcs': [{'VpcId': 'vpc-1'}]}  # the VPC never goes away
+
+    def slow_process_region(current_region, user_arg, account=None):
+        if not StatusPoller(client, current_region, interval=0.01).wait('vpc_deleted', 'vpc-1'):
+            return RegionResult(current_region, 'failed', None)
+        return RegionResult(current_region, 'success', None)  # pragma: no cover
+
+    mocker.patch('delete_aws_resources_with_py.lambda_handler.process_region', side_effect=slow_process_region)
+    handed_off = []
+    sweep = SweepHandler('delete', InMemoryQueue([WorkUnit(None, 'eu-west-1'), WorkUnit(None, 'eu-west-2')]),
+                         hand_off=lambda payload, _: handed_off.append(payload), safety_margin_ms=1000, max_workers=1)
+
+    summary = sweep.run(FakeContext(1100, 1100, 900))  # the wait would take 900s, it is cut after 0.1s
+    assert summary == {'results': [], 'remaining': 2, 'handed_off': True}
+    assert handed_off[0]['units'] == [{'account': None, 'region': 'eu-west-2'},
+                                      {'account': None, 'region': 'eu-west-1'}]
+
+
+def test_handler_runs_follow_up_units_and_stops_handing_off(mocker):
+    mocker.patch('delete_aws_resources_with_py.lambda_handler.process_region', side_effect=_fake_process_region)
+    hand_off = mocker.MagicMock()
+    event = {'action': 'modify', 'hand_offs': 0, 'units': [{'account': None, 'region': 'eu-west-1'},
+                                                           {'account': None, 'region': 'broken-1'}]}
+
+    summary = handler(event, FakeContext(900000), hand_off=hand_off)
+    assert sorted((result['region'], result['status']) for result in summary['results']) == [
+        ('broken-1', 'failed'), ('eu-west-1', 'success')]
+    assert summary['handed_off'] is False
+    hand_off.assert_not_called()
+
+    event['hand_offs'] = MAX_HAND_OFFS
+    summary = handler(event, FakeContext(1000), hand_off=hand_off)  # no time left, but no hand-off either
+    assert summary == {'results': [], 'remaining': 2, 'handed_off': False}
+    hand_off.assert_not_called()
+
+
+def test_handler_builds_units_from_an_account_vending_event(mocker):
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', return_value=['eu-west-1', 'eu-west-2'])
+    mocker.patch.object(AccountSession, 'credentials', new_callable=mocker.PropertyMock, return_value=None)
+    queue = InMemoryQueue()
+    event = {'detail-type': 'AWS Service Event via CloudTrail', 'detail': {'serviceEventDetails': {
+        'createManagedAccountStatus': {'account': {'accountId': '222222222222'}}}}}
+
+    summary = handler(dict(event, role_name='sweeper'), FakeContext(1000), queue=queue,
+                      hand_off=lambda payload, _: queue.put(WorkUnit(**unit) for unit in payload['units']))
+    assert summary['remaining'] == 2 and summary['handed_off'] is True
+    assert queue.drain() == [WorkUnit('222222222222', 'eu-west-1'), WorkUnit('222222222222', 'eu-west-2')]
+
+    with pytest.raises(ValueError):
+        handler(event, FakeContext(1000))
+    with pytest.raises(UserArgNotFoundError):
+        handler({'action': 'plan'}, FakeContext(1000))
+    assert _accounts_from_event({'detail': {'serviceEventDetails': {
+        'createAccountStatus': {'accountId': '333333333333'}}}}) == ['333333333333']
+    assert _accounts_from_event({'accounts': ['444444444444']}) == ['444444444444']
+    assert _accounts_from_event({}) == []
@@ -1,17 +1,26 @@
 """Module containing tests for main module in script."""
 
+import json
+import time
 from collections import namedtuple
 
 import pytest
+from moto import mock_sts
 
 from delete_aws_resources_with_py.main import (
     main,
     _execute_changes_on_resources,
     _check_user_arg_response,
     _get_region_list,
-    _create_boto_objects
+    _create_boto_objects,
+    process_region,
+    _log_region_summary,
+    RegionResult
 )
 from delete_aws_resources_with_py.errors import UserArgNotFoundError, NoDefaultVpcExistsError
+from delete_aws_resources_with_py.change_ssm_preferences import SsmSweepResult
+from delete_aws_resources_with_py.session_pool import get_session_pool
+from delete_aws_resources_with_py.utils import get_options
 
 from delete_aws_resources_with_py.default_resources import Resource
 
@@ -22,6 +31,9 @@ def test_check_user_arg_response():
 
     assert _check_user_arg_response('delete') is True
     assert _check_user_arg_response('modify') is True
+    assert _check_user_arg_response('plan') is True
+    assert _check_user_arg_response('apply') is True
+    assert _check_user_arg_response('ssm') is True
 
 
 def test_get_region_list(mocker, ec2_client):
@@ -70,7 +82,7 @@ def test_main_func_works(ec2_client, ec2_resource, ssm_client, mocker):
     def mock_get_current_service_setting(*args):
         return True
 
-    mocker.patch('delete_aws_resources_with_py.main.SsmPreference._get_current_service_setting_check',
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.get_current_service_setting_check',
                  mock_get_current_service_setting)
 
     def mock_update_public_service_setting(*args):
@@ -79,11 +91,6 @@ def test_main_func_works(ec2_client, ec2_resource, ssm_client, mocker):
     mocker.patch('delete_aws_resources_with_py.main.SsmPreference._update_public_service_setting_check',
                  mock_update_public_service_setting)
 
-    def mock_get_args():
-        return 'delete'
-
-    mocker.patch('delete_aws_resources_with_py.main.get_args', mock_get_args)
-
     def mock_get_regions():
         return ec2_client.describe_regions()
 
@@ -96,19 +103,178 @@ def test_main_func_works(ec2_client, ec2_resource, ssm_client, mocker):
 
     mocker.patch('delete_aws_resources_with_py.main._create_boto_objects', mock_create_boto_objects)
 
-    assert main() is None
+    assert main(get_options(['-o', 'delete'])) is None
 
 
 def test_main_func_raises_bad_arg(ec2_client, ec2_resource, ssm_client, mocker):
-    def mock_get_args():
-        return 'anything'
-
-    mocker.patch('delete_aws_resources_with_py.main.get_args', mock_get_args)
-
     def mock_check_user_arg_response(*args):
         return False
 
     mocker.patch('delete_aws_resources_with_py.main._check_user_arg_response', mock_check_user_arg_response)
 
     with pytest.raises(UserArgNotFoundError):
-        main()
+        main(get_options(['-o', 'anything']))
+
+
+def test_process_region_returns_result(ec2_client, ec2_resource, ssm_client, mocker):
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.check_ssm_preferences', return_value=None)
+
+    def mock_create_boto_objects(*args):
+        test = namedtuple('test', ['ssm_client', 'ec2_resource', 'ec2_client'])
+        return test(ssm_client, ec2_resource, ec2_client)
+
+    mocker.patch('delete_aws_resources_with_py.main._create_boto_objects', mock_create_boto_objects)
+
+    assert process_region('us-east-1', 'delete') == RegionResult('us-east-1', 'success')
+    assert process_region('us-east-1', 'delete') == RegionResult('us-east-1', 'no_default_vpc')
+
+
+def test_main_runs_regions_concurrently(mocker):
+    regions = [f'region-{i}' for i in range(6)]
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', return_value=regions)
+    mocker.patch('delete_aws_resources_with_py.main._sweep_ssm_region',
+                 side_effect=lambda current_region, account=None: SsmSweepResult(current_region, None, 'Disable',
+                                                                                 'Disable'))
+    seen = []
+
+    def mock_process_region(current_region, user_arg, account=None, skip_ssm=False):
+        time.sleep(0.2)
+        seen.append(current_region)
+        if current_region == 'region-0':
+            raise RuntimeError('boom')
+        return RegionResult(current_region, 'success')
+
+    mocker.patch('delete_aws_resources_with_py.main.process_region', mock_process_region)
+    log_summary = mocker.patch('delete_aws_resources_with_py.main._log_region_summary')
+
+    start = time.perf_counter()
+    assert main(get_options(['-o', 'modify', '--max-workers', str(len(regions))])) is None
+    assert time.perf_counter() - start < 0.2 * len(regions) / 2
+    assert sorted(seen) == regions
+    results = log_summary.call_args[0][0]
+    assert RegionResult('region-0', 'failed') in results
+    assert len([result for result in results if result.status == 'success']) == len(regions) - 1
+
+
+def test_main_sweeps_accounts(ec2_client, ssm_client, mocker, tmp_path):
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.get_current_service_setting_check',
+                 return_value=False)
+
+    def mock_get_region_list(credentials=None):
+        assert credentials.session_token
+        return ['eu-west-1', 'eu-west-2']
+
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', mock_get_region_list)
+    report_file = tmp_path / 'report.json'
+
+    with mock_sts():
+        assert main(get_options(['-o', 'delete', '--accounts', '111111111111,222222222222', '--role-name',
+                                 'Vending', '--report-file', str(report_file)])) is None
+
+    report = json.loads(report_file.read_text())
+    assert [(row['account'], row['region']) for row in report] == [
+        ('111111111111', 'eu-west-1'), ('111111111111', 'eu-west-2'),
+        ('222222222222', 'eu-west-1'), ('222222222222', 'eu-west-2')]
+    assert {row['status'] for row in report} == {'success'}
+
+
+def test_main_plans_then_applies(ec2_client, ec2_resource, ssm_client, mocker, tmp_path):
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.get_current_service_setting_check',
+                 return_value=True)
+    update_setting = mocker.patch(
+        'delete_aws_resources_with_py.main.SsmPreference._update_public_service_setting_check', return_value=True)
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', return_value=['us-east-1'])
+
+    def mock_create_boto_objects(*args):
+        test = namedtuple('test', ['ssm_client', 'ec2_resource', 'ec2_client'])
+        return test(ssm_client, ec2_resource, ec2_client)
+
+    mocker.patch('delete_aws_resources_with_py.main._create_boto_objects', mock_create_boto_objects)
+    plan_file = tmp_path / 'plan.json'
+
+    assert main(get_options(['-o', 'plan', '--plan-action', 'delete', '--plan-file', str(plan_file)])) is None
+    plan = json.loads(plan_file.read_text())
+    assert plan['action'] == 'delete'
+    assert plan['api_calls'] == len(plan['regions'][0]['actions']) > 1
+    assert update_setting.call_count == 0
+    assert ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs']
+
+    describe_subnets = mocker.spy(ec2_client, 'describe_subnets')
+    assert main(get_options(['-o', 'apply', '--plan-file', str(plan_file)])) is None
+    assert update_setting.call_count == 1
+    assert describe_subnets.call_count == 0
+    assert ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'] == []
+
+
+def test_process_region_resumes_from_journal(ec2_client, ec2_resource, ssm_client, mocker, tmp_path):
+    from delete_aws_resources_with_py.journal import Journal
+
+    check_ssm = mocker.patch('delete_aws_resources_with_py.main.SsmPreference.check_ssm_preferences')
+
+    def mock_create_boto_objects(*args):
+        test = namedtuple('test', ['ssm_client', 'ec2_resource', 'ec2_client'])
+        return test(ssm_client, ec2_resource, ec2_client)
+
+    mocker.patch('delete_aws_resources_with_py.main._create_boto_objects', mock_create_boto_objects)
+    journal = Journal(str(tmp_path / 'journal.jsonl'))
+    journal.record('delete', None, 'us-east-1', 'ssm')
+
+    assert process_region('us-east-1', 'delete', journal=journal) == RegionResult('us-east-1', 'success')
+    check_ssm.assert_not_called()
+    assert journal.is_done('delete', None, 'us-east-1', 'region')
+
+
+def test_main_resume_skips_completed_regions(mocker, tmp_path):
+    from delete_aws_resources_with_py.journal import Journal
+
+    journal_file = str(tmp_path / 'journal.jsonl')
+    Journal(journal_file).record('modify', None, 'region-0', 'region')
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', return_value=['region-0', 'region-1'])
+    process_region_mock = mocker.patch('delete_aws_resources_with_py.main.process_region',
+                                       side_effect=lambda current_region, user_arg, account=None, journal=None,
+                                       skip_ssm=False: RegionResult(current_region, 'success'))
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.get_current_service_setting_check',
+                 return_value=False)
+    log_summary = mocker.patch('delete_aws_resources_with_py.main._log_region_summary')
+
+    assert main(get_options(['-o', 'modify', '--journal-file', journal_file, '--resume'])) is None
+    assert [call.args[0] for call in process_region_mock.call_args_list] == ['region-1']
+    assert sorted(log_summary.call_args[0][0]) == [RegionResult('region-0', 'skipped'),
+                                                   RegionResult('region-1', 'success')]
+
+
+def test_main_ssm_only_mode(mocker, tmp_path):
+    regions = ['eu-west-1', 'eu-west-2', 'eu-west-3']
+    mocker.patch('delete_aws_resources_with_py.main._get_region_list', return_value=regions)
+    create_boto_objects = mocker.patch('delete_aws_resources_with_py.main._create_boto_objects')
+
+    def mock_sweep_ssm_region(current_region, account=None):
+        if current_region == 'eu-west-3':
+            raise RuntimeError('boom')
+        return SsmSweepResult(current_region, None, 'Enable' if current_region == 'eu-west-1' else 'Disable',
+                              'Disable')
+
+    mocker.patch('delete_aws_resources_with_py.main._sweep_ssm_region', mock_sweep_ssm_region)
+    log_summary = mocker.patch('delete_aws_resources_with_py.main._log_region_summary')
+    report_file = tmp_path / 'ssm.json'
+
+    assert main(get_options(['-o', 'ssm', '--report-file', str(report_file), '--max-pool-connections', '24'])) is None
+    create_boto_objects.assert_not_called()
+    assert get_session_pool().max_pool_connections == 24
+    assert json.loads(report_file.read_text()) == [
+        {'region': 'eu-west-1', 'account': None, 'before': 'Enable', 'after': 'Disable'},
+        {'region': 'eu-west-2', 'account': None, 'before': 'Disable', 'after': 'Disable'},
+        {'region': 'eu-west-3', 'account': None, 'before': None, 'after': None}]
+    assert sorted(log_summary.call_args[0][0]) == [RegionResult('eu-west-1', 'success'),
+                                                   RegionResult('eu-west-2', 'success'),
+                                                   RegionResult('eu-west-3', 'failed')]
+
+
+def test_log_region_summary_counts_every_region_once(mocker):
+    info = mocker.patch('delete_aws_resources_with_py.main.logger.info')
+
+    _log_region_summary([RegionResult('eu-west-1', 'success'), RegionResult('eu-west-1', 'verify_failed'),
+                         RegionResult('eu-west-2', 'ssm_failed'), RegionResult('eu-west-2', 'success'),
+                         RegionResult('eu-west-2', 'success', '111111111111')])
+
+    assert info.call_args_list[0].args[1:] == (3, 'ssm_failed=1, success=3, verify_failed=1')
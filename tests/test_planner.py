@@ -0,0 +1,73 @@
+"""Module containing tests for the planner module"""
+
+# Third-party imports
+import pytest
+
+# Local App imports
+from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference
+from delete_aws_resources_with_py.planner import (
+    build_plan,
+    build_region_plan,
+    read_plan,
+    resource_from_plan,
+    write_plan
+)
+from delete_aws_resources_with_py.resource_delete import Delete
+
+
+def test_build_region_plan_delete(get_inventory_resource_obj, ssm_client, mocker):
+    mocker.patch.object(SsmPreference, 'get_current_service_setting_check', return_value=True)
+    delete_subnet = mocker.spy(get_inventory_resource_obj.boto_client, 'delete_subnet')
+
+    plan = build_region_plan(get_inventory_resource_obj, SsmPreference(ssm_client, 'us-east-1'), 'delete')
+    operations = [action['operation'] for action in plan['actions']]
+
+    assert delete_subnet.call_count == 0
+    assert plan['vpc_id'] == get_inventory_resource_obj.vpc_id
+    assert plan['api_calls'] == len(plan['actions'])
+    assert operations[:3] == ['UpdateServiceSetting', 'DetachInternetGateway', 'DeleteInternetGateway']
+    assert operations.count('DeleteSubnet') == len(get_inventory_resource_obj.subnet)
+    assert operations[-1] == 'DeleteVpc'
+    assert 'DeleteSecurityGroup' not in operations  # the default VPC only has its default SG
+
+
+def test_build_region_plan_modify(get_inventory_resource_obj, ssm_client, mocker, sg_egress_ingress_rule):
+    mocker.patch.object(SsmPreference, 'get_current_service_setting_check', return_value=False)
+    mocker.patch('delete_aws_resources_with_py.resource_updates.UpdateSgResource._get_sg_rules',
+                 return_value=sg_egress_ingress_rule)
+
+    plan = build_region_plan(get_inventory_resource_obj, SsmPreference(ssm_client, 'us-east-1'), 'modify',
+                             account='111111111111')
+
+    assert plan['ssm_update'] is False
+    assert plan['account'] == '111111111111'
+    assert [action['operation'] for action in plan['actions']] == [
+        'RevokeSecurityGroupEgress', 'RevokeSecurityGroupIngress', 'DeleteNetworkAclEntry', 'DeleteNetworkAclEntry']
+    sg_id = next(iter(plan['default_sg_rules']))
+    assert plan['default_sg_rules'][sg_id] == [{'SecurityGroupRuleId': 'sgr-03ea09e3614099210', 'IsEgress': False},
+                                               {'SecurityGroupRuleId': 'sgr-05b3f8aa3b667f86b', 'IsEgress': True}]
+
+
+def test_saved_plan_is_applied_without_describing(get_inventory_resource_obj, ec2_client, ec2_resource, ssm_client,
+                                                  mocker, tmp_path):
+    mocker.patch.object(SsmPreference, 'get_current_service_setting_check', return_value=False)
+    plan_file = tmp_path / 'plan.json'
+    region_plan = build_region_plan(get_inventory_resource_obj, SsmPreference(ssm_client, 'us-east-1'), 'delete')
+    write_plan(build_plan('delete', [region_plan]), str(plan_file))
+
+    plan = read_plan(str(plan_file))
+    assert plan['api_calls'] == region_plan['api_calls']
+    describe = mocker.spy(ec2_client, 'describe_subnets')
+    obj = resource_from_plan(plan['regions'][0], ec2_resource, ec2_client)
+
+    assert obj.subnet == get_inventory_resource_obj.subnet
+    assert describe.call_count == 0
+    assert Delete(obj).delete_resources() is True
+    assert ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'] == []
+
+
+def test_read_plan_rejects_other_versions(tmp_path):
+    plan_file = tmp_path / 'plan.json'
+    plan_file.write_text('{"version": 99}')
+    with pytest.raises(ValueError):
+        read_plan(str(plan_file))
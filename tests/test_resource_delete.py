@@ -1,9 +1,128 @@
 """Module containing tests for Delete class"""
 
 # Local App imports
-from delete_aws_resources_with_py.resource_delete import Delete
+from delete_aws_resources_with_py.default_resources import Resource
+from delete_aws_resources_with_py.resource_delete import (
+    Delete,
+    RouteTableIndexEntry,
+    SgReferenceIndexEntry,
+    build_rtb_index,
+    build_sg_reference_index
+)
 
 
 def test_delete_class(get_resource_obj):
     del_res = Delete(get_resource_obj)
     assert del_res.delete_resources() is True
+
+
+def test_delete_class_inventory_mode(get_inventory_resource_obj, ec2_client):
+    del_res = Delete(get_inventory_resource_obj)
+    assert del_res.delete_resources() is True
+    assert ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'] == []
+    assert ec2_client.describe_internet_gateways()['InternetGateways'] == []
+
+
+def test_delete_rtb_uses_index(ec2_client, ec2_resource):
+    vpc_id = ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'][0]['VpcId']
+    default_subnet_id = ec2_client.describe_subnets(
+        Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['Subnets'][0]['SubnetId']
+    custom_subnet_id = ec2_client.create_subnet(VpcId=vpc_id, CidrBlock='172.31.200.0/24')['Subnet']['SubnetId']
+    rtb_ids = [ec2_client.create_route_table(VpcId=vpc_id)['RouteTable']['RouteTableId'] for _ in range(3)]
+    default_association_id = ec2_client.associate_route_table(RouteTableId=rtb_ids[0],
+                                                              SubnetId=default_subnet_id)['AssociationId']
+    custom_association_id = ec2_client.associate_route_table(RouteTableId=rtb_ids[1],
+                                                             SubnetId=custom_subnet_id)['AssociationId']
+
+    del_res = Delete(Resource(ec2_resource, ec2_client, 'us-east-1', inventory=True))
+    index = build_rtb_index(del_res.resource_obj.route_table)
+
+    assert len([entry for entry in index.values() if entry.is_main]) == 1
+    assert index[rtb_ids[0]] == RouteTableIndexEntry(False, [default_association_id])
+    assert index[rtb_ids[1]] == RouteTableIndexEntry(False, [custom_association_id])
+    assert index[rtb_ids[2]] == RouteTableIndexEntry(False, [])
+
+    for name, (func, _) in del_res.build_graph().tasks.items():
+        if name.startswith('rtb:'):
+            assert func() is True
+    remaining = ec2_client.describe_route_tables(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['RouteTables']
+    assert [rtb['Associations'][0]['Main'] for rtb in remaining] == [True]
+
+
+def test_delete_graph_levels(get_inventory_resource_obj, ec2_client):
+    vpc_id = get_inventory_resource_obj.vpc_id
+    ec2_client.create_security_group(GroupName='custom', Description='custom', VpcId=vpc_id)
+    ec2_client.create_route_table(VpcId=vpc_id)
+    acl_id = ec2_client.create_network_acl(VpcId=vpc_id)['NetworkAcl']['NetworkAclId']
+    subnet_id = get_inventory_resource_obj.subnet[0].id
+    default_assoc = [assoc['NetworkAclAssociationId'] for acl in ec2_client.describe_network_acls()['NetworkAcls']
+                     for assoc in acl['Associations'] if assoc['SubnetId'] == subnet_id][0]
+    ec2_client.replace_network_acl_association(AssociationId=default_assoc, NetworkAclId=acl_id)
+    get_inventory_resource_obj.load_inventory()
+
+    levels = Delete(get_inventory_resource_obj).build_graph().levels()
+    kinds = [sorted({name.split(':')[0] for name in level}) for level in levels]
+
+    assert kinds == [['igw', 'rtb', 'sg'], ['subnet'], ['nacl'], ['vpc']]
+    assert Delete(get_inventory_resource_obj).delete_resources() is True
+    assert ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'] == []
+
+
+def test_delete_tears_down_vpc_dependents_first(get_inventory_resource_obj, ec2_client, mocker):
+    vpc_id = get_inventory_resource_obj.vpc_id
+    subnet_id = get_inventory_resource_obj.subnet[0].id
+    peer_vpc_id = ec2_client.create_vpc(CidrBlock='10.1.0.0/16')['Vpc']['VpcId']
+    eni_id = ec2_client.create_network_interface(SubnetId=subnet_id)['NetworkInterface']['NetworkInterfaceId']
+    nat_id = ec2_client.create_nat_gateway(SubnetId=subnet_id, AllocationId=ec2_client.allocate_address(
+        Domain='vpc')['AllocationId'])['NatGateway']['NatGatewayId']
+    endpoint_id = ec2_client.create_vpc_endpoint(VpcId=vpc_id, ServiceName='com.amazonaws.us-east-1.s3',
+                                                 VpcEndpointType='Interface',
+                                                 SubnetIds=[subnet_id])['VpcEndpoint']['VpcEndpointId']
+    ec2_client.create_vpc_peering_connection(VpcId=vpc_id, PeerVpcId=peer_vpc_id)
+    ec2_client.create_egress_only_internet_gateway(VpcId=vpc_id)
+    get_inventory_resource_obj.load_inventory()
+
+    resource = get_inventory_resource_obj
+    assert [eni.id for eni in resource.eni if not eni.requester_managed] == [eni_id]  # NAT/endpoint ENIs are owned
+    assert [nat.id for nat in resource.nat_gateway] == [nat_id]
+    assert [endpoint.id for endpoint in resource.endpoint] == [endpoint_id]
+    assert len(resource.peering) == 1 and len(resource.eigw) == 1
+
+    delete = Delete(resource, poll_delay=0)
+    graph = delete.build_graph()
+    assert [sorted({name.split(':')[0] for name in level}) for level in graph.levels()] == [
+        ['eigw', 'eni', 'nat', 'pcx', 'vpce'], ['igw', 'subnet'], ['vpc']]
+    igw_task = [name for name in graph.tasks if name.startswith('igw:')][0]
+    assert set(graph.tasks[igw_task][1]) == {f'nat:{nat_id}', f'vpce:{endpoint_id}', f'eni:{eni_id}'}
+    describe_nat = mocker.spy(ec2_client, 'describe_nat_gateways')
+    assert delete.delete_resources() is True
+    assert describe_nat.call_count == 1  # moto deletes the NAT gateway at once, a single poll sees it
+    assert ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'] == []
+    assert ec2_client.describe_egress_only_internet_gateways()['EgressOnlyInternetGateways'] == []
+
+
+def test_delete_revokes_sg_cross_references_before_the_sgs(get_inventory_resource_obj, ec2_client, mocker):
+    vpc_id = get_inventory_resource_obj.vpc_id
+    sg_a, sg_b = [ec2_client.create_security_group(GroupName=name, Description=name, VpcId=vpc_id)['GroupId']
+                  for name in ('app', 'db')]
+    default_sg = [sg.id for sg in get_inventory_resource_obj.sgs if sg.group_name == 'default'][0]
+    for group_id, source_id in ((sg_a, sg_b), (sg_b, sg_a), (sg_b, sg_b), (default_sg, sg_a)):
+        ec2_client.authorize_security_group_ingress(GroupId=group_id, IpPermissions=[
+            {'IpProtocol': 'tcp', 'FromPort': 5432, 'ToPort': 5432, 'UserIdGroupPairs': [{'GroupId': source_id}]}])
+    get_inventory_resource_obj.load_inventory()
+
+    delete = Delete(get_inventory_resource_obj, poll_delay=0)
+    index = build_sg_reference_index(get_inventory_resource_obj.sgs)
+    assert sorted(index) == sorted([sg_a, sg_b, default_sg])
+    assert index[sg_b] == SgReferenceIndexEntry([{'IpProtocol': 'tcp', 'FromPort': 5432, 'ToPort': 5432,
+                                                  'UserIdGroupPairs': [{'GroupId': sg_a}]}], [])  # no self reference
+    graph = delete.build_graph()
+    assert set(graph.tasks[f'sg:{sg_a}'][1]) >= {f'sgref:{sg_a}', f'sgref:{sg_b}', f'sgref:{default_sg}'}
+
+    revoke = mocker.spy(ec2_client, 'revoke_security_group_ingress')
+    assert delete.delete_resources() is True
+    assert revoke.call_count == 3  # one batched call per referencing SG
+    revoke.assert_any_call(GroupId=default_sg, IpPermissions=[{'IpProtocol': 'tcp', 'FromPort': 5432, 'ToPort': 5432,
+                                                               'UserIdGroupPairs': [{'GroupId': sg_a}]}])
+    assert build_sg_reference_index(Resource.from_records(None, None, 'us-east-1', vpc_id, {'sgs': [
+        {'id': sg_a, 'group_name': 'app'}]}).sgs) == {}  # records of an older plan
@@ -1,7 +1,9 @@
 """Module containing tests for Delete and Update classes"""
 
 # Local App imports
+from delete_aws_resources_with_py.default_resources import NaclRecord, Resource
 from delete_aws_resources_with_py.resource_updates import (
+    NACL_ENTRY_WORKERS,
     UpdateNaclResource,
     UpdateSgResource
 )
@@ -12,9 +14,80 @@ def test_update_class_nacl_rules(get_resource_obj):
     assert update_res.update_nacl_rules() is True
 
 
+def test_update_class_nacl_rules_inventory_mode(get_inventory_resource_obj):
+    update_res = UpdateNaclResource(get_inventory_resource_obj)
+    assert update_res.update_nacl_rules() is True
+
+
 def test_update_class_sg_rules(fake_resource_obj, fake_boto_client):
     fake_data = {'something': 'anything'}
     upd_sg = UpdateSgResource(fake_resource_obj)
     assert upd_sg._get_sg_rules('sg-04f64a24f0250f7e5') == 'sgr-0f5d697d6bde6f9da'
     assert upd_sg._revoke_egress_sg_rule(fake_data) is True
     assert upd_sg._revoke_ingress_sg_rule(fake_data) is True
+
+
+def test_update_class_sg_rules_batched(fake_resource_obj, sg_egress_ingress_rule, mocker):
+    rules = sg_egress_ingress_rule['SecurityGroupRules']
+    extra_egress_rule = dict(rules[1], SecurityGroupRuleId='sgr-0aaaaaaaaaaaaaaaa')
+    default_sg = {'sg-097b2d103d532a9a0': rules + [extra_egress_rule]}
+    upd_sg = UpdateSgResource(fake_resource_obj)
+
+    egress = upd_sg.find_egress_sg_rule(default_sg)
+    ingress = upd_sg.find_ingress_sg_rule(default_sg)
+    assert egress == {'sg-097b2d103d532a9a0': ['sgr-05b3f8aa3b667f86b', 'sgr-0aaaaaaaaaaaaaaaa']}
+    assert ingress == {'sg-097b2d103d532a9a0': ['sgr-03ea09e3614099210']}
+
+    spy = mocker.spy(fake_resource_obj.boto_client, 'revoke_security_group_egress')
+    assert upd_sg._revoke_egress_sg_rule(egress) is True
+    spy.assert_called_once_with(GroupId='sg-097b2d103d532a9a0',
+                                SecurityGroupRuleIds=['sgr-05b3f8aa3b667f86b', 'sgr-0aaaaaaaaaaaaaaaa'])
+
+
+def test_update_class_nacl_rules_removes_every_entry_once(get_inventory_resource_obj, ec2_client, mocker):
+    default_acl = [acl for acl in get_inventory_resource_obj.acl if acl.is_default][0]
+    ec2_client.create_network_acl_entry(NetworkAclId=default_acl.id, RuleNumber=200, Protocol='6', RuleAction='allow',
+                                        Egress=False, CidrBlock='10.0.0.0/8', PortRange={'From': 22, 'To': 22})
+    get_inventory_resource_obj.load_inventory()
+    default_acl = [acl for acl in get_inventory_resource_obj.acl if acl.is_default][0]
+    assert UpdateNaclResource.find_nacl_entries(default_acl) == [(True, 100), (False, 200), (False, 100)]
+    assert UpdateNaclResource.find_nacl_entries(default_acl._replace(entries=None)) == [(True, 100), (False, 100)]
+
+    assert UpdateNaclResource(get_inventory_resource_obj, max_workers=2).update_nacl_rules() is True
+    get_inventory_resource_obj.load_inventory()
+    locked_down = [acl for acl in get_inventory_resource_obj.acl if acl.is_default][0]
+    assert {entry['RuleNumber'] for entry in locked_down.entries} == {32767}
+
+    spy = mocker.spy(ec2_client, 'delete_network_acl_entry')
+    assert UpdateNaclResource(get_inventory_resource_obj).update_nacl_rules() is True  # a rerun makes no call
+    spy.assert_not_called()
+    mocker.patch('delete_aws_resources_with_py.utils._settings', mocker.Mock(max_workers=64))
+    assert UpdateNaclResource(get_inventory_resource_obj).max_workers == NACL_ENTRY_WORKERS  # not the region setting
+
+
+def test_check_for_default_sg_follows_every_page_in_one_query(mocker):
+    client = mocker.Mock()
+    client.describe_security_group_rules.side_effect = [
+        {'SecurityGroupRules': [{'SecurityGroupRuleId': 'sgr-1', 'GroupId': 'sg-a', 'IsEgress': True},
+                                {'SecurityGroupRuleId': 'sgr-2', 'GroupId': 'sg-b', 'IsEgress': False}],
+         'NextToken': 'page-2'},
+        {'SecurityGroupRules': [{'SecurityGroupRuleId': 'sgr-3', 'GroupId': 'sg-a', 'IsEgress': False}]}]
+    resource = Resource.from_records(None, client, 'us-east-1', 'vpc-1', {'sgs': [
+        {'id': 'sg-a', 'group_name': 'default'}, {'id': 'sg-b', 'group_name': 'default'},
+        {'id': 'sg-c', 'group_name': 'custom'}]})
+
+    rules = UpdateSgResource(resource).check_for_default_sg()
+    assert {group_id: [rule['SecurityGroupRuleId'] for rule in group_rules]
+            for group_id, group_rules in rules.items()} == {'sg-a': ['sgr-1', 'sgr-3'], 'sg-b': ['sgr-2']}
+    group_filter = [{'Name': 'group-id', 'Values': ['sg-a', 'sg-b']}]
+    assert client.describe_security_group_rules.call_args_list == [
+        mocker.call(Filters=group_filter, MaxResults=1000),
+        mocker.call(Filters=group_filter, MaxResults=1000, NextToken='page-2')]
+
+
+def test_find_nacl_entries_keeps_the_ipv6_catch_all_deny():
+    acl = NaclRecord('acl-1', True, [], [{'RuleNumber': number, 'Egress': egress}
+                                         for number in (100, 101, 32767, 32768) for egress in (True, False)])
+    assert UpdateNaclResource.find_nacl_entries(acl) == [(True, 101), (True, 100), (False, 101), (False, 100)]
+    assert UpdateNaclResource.find_nacl_entries(acl._replace(entries=[
+        {'RuleNumber': 32767, 'Egress': True}, {'RuleNumber': 32768, 'Egress': False}])) == []
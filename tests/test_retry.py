@@ -0,0 +1,104 @@
+"""Module containing tests for the retry module"""
+
+# Third-party imports
+from botocore.awsrequest import AWSResponse
+from moto import mock_ec2
+
+# Local App imports
+from delete_aws_resources_with_py import retry
+from delete_aws_resources_with_py.retry import (
+    AdaptiveRetryHandler,
+    TokenBucket,
+    get_token_bucket,
+    is_retryable_error,
+    is_throttling_error
+)
+from delete_aws_resources_with_py.utils import create_boto3
+
+THROTTLED_BODY = (b'<Response><Errors><Error><Code>RequestLimitExceeded</Code><Message>Rate exceeded</Message>'
+                  b'</Error></Errors><RequestID>1</RequestID></Response>')
+
+
+def test_error_classification():
+    assert is_throttling_error('RequestLimitExceeded') is True
+    assert is_retryable_error('RequestLimitExceeded') is True
+    assert is_retryable_error('DependencyViolation') is True
+    assert is_throttling_error('DependencyViolation') is False
+    assert is_retryable_error('InvalidVpcID.NotFound') is False
+    assert is_retryable_error(None) is False
+
+
+def test_token_bucket_adapts_rate():
+    bucket = TokenBucket(rate=8, min_rate=1, max_rate=10, increase=1)
+    bucket.on_throttle()
+    assert bucket.rate == 4
+    for _ in range(3):
+        bucket.on_throttle()
+    assert bucket.rate == 1
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_token_bucket_acquire_blocks_when_empty(mocker):
+    clock = mocker.patch('delete_aws_resources_with_py.retry.time.monotonic', return_value=100.0)
+    sleep = mocker.patch('delete_aws_resources_with_py.retry.time.sleep',
+                         side_effect=lambda seconds: setattr(clock, 'return_value', clock.return_value + seconds))
+    bucket = TokenBucket(rate=2)
+    for _ in range(3):
+        bucket.acquire()
+    sleep.assert_called_once_with(0.5)
+
+
+def test_adaptive_retry_handler_decisions():
+    bucket = TokenBucket(rate=10)
+    handler = AdaptiveRetryHandler(bucket, max_attempts=3, base_delay=0.1)
+    throttled = (None, {'Error': {'Code': 'RequestLimitExceeded'}})
+
+    assert 0 <= handler(attempts=1, response=throttled) <= 0.1
+    assert bucket.rate == 5
+    assert handler(attempts=3, response=throttled) is None
+    assert handler(attempts=1, response=(None, {'Error': {'Code': 'InvalidVpcID.NotFound'}})) is None
+    assert handler(attempts=1, response=(None, {'ResponseMetadata': {}})) is None
+    assert handler(attempts=1, caught_exception=NotImplementedError()) is None
+
+
+def test_create_boto3_retries_throttled_calls(aws_credentials, mocker):
+    mocker.patch('delete_aws_resources_with_py.retry.AdaptiveRetryHandler.backoff', return_value=0)
+    with mock_ec2():
+        client = create_boto3(service='ec2', boto_type='boto_client', region='eu-west-3')
+        throttled = []
+
+        def throttle_twice(request, **kwargs):
+            if len(throttled) < 2:
+                throttled.append(request)
+                response = AWSResponse(request.url, 400, {}, None)
+                response._content = THROTTLED_BODY
+                return response
+
+        client.meta.events.register_first('before-send.ec2', throttle_twice)
+        rate_before = get_token_bucket('eu-west-3', service='ec2').rate
+        response = client.describe_vpcs()
+
+    assert response['ResponseMetadata']['RetryAttempts'] == 2
+    assert len(throttled) == 2
+    assert get_token_bucket('eu-west-3', service='ec2').rate < rate_before
+    assert get_token_bucket('eu-west-3', service='ssm').rate == rate_before
+
+
+def test_token_buckets_are_per_account_region_and_service():
+    bucket = get_token_bucket('eu-west-3', '111111111111', 'ec2')
+    assert get_token_bucket('eu-west-3', '111111111111', 'ec2') is bucket
+    assert get_token_bucket('eu-west-3', '222222222222', 'ec2') is not bucket
+    assert get_token_bucket('eu-west-3', '111111111111', 'ssm') is not bucket
+    assert get_token_bucket('eu-west-3', service='ec2') is not bucket
+    assert get_token_bucket(None) is get_token_bucket(None, None)
+
+
+def test_refreshed_credentials_keep_the_bucket_of_their_account(aws_credentials, mocker):
+    spy = mocker.spy(retry, 'get_token_bucket')
+    for access_key in ('AKIAFIRST', 'AKIASECOND'):  # e.g. the assumed role credentials before and after a refresh
+        create_boto3(service='ec2', boto_type='boto_client', region='eu-west-3', access_key=access_key,
+                     secret_key='secret', session_token='token', account_id='111111111111')
+
+    assert [call.args for call in spy.call_args_list] == [('eu-west-3', '111111111111', 'ec2')] * 2
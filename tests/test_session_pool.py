@@ -0,0 +1,55 @@
+"""Module containing tests for BotoSessionPool class"""
+
+# Standard Library imports
+from concurrent.futures import ThreadPoolExecutor
+
+# Local App imports
+from delete_aws_resources_with_py.session_pool import (
+    BotoSessionPool,
+    configure_session_pool,
+    get_session_pool
+)
+from delete_aws_resources_with_py.utils import create_boto3
+
+
+def test_session_pool_reuses_clients(aws_credentials):
+    pool = BotoSessionPool(max_pool_connections=32)
+    client = pool.client('ec2', 'eu-west-1')
+
+    assert pool.client('ec2', 'eu-west-1') is client
+    assert pool.client('ec2', 'eu-west-2') is not client
+    assert pool.client('ec2', 'eu-west-1', 'key', 'secret', 'token') is not client
+    assert client.meta.config.max_pool_connections == 32
+    assert client.meta.config.retries['total_max_attempts'] == 1
+
+
+def test_session_pool_replaces_the_clients_of_refreshed_credentials(aws_credentials):
+    pool = BotoSessionPool()
+    client = pool.client('ec2', 'eu-west-1', 'AKIAFIRST', 'secret', 'token', '111111111111')
+    resource = pool.resource('ec2', 'eu-west-1', 'AKIAFIRST', 'secret', 'token', '111111111111')
+
+    refreshed = pool.client('ec2', 'eu-west-1', 'AKIASECOND', 'secret', 'token', '111111111111')
+    assert refreshed is not client
+    assert pool.client('ec2', 'eu-west-1', 'AKIASECOND', 'secret', 'token', '111111111111') is refreshed
+    assert pool.resource('ec2', 'eu-west-1', 'AKIASECOND', 'secret', 'token', '111111111111') is not resource
+    assert list(pool._clients) == [('ec2', 'eu-west-1', '111111111111')]
+    assert list(pool._caches) == [('ec2', 'eu-west-1', '111111111111')]  # the describe cache carries over
+
+
+def test_session_pool_resources_are_per_thread(aws_credentials):
+    pool = BotoSessionPool()
+    resource = pool.resource('ec2', 'eu-west-1')
+    assert pool.resource('ec2', 'eu-west-1') is resource
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other_thread_resource = executor.submit(pool.resource, 'ec2', 'eu-west-1').result()
+    assert other_thread_resource is not resource
+
+
+def test_create_boto3_uses_shared_pool(aws_credentials):
+    configure_session_pool(max_pool_connections=24)
+    assert get_session_pool() is get_session_pool()
+    assert get_session_pool().max_pool_connections == 24
+    client = create_boto3(service='ssm', boto_type='boto_client', region='eu-west-1')
+    assert create_boto3(service='ssm', boto_type='boto_client', region='eu-west-1') is client
+    assert create_boto3(service='ec2', boto_type='boto_other') is None
@@ -0,0 +1,73 @@
+"""Module containing tests for the state_cache module"""
+
+# Standard Library imports
+from collections import namedtuple
+
+# Local App imports
+from delete_aws_resources_with_py.main import RegionResult, process_region, _update_state_cache
+from delete_aws_resources_with_py.state_cache import RegionStateCache
+
+
+def test_state_cache_round_trip_and_ttl(tmp_path, mocker):
+    state_file = str(tmp_path / 'state.json')
+    cache = RegionStateCache(state_file, ttl=60)
+    cache.mark_clean(None, 'eu-west-1')
+    cache.mark_clean('111111111111', 'eu-west-1')
+    cache.forget('111111111111', 'eu-west-1')
+    cache.save()
+
+    loaded = RegionStateCache(state_file, ttl=60)
+    assert loaded.is_fresh(None, 'eu-west-1') is True
+    assert loaded.is_clean('111111111111', 'eu-west-1') is False
+    mocker.patch('delete_aws_resources_with_py.state_cache.time.time',
+                 return_value=loaded.get(None, 'eu-west-1').verified + 61)
+    assert loaded.is_clean(None, 'eu-west-1') is True
+    assert loaded.is_fresh(None, 'eu-west-1') is False
+
+
+def test_process_region_fast_paths(ec2_client, ec2_resource, ssm_client, mocker, tmp_path):
+    cache = RegionStateCache(str(tmp_path / 'state.json'), ttl=60)
+    cache.mark_clean(None, 'us-east-1')
+    create_boto_objects = mocker.patch('delete_aws_resources_with_py.main._create_boto_objects')
+    describe_vpcs = mocker.spy(ec2_client, 'describe_vpcs')
+    mocker.patch('delete_aws_resources_with_py.main.create_boto3', return_value=ec2_client)
+    setting_check = mocker.patch(
+        'delete_aws_resources_with_py.main.SsmPreference.get_current_service_setting_check', return_value=False)
+
+    assert process_region('us-east-1', 'delete', state_cache=cache) == RegionResult('us-east-1', 'cached_clean')
+    assert describe_vpcs.call_count == 0
+
+    cache.ttl = 0  # the default VPC still exists, the verification sends the region down the full path
+    create_boto_objects.return_value = namedtuple('test', ['ssm_client', 'ec2_resource', 'ec2_client'])(
+        ssm_client, ec2_resource, ec2_client)
+    mocker.patch('delete_aws_resources_with_py.main.SsmPreference.check_ssm_preferences')
+    assert process_region('us-east-1', 'delete', state_cache=cache) == RegionResult('us-east-1', 'success')
+
+    create_boto_objects.reset_mock()
+    assert process_region('us-east-1', 'delete', state_cache=cache) == RegionResult('us-east-1', 'no_default_vpc')
+    create_boto_objects.assert_not_called()
+
+    setting_check.reset_mock()  # the SSM stage already read the setting, the fast path does not read it again
+    assert process_region('us-east-1', 'delete', state_cache=cache, ssm_disabled=True) == \
+        RegionResult('us-east-1', 'no_default_vpc')
+    setting_check.assert_not_called()
+    describe_vpcs.reset_mock()
+    assert process_region('us-east-1', 'delete', state_cache=cache, ssm_disabled=False) == \
+        RegionResult('us-east-1', 'no_default_vpc')  # the full path finds no default VPC
+    assert describe_vpcs.call_count == 1
+    setting_check.assert_not_called()
+
+
+def test_update_state_cache(tmp_path):
+    cache = RegionStateCache(str(tmp_path / 'state.json'))
+    cache.mark_clean(None, 'eu-west-3')
+    _update_state_cache(cache, [RegionResult('eu-west-1', 'success'), RegionResult('eu-west-2', 'no_default_vpc'),
+                                RegionResult('eu-west-3', 'failed')], 'delete')
+    assert [cache.is_clean(None, region) for region in ('eu-west-1', 'eu-west-2', 'eu-west-3')] == [True, True, False]
+
+    _update_state_cache(cache, [RegionResult('eu-west-1', 'success')], 'modify')
+    assert cache.is_clean(None, 'eu-west-1') is False  # modify leaves the default VPC in place
+    assert RegionStateCache(str(tmp_path / 'state.json')).is_clean(None, 'eu-west-2') is True
+
+    _update_state_cache(cache, [RegionResult('eu-west-2', 'skipped')], 'delete')
+    assert cache.is_clean(None, 'eu-west-2') is True  # a journal resume keeps what a previous run verified
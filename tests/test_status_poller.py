@@ -0,0 +1,55 @@
+"""Module containing tests for the status_poller module"""
+
+# Standard Library imports
+import threading
+
+# Local App imports
+from delete_aws_resources_with_py.status_poller import StatusPoller
+
+
+def test_tick_describes_all_pending_ids_of_a_kind_at_once(mocker):
+    client = mocker.Mock()
+    client.describe_nat_gateways.side_effect = [
+        {'NatGateways': [{'NatGatewayId': 'nat-1', 'State': 'deleted'},
+                         {'NatGatewayId': 'nat-2', 'State': 'deleting'}]},
+        {'NatGateways': [{'NatGatewayId': 'nat-2', 'State': 'deleted'}]}]
+    client.describe_internet_gateways.return_value = {'InternetGateways': [
+        {'InternetGatewayId': 'igw-1', 'Attachments': []}]}
+    poller = StatusPoller(client, 'us-east-1')
+    poller._pending = {key: [threading.Event().set] for key in [
+        ('nat_gateway_deleted', 'nat-1'), ('nat_gateway_deleted', 'nat-2'), ('nat_gateway_deleted', 'nat-3'),
+        ('igw_detached', 'igw-1')]}
+
+    assert poller.tick() == {('nat_gateway_deleted', 'nat-1'), ('nat_gateway_deleted', 'nat-3'),
+                             ('igw_detached', 'igw-1')}  # nat-3 is no longer listed, it is gone
+    client.describe_nat_gateways.assert_called_once_with(
+        Filters=[{'Name': 'nat-gateway-id', 'Values': ['nat-1', 'nat-2', 'nat-3']}])
+    assert list(poller._pending) == [('nat_gateway_deleted', 'nat-2')]
+    assert poller.tick() == {('nat_gateway_deleted', 'nat-2')}
+    assert client.describe_nat_gateways.call_count == 2 and client.describe_internet_gateways.call_count == 1
+
+
+def test_waits_share_the_polling_thread(ec2_client, mocker):
+    vpc_id = ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'][0]['VpcId']
+    subnet_id = ec2_client.describe_subnets(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}])['Subnets'][0]['SubnetId']
+    eni_ids = [ec2_client.create_network_interface(SubnetId=subnet_id)['NetworkInterface']['NetworkInterfaceId']
+               for _ in range(3)]
+    endpoint_id = ec2_client.create_vpc_endpoint(VpcId=vpc_id, ServiceName='com.amazonaws.us-east-1.s3',
+                                                 VpcEndpointType='Interface',
+                                                 SubnetIds=[subnet_id])['VpcEndpoint']['VpcEndpointId']
+    poller = StatusPoller(ec2_client, 'us-east-1', interval=0)
+    assert poller.wait('eni_deleted', eni_ids[0], timeout=0) is False  # still there
+    assert poller._pending == {}
+
+    for eni_id in eni_ids:
+        ec2_client.delete_network_interface(NetworkInterfaceId=eni_id)
+    ec2_client.delete_vpc_endpoints(VpcEndpointIds=[endpoint_id])
+    results = []
+    waiters = [threading.Thread(target=lambda key=key: results.append(poller.wait(*key, timeout=10)))
+               for key in [('eni_deleted', eni_id) for eni_id in eni_ids] + [('vpc_endpoint_deleted', endpoint_id)]]
+    for waiter in waiters:
+        waiter.start()
+    for waiter in waiters:
+        waiter.join()
+    assert results == [True] * 4
+    assert poller._pending == {}
@@ -0,0 +1,57 @@
+"""Module containing tests for the utils module"""
+
+# Standard Library imports
+import json
+import os
+import subprocess
+import sys
+
+# Local App imports
+from delete_aws_resources_with_py import utils
+
+STARTUP_BUDGET = 1.0  # seconds, generous so a loaded machine does not flake, the import itself takes a few 10ms
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_PROBE = """
+import logging, os, sys, time
+opened = []
+sys.addaudithook(lambda event, args: event == 'open' and isinstance(args[0], str) and opened.append(args[0]))
+start = time.perf_counter()
+import delete_aws_resources_with_py.main
+import delete_aws_resources_with_py.planner
+import delete_aws_resources_with_py.lambda_handler
+elapsed = time.perf_counter() - start
+from delete_aws_resources_with_py import utils
+print(elapsed, sorted(m for m in ('boto3', 'botocore') if m in sys.modules), utils._settings is None,
+      [path for path in opened if os.path.basename(path) == utils.CONFIG_FILE], len(logging.getLogger().handlers))
+"""
+
+
+def test_import_has_no_side_effects_and_fits_the_startup_budget(tmp_path):
+    (tmp_path / 'config.json').write_text('{not json')  # picked up from the cwd if anything loads the settings
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=str(tmp_path), check=True,
+                            capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=PACKAGE_ROOT)).stdout.split(' ', 1)
+
+    assert output[1].strip() == '[] True [] 0'  # no boto3, no config.json read, no logging handler
+    assert float(output[0]) < STARTUP_BUDGET
+
+
+def test_settings_are_loaded_on_first_use(tmp_path, monkeypatch):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'skip_regions': ['eu-west-3'], 'max_workers': 3}))
+    monkeypatch.setattr(utils, '_settings', None)
+    monkeypatch.setenv(utils.CONFIG_ENV, str(config_file))
+
+    settings = utils.get_settings()
+    assert settings.skip_regions == ['eu-west-3']
+    assert settings.max_workers == 3
+    assert settings.state_ttl == 86400
+    assert utils.get_settings() is settings
+    assert utils.get_options(['-o', 'modify', '--resume']).max_workers == 3
+    assert utils.get_options(['-o', 'modify', '--resume']).journal_file == 'sweep_journal.jsonl'
+
+
+def test_settings_default_without_config_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, '_settings', None)
+    monkeypatch.setattr(utils, '_find_config_file', lambda: None)
+    assert utils.get_settings() == utils.Settings([], 'INFO', 8, 300, 16, 'sweep_journal.jsonl', 86400, 64)
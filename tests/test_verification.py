@@ -0,0 +1,96 @@
+"""Module containing tests for the verification module"""
+
+# Standard Library imports
+import asyncio
+import csv
+from functools import partial
+
+# Local App imports
+from delete_aws_resources_with_py.change_ssm_preferences import SsmPreference
+from delete_aws_resources_with_py.main import RegionResult, _run_in_pool, _run_verification_stage
+from delete_aws_resources_with_py.verification import (
+    Verifier,
+    VerificationResult,
+    CHECK_NACL_RULES_REMOVED,
+    CHECK_SG_RULES_REVOKED,
+    CHECK_SSM_DISABLED,
+    CHECK_VPC_DELETED,
+    format_compliance_matrix,
+)
+
+
+def test_verifier_polls_until_the_default_resources_are_locked_down(mocker, ec2_client, ssm_client):
+    mocker.patch.object(SsmPreference, 'get_current_service_setting_check', side_effect=[True, False, False])
+    sleep = mocker.patch('delete_aws_resources_with_py.verification.time.sleep')
+    verifier = Verifier(ec2_client, ssm_client, 'us-east-1', attempts=2, base_delay=0.5)
+    vpc_id = ec2_client.describe_vpcs(Filters=[{'Name': 'isDefault', 'Values': ['true']}])['Vpcs'][0]['VpcId']
+
+    assert verifier.check_nacl_rules_removed() is False
+    assert verifier.check_sg_rules_revoked() is False
+    acl = ec2_client.describe_network_acls(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]},
+                                                    {'Name': 'default', 'Values': ['true']}])['NetworkAcls'][0]
+    for egress in (True, False):
+        ec2_client.delete_network_acl_entry(NetworkAclId=acl['NetworkAclId'], RuleNumber=100, Egress=egress)
+    ec2_client.create_network_acl_entry(NetworkAclId=acl['NetworkAclId'], RuleNumber=200, Protocol='-1',
+                                        RuleAction='allow', Egress=False, CidrBlock='10.0.0.0/8')
+    assert verifier.check_nacl_rules_removed() is False  # any entry besides the catch-all deny ones fails
+    ec2_client.delete_network_acl_entry(NetworkAclId=acl['NetworkAclId'], RuleNumber=200, Egress=False)
+    sg = ec2_client.describe_security_groups(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]},
+                                                      {'Name': 'group-name', 'Values': ['default']}])
+    sg = sg['SecurityGroups'][0]  # moto only creates the default outbound rule
+    ec2_client.revoke_security_group_egress(GroupId=sg['GroupId'], IpPermissions=[
+        {'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}])
+
+    result = verifier.verify('modify')  # the SSM setting only reads 'Disable' on the second attempt
+    assert result == VerificationResult('us-east-1', None, 'modify', {
+        CHECK_NACL_RULES_REMOVED: True, CHECK_SG_RULES_REVOKED: True, CHECK_SSM_DISABLED: True})
+    sleep.assert_called_once_with(0.5)
+
+    result = verifier.verify('delete', '111111111111')
+    assert result.checks == {CHECK_VPC_DELETED: False, CHECK_SSM_DISABLED: True}
+    assert sleep.call_count == 2
+
+
+def test_verifier_async_backoff_does_not_hold_a_thread(mocker):
+    ec2_client = mocker.Mock()
+    ec2_client.describe_vpcs.side_effect = [{'Vpcs': [{'VpcId': 'vpc-1'}]}, {'Vpcs': [{'VpcId': 'vpc-1'}]},
+                                            {'Vpcs': []}]
+    mocker.patch.object(SsmPreference, 'get_current_service_setting_check', return_value=False)
+    sleep = mocker.patch('delete_aws_resources_with_py.verification.time.sleep')
+    calls = []
+
+    async def call(func, *args):
+        calls.append(func.__name__)
+        return func(*args)
+
+    verifier = Verifier(ec2_client, mocker.Mock(), 'us-east-1', attempts=3, base_delay=0.01)
+    result = asyncio.run(verifier.verify_async('delete', call, '111111111111'))
+
+    assert result == VerificationResult('us-east-1', '111111111111', 'delete', {
+        CHECK_VPC_DELETED: True, CHECK_SSM_DISABLED: True})
+    assert calls == ['_attempt'] * 4  # one blocking call per attempt, the backoff is awaited on the loop
+    sleep.assert_not_called()
+
+
+def test_verification_stage_reports_non_compliant_regions(mocker, tmp_path):
+    verifications = {'eu-west-1': {CHECK_VPC_DELETED: True, CHECK_SSM_DISABLED: True},
+                     'eu-west-2': {CHECK_VPC_DELETED: False, CHECK_SSM_DISABLED: True}}
+
+    def fake_verify_region(current_region, action, account=None):
+        if current_region == 'eu-west-3':
+            raise RuntimeError('boom')
+        return VerificationResult(current_region, None, action, verifications[current_region])
+
+    mocker.patch('delete_aws_resources_with_py.main._verify_region', side_effect=fake_verify_region)
+    matrix_file = tmp_path / 'matrix.csv'
+    failed = _run_verification_stage([(None, 'eu-west-1'), (None, 'eu-west-2'), (None, 'eu-west-3')], 'delete',
+                                     partial(_run_in_pool, max_workers=3), str(matrix_file))
+
+    assert sorted(failed) == [RegionResult('eu-west-2', 'verify_failed'), RegionResult('eu-west-3', 'verify_failed')]
+    with open(matrix_file, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['region'], row['default_vpc_deleted'], row['nacl_rules_removed'], row['compliant'])
+            for row in rows] == [('eu-west-1', 'PASS', '-', 'PASS'), ('eu-west-2', 'FAIL', '-', 'FAIL')]
+    assert format_compliance_matrix([]).split() == ['account', 'region', 'action', CHECK_VPC_DELETED,
+                                                    CHECK_NACL_RULES_REMOVED, CHECK_SG_RULES_REVOKED,
+                                                    CHECK_SSM_DISABLED, 'compliant']